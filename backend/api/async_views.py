@@ -0,0 +1,266 @@
+from abc import ABC, abstractmethod
+from calendar import timegm
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from django_filters.utils import translate_validation
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    NotFound,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from api.serializers import (
+    IngredientSerializer,
+    ReadRecipeSerializer,
+    SubscribeSerializer,
+    TagSerializer,
+    get_recipes_limit,
+)
+from recipes.models import Ingredient, Recipe, Tag
+from utils.conditional import (
+    aget_recipe_state,
+    catalog_etag,
+    catalog_last_modified,
+    recipe_etag,
+    recipe_last_modified,
+)
+from utils.filters import RecipeFilter
+from utils.ingredient_index import ingredient_index
+from utils.paginators import PageLimitPagination, RecipePagination
+
+
+async def authenticate(request):
+    """
+    Определяет request.user классами из DEFAULT_AUTHENTICATION_CLASSES,
+    как синхронный вьюсет. Они обращаются к базе синхронно, поэтому
+    вызываются через sync_to_async.
+    """
+    await sync_to_async(getattr)(request, 'user')
+
+
+def render(response):
+    """Отрисовывает Response в JSON без перехода в синхронный поток."""
+    return HttpResponse(
+        JSONRenderer().render(response.data),
+        status=response.status_code,
+        content_type='application/json',
+    )
+
+
+def error_response(exc, request):
+    """
+    Ответ на исключение в том же виде, что у exception_handler DRF
+    и APIView.permission_denied.
+    """
+    if isinstance(exc, Http404):
+        exc = NotFound()
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    header = None
+    if isinstance(exc, (AuthenticationFailed, NotAuthenticated)):
+        if request.authenticators:
+            header = request.authenticators[0].authenticate_header(request)
+        if not header:
+            exc.status_code = status.HTTP_403_FORBIDDEN
+    response = render(Response(data, status=exc.status_code))
+    if header:
+        response.headers['WWW-Authenticate'] = header
+    return response
+
+
+async def conditional(request, get_response, etag=None, last_modified=None):
+    """
+    Декоратор condition для асинхронного обработчика: 304 или 412
+    по заголовкам запроса, иначе ответ get_response() с ETag
+    и Last-Modified.
+    """
+    etag = quote_etag(etag) if etag else None
+    if last_modified:
+        last_modified = timegm(last_modified.utctimetuple())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = await get_response()
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+    return response
+
+
+class AsyncReadView(ABC, View):
+    """
+    Отвечает на GET асинхронно, через асинхронный ORM, а остальные
+    методы передаёт синхронному вьюсету fallback из роутера.
+    """
+
+    fallback = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(self.fallback)(
+                request, *args, **kwargs
+            )
+        request = Request(request, authenticators=self.get_authenticators())
+        try:
+            await authenticate(request)
+            return await self.get(request, *args, **kwargs)
+        except (APIException, Http404) as exc:
+            return error_response(exc, request)
+
+    def get_authenticators(self):
+        return [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+
+    @abstractmethod
+    async def get(self, request, *args, **kwargs):
+        """Ответ на GET; вызывается с уже определённым request.user."""
+
+
+class CatalogView(AsyncReadView):
+    """Справочник с ETag по версии таблицы, как у catalog_condition."""
+
+    model = None
+    serializer_class = None
+
+    async def get(self, request, *args, **kwargs):
+        response = await conditional(
+            request,
+            lambda: self.read(request, *args, **kwargs),
+            catalog_etag(self.model)(request),
+            catalog_last_modified(self.model)(request),
+        )
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    async def read(self, request, pk=None):
+        if pk is None:
+            return await self.read_list(request)
+        try:
+            obj = await self.model.objects.aget(pk=pk)
+        except self.model.DoesNotExist:
+            raise Http404
+        return render(Response(self.serializer_class(obj).data))
+
+    async def read_list(self, request):
+        return render(
+            Response(
+                self.serializer_class(
+                    [obj async for obj in self.model.objects.all()],
+                    many=True,
+                ).data
+            )
+        )
+
+
+class TagView(CatalogView):
+    model = Tag
+    serializer_class = TagSerializer
+
+
+class IngredientView(CatalogView):
+    model = Ingredient
+    serializer_class = IngredientSerializer
+
+    async def read_list(self, request):
+        """Индекс в памяти может перечитать справочник из базы."""
+        return render(
+            Response(
+                await sync_to_async(ingredient_index.search)(
+                    request.query_params.get('name', '')
+                )
+            )
+        )
+
+
+class RecipeListView(AsyncReadView):
+    async def get(self, request):
+        filterset = RecipeFilter(
+            request.query_params,
+            queryset=Recipe.objects.for_viewer(request.user),
+            request=request,
+        )
+        if not await sync_to_async(filterset.is_valid)():
+            raise translate_validation(filterset.errors)
+        paginator = RecipePagination()
+        recipes = await paginator.apaginate_queryset(filterset.qs, request)
+        serializer = ReadRecipeSerializer(
+            recipes,
+            many=True,
+            context={'request': request, 'image_size': 'card'},
+        )
+        return render(paginator.get_paginated_response(serializer.data))
+
+
+class RecipeDetailView(AsyncReadView):
+    async def get(self, request, pk):
+        await aget_recipe_state(request, pk)
+        response = await conditional(
+            request,
+            lambda: self.read(request, pk),
+            recipe_etag(request, pk),
+            recipe_last_modified(request, pk),
+        )
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    async def read(self, request, pk):
+        recipe = await (
+            Recipe.objects.for_viewer(request.user).filter(pk=pk).afirst()
+        )
+        if recipe is None:
+            raise Http404
+        return render(
+            Response(
+                ReadRecipeSerializer(
+                    recipe, context={'request': request}
+                ).data
+            )
+        )
+
+
+class SubscriptionsView(AsyncReadView):
+    async def get(self, request):
+        if not request.user.is_authenticated:
+            raise NotAuthenticated
+        paginator = PageLimitPagination()
+        subscriptions = await paginator.apaginate_queryset(
+            request.user.follower.select_related('author').order_by('-id'),
+            request,
+        )
+        recipes = defaultdict(list)
+        async for recipe in Recipe.objects.latest_by_author(
+            [subscription.author_id for subscription in subscriptions],
+            get_recipes_limit(request),
+        ):
+            recipes[recipe.author_id].append(recipe)
+        serializer = SubscribeSerializer(
+            subscriptions,
+            many=True,
+            context={'request': request, 'recipes': recipes},
+        )
+        return render(paginator.get_paginated_response(serializer.data))
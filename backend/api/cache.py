@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from utils.images import DEFAULT_SIZE
+
+FRAGMENT_VERSION = 3
+FRAGMENT_KEY = 'recipe:fragment:{}:{}:{}:{}:{:%Y%m%d%H%M%S%f}'
+GENERATION_KEY = 'recipe:fragment:generation'
+HITS_KEY = 'recipe:fragment:hits'
+MISSES_KEY = 'recipe:fragment:misses'
+
+
+def is_enabled():
+    return bool(settings.RECIPE_FRAGMENT_CACHE_TIMEOUT)
+
+
+def get_generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def bump_generation():
+    """Делает устаревшими фрагменты всех рецептов."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, None)
+
+
+def make_key(recipe, generation, size=DEFAULT_SIZE):
+    """
+    Ключ фрагмента версии рецепта: при изменении рецепта меняется
+    updated_at, и фрагмент, отрисованный по старой строке, уже
+    не найдётся. Устаревшие ключи истекают сами.
+    """
+    return FRAGMENT_KEY.format(
+        FRAGMENT_VERSION, generation, size, recipe.pk, recipe.updated_at
+    )
+
+
+def get_fragments(recipes, size=DEFAULT_SIZE):
+    """Возвращает словарь {id рецепта: фрагмент} для найденных в кеше."""
+    generation = get_generation()
+    keys = {
+        make_key(recipe, generation, size): recipe.pk for recipe in recipes
+    }
+    found = cache.get_many(keys)
+    fragments = {keys[key]: fragment for key, fragment in found.items()}
+    record(hits=len(fragments), misses=len(keys) - len(fragments))
+    return fragments
+
+
+def set_fragments(fragments, size=DEFAULT_SIZE):
+    """Сохраняет фрагменты из словаря {рецепт: фрагмент}."""
+    if not fragments:
+        return
+    generation = get_generation()
+    cache.set_many(
+        {
+            make_key(recipe, generation, size): fragment
+            for recipe, fragment in fragments.items()
+        },
+        settings.RECIPE_FRAGMENT_CACHE_TIMEOUT,
+    )
+
+
+def _incr(key, delta):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+def record(hits=0, misses=0):
+    _incr(HITS_KEY, hits)
+    _incr(MISSES_KEY, misses)
+
+
+def get_stats():
+    """Возвращает счётчики попаданий и промахов кеша."""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
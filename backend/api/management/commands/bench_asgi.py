@@ -0,0 +1,180 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+from statistics import median
+from time import monotonic, perf_counter, sleep
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Recipe
+
+HOST = '127.0.0.1'
+START_TIMEOUT = 30
+WARMUP_REQUESTS = 20
+SERVERS = (
+    ('WSGI', 'false', ('foodgram.wsgi',)),
+    (
+        'ASGI',
+        'true',
+        ('--worker-class', 'uvicorn.workers.UvicornWorker', 'foodgram.asgi'),
+    ),
+)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def fetch(port, path):
+    """GET без keep-alive; возвращает код ответа."""
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(
+        f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+        'Connection: close\r\n\r\n'.encode()
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def load(port, path, requests, concurrency):
+    """
+    Отправляет requests запросов, не больше concurrency одновременно.
+    Возвращает время, задержки в мс и число неудачных запросов.
+    """
+    latencies, failures = [], 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal failures
+        for _ in remaining:
+            started = perf_counter()
+            try:
+                ok = await fetch(port, path) == 200
+            except (OSError, IndexError, ValueError):
+                ok = False
+            latencies.append((perf_counter() - started) * 1000)
+            failures += not ok
+
+    started = perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return perf_counter() - started, latencies, failures
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и задержки чтения API '
+        'под gunicorn с синхронными воркерами (WSGI) и с воркерами '
+        'uvicorn (ASGI, асинхронные представления). Серверы запускаются '
+        'на текущей базе данных, данные не создаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Запросов к каждому адресу.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Одновременных запросов.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4, help='Воркеров gunicorn.'
+        )
+        parser.add_argument(
+            '--port', type=int, default=8765, help='Порт сервера.'
+        )
+        parser.add_argument(
+            '--paths',
+            nargs='+',
+            help='Адреса для замера, по умолчанию списки и первый рецепт.',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self.get_paths()
+        self.stdout.write(
+            f'Запросов: {options["requests"]}, одновременно: '
+            f'{options["concurrency"]}, воркеров: {options["workers"]}.'
+        )
+        self.stdout.write(
+            'сервер  адрес                              запр/с  '
+            'p50, мс  p99, мс  ошибок'
+        )
+        for name, async_views, arguments in SERVERS:
+            server = self.start(options, async_views, arguments)
+            try:
+                for path in paths:
+                    asyncio.run(
+                        load(options['port'], path, WARMUP_REQUESTS, 1)
+                    )
+                    elapsed, latencies, failures = asyncio.run(
+                        load(
+                            options['port'],
+                            path,
+                            options['requests'],
+                            options['concurrency'],
+                        )
+                    )
+                    self.stdout.write(
+                        f'{name:<7} {path:<32} '
+                        f'{len(latencies) / elapsed:>8.0f} '
+                        f'{median(latencies):>8.1f} '
+                        f'{percentile(latencies, 0.99):>8.1f} '
+                        f'{failures:>7}'
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+    @staticmethod
+    def get_paths():
+        paths = [
+            '/api/recipes/',
+            '/api/tags/',
+            f'/api/ingredients/?{urlencode({"name": "а"})}',
+        ]
+        recipe_id = Recipe.objects.values_list('pk', flat=True).first()
+        if recipe_id is not None:
+            paths.insert(1, f'/api/recipes/{recipe_id}/')
+        return paths
+
+    @staticmethod
+    def start(options, async_views, arguments):
+        """Запускает gunicorn и ждёт, пока он начнёт принимать запросы."""
+        server = subprocess.Popen(
+            (
+                sys.executable,
+                '-m',
+                'gunicorn',
+                '--workers',
+                str(options['workers']),
+                '--bind',
+                f'{HOST}:{options["port"]}',
+                '--log-level',
+                'warning',
+                *arguments,
+            ),
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'ASYNC_READ_VIEWS': async_views},
+        )
+        deadline = monotonic() + START_TIMEOUT
+        while monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Сервер не запустился.')
+            try:
+                socket.create_connection((HOST, options['port'])).close()
+                return server
+            except OSError:
+                sleep(0.2)
+        server.terminate()
+        raise CommandError('Сервер не начал принимать запросы.')
@@ -0,0 +1,127 @@
+from random import Random
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q
+from django.db.transaction import atomic, set_rollback
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+from users.models import User
+from utils.recipe_index import RecipeIngredientIndex, get_sequence
+
+BATCH_SIZE = 1000
+LIMIT = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает подбор рецептов по ингредиентам через GROUP BY '
+        'по IngredientInRecipe и через инвертированный индекс в памяти. '
+        'Данные создаются во временной транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100000, help='Количество рецептов.'
+        )
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            default=2000,
+            help='Размер каталога ингредиентов.',
+        )
+        parser.add_argument(
+            '--have',
+            type=int,
+            default=10,
+            help='Сколько ингредиентов есть у пользователя.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5, help='Повторов каждого замера.'
+        )
+
+    def handle(self, *args, **options):
+        with atomic():
+            self.run(options)
+            set_rollback(True)
+
+    def run(self, options):
+        random = Random(0)
+        ingredients = [
+            ingredient.pk
+            for ingredient in Ingredient.objects.bulk_create(
+                Ingredient(name=f'bench-{i}', measurement_unit='г')
+                for i in range(options['ingredients'])
+            )
+        ]
+        self.create_recipes(random, ingredients, options['recipes'])
+        index = RecipeIngredientIndex()
+        started = perf_counter()
+        snapshot = index.snapshot = index.build(get_sequence())
+        self.stdout.write(
+            f'Построение индекса: {(perf_counter() - started) * 1000:.0f} мс'
+            f', пар: {len(snapshot["recipes"])}.'
+        )
+        changed = random.sample(snapshot['recipe_ids'].tolist(), 10)
+        started = perf_counter()
+        index.apply(snapshot, snapshot['sequence'], changed)
+        self.stdout.write(
+            'Применение изменений 10 рецептов: '
+            f'{(perf_counter() - started) * 1000:.1f} мс.'
+        )
+        sql, memory = [], []
+        for _ in range(options['repeat']):
+            have = random.sample(ingredients, options['have'])
+            started = perf_counter()
+            list(self.sql_queryset(have))
+            sql.append((perf_counter() - started) * 1000)
+            started = perf_counter()
+            index.cook(have, LIMIT)
+            memory.append((perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'Подбор топ-{LIMIT}, медиана: GROUP BY {median(sql):.1f} мс, '
+            f'индекс {median(memory):.2f} мс.'
+        )
+
+    @staticmethod
+    def create_recipes(random, ingredients, count):
+        author = User.objects.create(
+            username='bench-cook', email='bench-cook@example.com'
+        )
+        for start in range(0, count, BATCH_SIZE):
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    author=author,
+                    name='bench',
+                    image='recipes/images/bench.png',
+                    text='bench',
+                    cooking_time=1,
+                )
+                for _ in range(min(BATCH_SIZE, count - start))
+            )
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(
+                    recipes_id=recipe.pk, ingredient_id=ingredient, amount=1
+                )
+                for recipe in recipes
+                for ingredient in random.sample(
+                    ingredients, random.randint(3, 12)
+                )
+            )
+
+    @staticmethod
+    def sql_queryset(have):
+        return (
+            Recipe.objects.annotate(
+                matched=Count(
+                    'recipe_ingredients',
+                    filter=Q(recipe_ingredients__ingredient__in=have),
+                ),
+                total=Count('recipe_ingredients'),
+            )
+            .filter(matched__gt=0)
+            .annotate(missing=F('total') - F('matched'))
+            .order_by('missing', '-matched', '-pk')
+            .values_list('pk', 'matched', 'missing')[:LIMIT]
+        )
@@ -0,0 +1,123 @@
+import json
+import os
+import tracemalloc
+from base64 import b64encode
+from io import BytesIO
+from tempfile import TemporaryDirectory
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic, set_rollback
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import RecipeViewSet
+from recipes.models import Ingredient, Tag
+from users.models import User
+
+MEGABYTE = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пиковую память при создании рецепта с изображением '
+        'в base64 внутри JSON и файлом в multipart/form-data. Данные '
+        'создаются во временной транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--width', type=int, default=4000, help='Ширина изображения.'
+        )
+        parser.add_argument(
+            '--height', type=int, default=3000, help='Высота изображения.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3, help='Повторов каждого замера.'
+        )
+
+    def handle(self, *args, **options):
+        with TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media, ALLOWED_HOSTS=['testserver']
+        ), atomic():
+            self.run(options)
+            set_rollback(True)
+
+    def run(self, options):
+        image = self.make_image(options['width'], options['height'])
+        self.stdout.write(
+            f'Изображение {options["width"]}x{options["height"]}, '
+            f'{len(image) / MEGABYTE:.1f} МБ'
+        )
+        author = User.objects.create(
+            username='bench-upload', email='bench-upload@example.com'
+        )
+        fields = {
+            'name': 'bench',
+            'text': 'bench',
+            'cooking_time': 1,
+            'tags': [
+                Tag.objects.create(
+                    name='bench-upload', color='#123456', slug='bench-upload'
+                ).pk
+            ],
+            'ingredients': [
+                {
+                    'id': Ingredient.objects.create(
+                        name='bench-upload', measurement_unit='г'
+                    ).pk,
+                    'amount': 1,
+                }
+            ],
+        }
+        factory = APIRequestFactory()
+        view = RecipeViewSet.as_view({'post': 'create'})
+        requests = {
+            'base64 JSON': lambda: factory.post(
+                '/api/recipes/',
+                {
+                    **fields,
+                    'image': 'data:image/jpeg;base64,'
+                    + b64encode(image).decode(),
+                },
+                format='json',
+            ),
+            'multipart': lambda: factory.post(
+                '/api/recipes/',
+                {
+                    'data': json.dumps(fields),
+                    'image': SimpleUploadedFile(
+                        'bench.jpg', image, 'image/jpeg'
+                    ),
+                },
+                format='multipart',
+            ),
+        }
+        self.stdout.write('способ            тело, МБ  пик памяти, МБ')
+        for name, make_request in requests.items():
+            peaks = []
+            for _ in range(options['repeat']):
+                request = make_request()
+                force_authenticate(request, author)
+                tracemalloc.start()
+                response = view(request)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                request.close()
+                if response.status_code != 201:
+                    self.stderr.write(f'{name}: {response.data}')
+                    return
+            body = int(request.META['CONTENT_LENGTH']) / MEGABYTE
+            self.stdout.write(
+                f'{name:<16} {body:>9.1f} {max(peaks) / MEGABYTE:>15.1f}'
+            )
+
+    @staticmethod
+    def make_image(width, height):
+        """Шумное изображение, которое почти не сжимается в JPEG."""
+        buffer = BytesIO()
+        Image.frombytes(
+            'RGB', (width, height), os.urandom(width * height * 3)
+        ).save(buffer, 'JPEG', quality=90)
+        return buffer.getvalue()
@@ -0,0 +1,112 @@
+from random import Random
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic, set_rollback
+from django.http import QueryDict
+
+from recipes.models import Recipe, Tag
+from users.models import User
+from utils.filters import RecipeFilter
+
+PAGE_SIZE = 6
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает фильтрацию рецептов по нескольким тегам через JOIN '
+        'с DISTINCT и через EXISTS. Данные создаются во временной '
+        'транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 50000],
+            help='Количество рецептов для замеров.',
+        )
+        parser.add_argument(
+            '--tags', type=int, default=8, help='Количество тегов.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5, help='Повторов каждого замера.'
+        )
+
+    def handle(self, *args, **options):
+        with atomic():
+            self.run(options)
+            set_rollback(True)
+
+    def run(self, options):
+        random = Random(0)
+        author = User.objects.create(
+            username='bench-tag-filter', email='bench-tag-filter@example.com'
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'bench-{i}', color=f'#{i:06x}', slug=f'bench-{i}')
+            for i in range(options['tags'])
+        )
+        self.stdout.write(
+            'рецептов  тегов  JOIN: страница, мс / count, мс'
+            '  EXISTS: страница, мс / count, мс'
+        )
+        created = 0
+        for size in sorted(options['sizes']):
+            self.create_recipes(random, author, tags, size - created)
+            created = size
+            for tag_count in (1, 2, 3):
+                slugs = [tag.slug for tag in tags[:tag_count]]
+                join = self.measure(self.join_queryset(slugs), options)
+                exists = self.measure(self.filter_queryset(slugs), options)
+                self.stdout.write(
+                    f'{size:>8} {tag_count:>6}'
+                    f' {join[0]:>17.2f} / {join[1]:<9.2f}'
+                    f' {exists[0]:>19.2f} / {exists[1]:.2f}'
+                )
+
+    @staticmethod
+    def create_recipes(random, author, tags, count):
+        through = Recipe.tags.through
+        for start in range(0, count, BATCH_SIZE):
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    author=author,
+                    name='bench',
+                    image='recipes/images/bench.png',
+                    text='bench',
+                    cooking_time=1,
+                )
+                for _ in range(min(BATCH_SIZE, count - start))
+            )
+            through.objects.bulk_create(
+                through(recipe_id=recipe.pk, tag_id=tag.pk)
+                for recipe in recipes
+                for tag in random.sample(tags, random.randint(1, 3))
+            )
+
+    @staticmethod
+    def join_queryset(slugs):
+        return Recipe.objects.filter(tags__slug__in=slugs).distinct()
+
+    @staticmethod
+    def filter_queryset(slugs):
+        data = QueryDict(mutable=True)
+        data.setlist('tags', slugs)
+        return RecipeFilter(data=data, queryset=Recipe.objects.all()).qs
+
+    @staticmethod
+    def measure(queryset, options):
+        """Возвращает медианное время выборки страницы и подсчёта."""
+        page, count = [], []
+        for _ in range(options['repeat']):
+            started = perf_counter()
+            list(queryset[:PAGE_SIZE])
+            page.append((perf_counter() - started) * 1000)
+            started = perf_counter()
+            queryset.count()
+            count.append((perf_counter() - started) * 1000)
+        return median(page), median(count)
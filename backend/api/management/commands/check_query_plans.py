@@ -0,0 +1,145 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.transaction import atomic
+from django.http import QueryDict
+
+from recipes.models import FeedEntry, Ingredient, Recipe, ShoppingListItem
+from users.models import Subscription, User
+from utils.filters import RecipeFilter
+
+PAGE_SIZE = 6
+ALL_VENDORS = ('postgresql', 'sqlite')
+
+
+class ViewerRequest:
+    def __init__(self, user):
+        self.user = user
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет через EXPLAIN, что запросы основных эндпоинтов '
+        'используют предназначенные для них индексы. На PostgreSQL '
+        'последовательное сканирование отключается, чтобы результат '
+        'не зависел от объёма данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--show-plans',
+            action='store_true',
+            help='Выводить планы запросов.',
+        )
+
+    def get_checks(self):
+        """Возвращает (описание, индекс, запрос, СУБД) для проверки."""
+        user = User(pk=1)
+        request = ViewerRequest(user)
+        recipes = Recipe.objects.for_viewer(user)
+
+        def recipe_filter(query):
+            return RecipeFilter(
+                data=QueryDict(query), queryset=recipes, request=request
+            ).qs[:PAGE_SIZE]
+
+        return (
+            (
+                'Лента рецептов',
+                'recipe_pub_date_id_idx',
+                recipes[:PAGE_SIZE],
+                ALL_VENDORS,
+            ),
+            (
+                'Рецепты в тренде',
+                'recipe_trending_idx',
+                recipe_filter('ordering=trending'),
+                ALL_VENDORS,
+            ),
+            (
+                'Популярные рецепты',
+                'recipe_popular_idx',
+                recipe_filter('ordering=popular'),
+                ALL_VENDORS,
+            ),
+            (
+                'Рецепты автора',
+                'recipe_author_pub_date_idx',
+                recipes.filter(author=user)[:PAGE_SIZE],
+                ALL_VENDORS,
+            ),
+            (
+                'Избранное',
+                'favorite_user_recipe_idx',
+                recipe_filter('is_favorited=1'),
+                ('postgresql',),
+            ),
+            (
+                'Рецепты в корзине',
+                'cart_user_recipe_idx',
+                recipe_filter('is_in_shopping_cart=1'),
+                ('postgresql',),
+            ),
+            (
+                'Список покупок',
+                'unique_shopping_list_item',
+                ShoppingListItem.objects.for_download(user),
+                ('postgresql',),
+            ),
+            (
+                'Лента подписок',
+                'feed_user_pub_date_idx',
+                FeedEntry.objects.filter(user=user).order_by(
+                    '-pub_date', '-recipe_id'
+                )[:PAGE_SIZE],
+                ALL_VENDORS,
+            ),
+            (
+                'Подписки',
+                'subscription_user_author_idx',
+                Subscription.objects.filter(user=user)[:PAGE_SIZE],
+                ALL_VENDORS,
+            ),
+            (
+                'Поиск рецептов',
+                'recipe_search_vector_idx',
+                Recipe.objects.search('пирог с вишней').values('pk')[
+                    :PAGE_SIZE
+                ],
+                ('postgresql',),
+            ),
+            (
+                'Похожие рецепты',
+                'similar_recipe_score_idx',
+                recipes.neighbours_of(1)[:PAGE_SIZE],
+                ALL_VENDORS,
+            ),
+            (
+                'Поиск ингредиента',
+                'ingredient_name_upper_idx',
+                Ingredient.objects.filter(name__istartswith='мука'),
+                ('postgresql',),
+            ),
+        )
+
+    def handle(self, *args, **options):
+        failed = []
+        with atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, index, queryset, vendors in self.get_checks():
+                if connection.vendor not in vendors:
+                    self.stdout.write(f'- {name}: пропущено')
+                    continue
+                plan = queryset.explain()
+                if index in plan:
+                    self.stdout.write(self.style.SUCCESS(f'+ {name}: {index}'))
+                else:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(f'x {name}: {index}'))
+                if options['show_plans'] or index not in plan:
+                    self.stdout.write(plan)
+        if failed:
+            raise CommandError(
+                'Индексы не используются: ' + ', '.join(failed)
+            )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api import cache as recipe_cache
+
+
+class Command(BaseCommand):
+    help = 'Выводит счётчики попаданий и промахов кеша карточек рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        stats = recipe_cache.get_stats()
+        self.stdout.write(
+            f'Попаданий: {stats["hits"]}, промахов: {stats["misses"]}, '
+            f'доля попаданий: {stats["hit_ratio"]:.2%}'
+        )
+        if options['reset']:
+            recipe_cache.reset_stats()
@@ -1,27 +1,79 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Manager
 from django.db.transaction import atomic
 from djoser.serializers import (
     UserCreateSerializer as DjoserUserCreateSerializer,
 )
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework.serializers import (
     IntegerField,
+    ListField,
+    ListSerializer,
     ModelSerializer,
-    PrimaryKeyRelatedField,
     ReadOnlyField,
+    Serializer,
     SerializerMethodField,
     ValidationError,
 )
 from rest_framework.validators import UniqueTogetherValidator
 
+from api import cache as recipe_cache
 from recipes.models import (
-    Cart,
-    Favorite,
+    SIMILAR_COUNT,
     Ingredient,
     IngredientInRecipe,
     Recipe,
+    ShoppingListItem,
     Tag,
 )
 from users.models import Subscription, User
+from utils.fields import RecipeImageField
+from utils.images import (
+    DEFAULT_SIZE,
+    get_image_url,
+    get_srcset,
+    schedule_derivatives,
+)
+from utils.recipe_index import MAX_RESULTS
+
+MAX_BULK_IDS = 100
+MAX_COOK_INGREDIENTS = 50
+MAX_COOK_RESULTS = 50
+SIMILAR_LIMIT = 6
+
+
+def get_recipes_limit(request):
+    """Возвращает параметр recipes_limit или None, если он не задан."""
+    recipes_limit = request.query_params.get('recipes_limit', '')
+    return int(recipes_limit) if recipes_limit.isdigit() else None
+
+
+def get_similar_limit(request):
+    """Возвращает параметр limit для похожих рецептов."""
+    limit = request.query_params.get('limit', '')
+    return min(int(limit), SIMILAR_COUNT) if limit.isdigit() else SIMILAR_LIMIT
+
+
+def resolve_ids(queryset, ids):
+    """
+    Находит объекты по списку id одним запросом и возвращает их в том же
+    порядке. Повторы и неизвестные id отклоняются вместе, одной ошибкой.
+    """
+    duplicates = sorted(pk for pk, count in Counter(ids).items() if count > 1)
+    objects = queryset.in_bulk(set(ids))
+    missing = sorted(set(ids) - objects.keys())
+    errors = []
+    if duplicates:
+        errors.append(
+            'Повторяются id: {}.'.format(', '.join(map(str, duplicates)))
+        )
+    if missing:
+        errors.append(
+            'Не найдены id: {}.'.format(', '.join(map(str, missing)))
+        )
+    if errors:
+        raise ValidationError(errors)
+    return [objects[pk] for pk in ids]
 
 
 class UserSerializer(ModelSerializer):
@@ -47,6 +99,8 @@ class UserSerializer(ModelSerializer):
         user = self.context.get('request').user
         if user.is_anonymous or (user == obj):
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
 
         return user.follower.filter(author=obj).exists()
 
@@ -117,25 +171,21 @@ class SubscribeSerializer(ModelSerializer):
         return data
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request').user
-        if request.is_authenticated:
-            return Subscription.objects.filter(
-                user=request, author=obj.id
-            ).exists()
-        return False
+        return obj.user_id == self.context.get('request').user.pk
 
     def get_recipes(self, obj):
-        recipes_limit = self.context.get('request').query_params.get(
-            'recipes_limit'
-        )
-        if recipes_limit:
-            queryset = obj.author.recipes.all()[: int(recipes_limit)]
+        recipes = self.context.get('recipes')
+        if recipes is not None:
+            recipes = recipes.get(obj.author_id, ())
         else:
-            queryset = obj.author.recipes.all()
-        return RecipeForListSerializer(queryset, many=True).data
+            recipes = Recipe.objects.latest_by_author(
+                (obj.author_id,),
+                get_recipes_limit(self.context.get('request')),
+            )
+        return RecipeForListSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
+        return obj.author.recipes_count
 
 
 class TagSerializer(ModelSerializer):
@@ -166,11 +216,11 @@ class IngredientSerializer(ModelSerializer):
 
 class ReadIngredientSerializer(ModelSerializer):
     """
-    Сериализатор чтения ингредиента с определенными полями
-    и связанным первичным ключом.
+    Сериализатор чтения ингредиента с определенными полями.
+    Id проверяются сразу для всего списка в CreatRecipeSerializer.
     """
 
-    id = PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = IntegerField(min_value=1)
 
     class Meta:
         model = IngredientInRecipe
@@ -187,6 +237,19 @@ class IngredientInRecipeSerializer(ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class ShoppingListItemSerializer(ModelSerializer):
+    """Сериализатор позиции списка покупок."""
+
+    id = ReadOnlyField(source='ingredient.id')
+    name = ReadOnlyField(source='ingredient.name')
+    measurement_unit = ReadOnlyField(source='ingredient.measurement_unit')
+    amount = ReadOnlyField(source='total_amount')
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
 class RecipeForListSerializer(ModelSerializer):
     """
     Сериализатор ингредиента в рецепте с определенными полями
@@ -194,11 +257,13 @@ class RecipeForListSerializer(ModelSerializer):
     """
 
     image = SerializerMethodField()
+    image_srcset = SerializerMethodField()
 
     def get_image(self, obj):
-        if obj.image:
-            return obj.image.url
-        return None
+        return get_image_url(obj, 'card')
+
+    def get_image_srcset(self, obj):
+        return get_srcset(obj)
 
     class Meta:
         model = Recipe
@@ -206,29 +271,42 @@ class RecipeForListSerializer(ModelSerializer):
             'id',
             'name',
             'image',
+            'image_srcset',
             'cooking_time',
         )
 
 
-class ReadRecipeSerializer(ModelSerializer):
+class RecipeAuthorSerializer(ModelSerializer):
+    """Сериализатор автора рецепта без данных о подписке."""
+
+    class Meta:
+        model = User
+        fields = ('id', 'email', 'username', 'first_name', 'last_name')
+
+
+class RecipeFragmentSerializer(ModelSerializer):
     """
-    Сериализатор чтения рецепта с указанными полями
-    и дополнительными вычисляемыми полями.
+    Сериализатор части рецепта, не зависящей от пользователя.
+    Результат кешируется целиком.
     """
 
     tags = TagSerializer(many=True, read_only=True)
-    author = UserSerializer(read_only=True)
+    author = RecipeAuthorSerializer(read_only=True)
     ingredients = IngredientInRecipeSerializer(
         many=True, read_only=True, source='recipe_ingredients'
     )
-    is_favorited = SerializerMethodField()
-    is_in_shopping_cart = SerializerMethodField()
     image = SerializerMethodField()
+    image_srcset = SerializerMethodField()
+
+    @property
+    def image_size(self):
+        return self.context.get('image_size', DEFAULT_SIZE)
 
     def get_image(self, obj):
-        if obj.image:
-            return obj.image.url
-        return None
+        return get_image_url(obj, self.image_size)
+
+    def get_image_srcset(self, obj):
+        return get_srcset(obj)
 
     class Meta:
         model = Recipe
@@ -237,10 +315,49 @@ class ReadRecipeSerializer(ModelSerializer):
             'author',
             'name',
             'image',
+            'image_srcset',
             'text',
             'ingredients',
             'tags',
             'cooking_time',
+        )
+
+
+class CachedRecipeListSerializer(ListSerializer):
+    """
+    Сериализатор списка рецептов, загружающий фрагменты всей страницы
+    из кеша одним запросом и сохраняющий отрисованные заново.
+    """
+
+    def to_representation(self, data):
+        if not recipe_cache.is_enabled():
+            return super().to_representation(data)
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        size = self.child.image_size
+        self.cached_fragments = recipe_cache.get_fragments(recipes, size)
+        self.new_fragments = {}
+        representation = [
+            self.child.to_representation(recipe) for recipe in recipes
+        ]
+        recipe_cache.set_fragments(self.new_fragments, size)
+        return representation
+
+
+class ReadRecipeSerializer(RecipeFragmentSerializer):
+    """
+    Сериализатор чтения рецепта с указанными полями
+    и дополнительными вычисляемыми полями.
+
+    Общая для всех пользователей часть берётся из кеша,
+    поверх неё добавляются флаги текущего пользователя.
+    """
+
+    author = UserSerializer(read_only=True)
+    is_favorited = SerializerMethodField()
+    is_in_shopping_cart = SerializerMethodField()
+
+    class Meta(RecipeFragmentSerializer.Meta):
+        fields = RecipeFragmentSerializer.Meta.fields + (
             'is_favorited',
             'is_in_shopping_cart',
         )
@@ -250,14 +367,58 @@ class ReadRecipeSerializer(ModelSerializer):
             'author',
             'tags',
         )
+        list_serializer_class = CachedRecipeListSerializer
+
+    def render_fragment(self, instance):
+        return dict(
+            RecipeFragmentSerializer(instance, context=self.context).data
+        )
+
+    def get_fragment(self, instance):
+        if not recipe_cache.is_enabled():
+            return self.render_fragment(instance)
+        if isinstance(self.parent, CachedRecipeListSerializer):
+            fragment = self.parent.cached_fragments.get(instance.pk)
+            if fragment is None:
+                fragment = self.render_fragment(instance)
+                self.parent.new_fragments[instance] = fragment
+            return fragment
+        fragments = recipe_cache.get_fragments([instance], self.image_size)
+        fragment = fragments.get(instance.pk)
+        if fragment is None:
+            fragment = self.render_fragment(instance)
+            recipe_cache.set_fragments({instance: fragment}, self.image_size)
+        return fragment
+
+    def to_representation(self, instance):
+        fragment = self.get_fragment(instance)
+        data = dict(fragment)
+        data['author'] = {
+            **fragment['author'],
+            'is_subscribed': self.get_author_is_subscribed(instance),
+        }
+        data['is_favorited'] = self.get_is_favorited(instance)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(instance)
+        return data
+
+    def get_author_is_subscribed(self, obj):
+        if hasattr(obj, 'author_is_subscribed'):
+            obj.author.is_subscribed = obj.author_is_subscribed
+        return UserSerializer(context=self.context).get_is_subscribed(
+            obj.author
+        )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request.user.is_authenticated:
             return obj.favorite_list.filter(user=request.user).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request.user.is_authenticated:
             return obj.cart_list.filter(user=request.user).exists()
@@ -270,9 +431,9 @@ class CreatRecipeSerializer(ModelSerializer):
     и методами для валидации и создания.
     """
 
-    tags = PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    tags = ListField(child=IntegerField(min_value=1))
     ingredients = ReadIngredientSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     cooking_time = IntegerField()
     author = UserSerializer(read_only=True)
 
@@ -289,22 +450,25 @@ class CreatRecipeSerializer(ModelSerializer):
             'cooking_time',
         )
 
-    def validate(self, data):
-        tags = self.initial_data.get('tags')
-        ingredients = self.initial_data.get('ingredients')
-
+    def validate_ingredients(self, ingredients):
         if not ingredients:
             raise ValidationError('Нужно выбрать ингердиенты.')
+        resolved = resolve_ids(
+            Ingredient.objects.all(),
+            [ingredient['id'] for ingredient in ingredients],
+        )
+        for ingredient, obj in zip(ingredients, resolved):
+            ingredient['id'] = obj
+        return ingredients
+
+    def validate_tags(self, tags):
         if not tags:
             raise ValidationError('Нужно выбрать хотя бы один тег.')
+        return resolve_ids(Tag.objects.all(), tags)
 
-        data.update(
-            {
-                'tags': tags,
-                'ingredients': ingredients,
-                'author': self.context.get('request').user,
-            }
-        )
+    def validate(self, data):
+        if self.instance is None:
+            data['author'] = self.context.get('request').user
         return data
 
     @staticmethod
@@ -313,32 +477,107 @@ class CreatRecipeSerializer(ModelSerializer):
         for ingredient in ingredients:
             ingredient_list.append(
                 IngredientInRecipe(
-                    ingredient_id=ingredient['id'],
+                    ingredient=ingredient['id'],
                     recipes=recipes,
                     amount=ingredient['amount'],
                 )
             )
         IngredientInRecipe.objects.bulk_create(ingredient_list)
 
+    @staticmethod
+    def update_ingredients(recipes, ingredients):
+        """
+        Приводит состав рецепта к ingredients минимальным числом
+        вставок, изменений и удалений. Возвращает количества ингредиентов
+        до и после изменения или None, если состав не изменился.
+        """
+        rows, stale, before = {}, [], defaultdict(int)
+        for row in recipes.recipe_ingredients.all():
+            before[row.ingredient_id] += row.amount
+            if row.ingredient_id in rows:
+                stale.append(row.pk)
+            else:
+                rows[row.ingredient_id] = row
+        after = {
+            ingredient['id'].pk: ingredient['amount']
+            for ingredient in ingredients
+        }
+        created, changed = [], []
+        for ingredient_id, amount in after.items():
+            row = rows.pop(ingredient_id, None)
+            if row is None:
+                created.append(
+                    IngredientInRecipe(
+                        ingredient_id=ingredient_id,
+                        recipes=recipes,
+                        amount=amount,
+                    )
+                )
+            elif row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        stale += [row.pk for row in rows.values()]
+        if not (created or changed or stale):
+            return None
+        if stale:
+            IngredientInRecipe.objects.filter(pk__in=stale).delete()
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ('amount',))
+        if created:
+            IngredientInRecipe.objects.bulk_create(created)
+        return before, after
+
+    @staticmethod
+    def update_tags(recipes, tags):
+        """Добавляет и удаляет только изменившиеся теги рецепта."""
+        before = {tag.pk for tag in recipes.tags.all()}
+        after = {tag.pk for tag in tags}
+        if before - after:
+            recipes.tags.remove(*(before - after))
+        if after - before:
+            recipes.tags.add(*(after - before))
+        return before != after
+
     @atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipes = Recipe.objects.create(**validated_data)
+        schedule_derivatives(recipes)
         recipes.tags.set(tags)
         self.create_ingredients(ingredients, recipes)
         return recipes
 
     @atomic
     def update(self, instance, validated_data):
-        instance.ingredients.clear()
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        self.create_ingredients(ingredients, instance)
-        instance.save()
+        """
+        Сохраняет только изменившиеся поля, теги и ингредиенты.
+        Неизменённый рецепт не записывается вовсе.
+        """
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        update_fields = [
+            field
+            for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        stale_variants = instance.image_variants
+        for field in update_fields:
+            setattr(instance, field, validated_data[field])
+        if 'image' in update_fields:
+            instance.image_variants = {}
+            update_fields.append('image_variants')
+        amounts = None
+        if ingredients is not None:
+            amounts = self.update_ingredients(instance, ingredients)
+        tags_changed = tags is not None and self.update_tags(instance, tags)
+        if not (update_fields or amounts or tags_changed):
+            return instance
+        instance.save(update_fields=(*update_fields, 'updated_at'))
+        if 'image' in update_fields:
+            schedule_derivatives(instance, stale_variants)
+        if amounts:
+            ShoppingListItem.objects.change_recipe(instance, *amounts)
         return instance
 
     def to_representation(self, instance):
@@ -347,46 +586,28 @@ class CreatRecipeSerializer(ModelSerializer):
         ).data
 
 
-class ReadCartSerializer(ModelSerializer):
-    """
-    Сериализатор чтения корзины с указанными полями
-    и методом для преобразования данных.
-    """
+class RecipeIdsSerializer(Serializer):
+    """Сериализатор списка id рецептов для пакетных операций."""
 
-    class Meta:
-        model = Cart
-        fields = ('recipes', 'user')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Cart.objects.all(),
-                fields=('user', 'recipes'),
-                message='Рецепт уже в корзине.',
-            )
-        ]
-
-    def to_representation(self, instance):
-        return RecipeForListSerializer(
-            instance.recipes, context={'request': self.context.get('request')}
-        ).data
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_IDS,
+    )
 
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
 
-class ReadFavoriteSerializer(ModelSerializer):
-    """Сериализатор для чтения избранных рецептов
-    с данными пользователя и рецептов.
-    """
 
-    class Meta:
-        model = Favorite
-        fields = ('user', 'recipes')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=('user', 'recipes'),
-                message='Рецепт уже добавлен в избранные.',
-            )
-        ]
+class CookSerializer(Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
 
-    def to_representation(self, instance):
-        return RecipeForListSerializer(
-            instance.recipes, context={'request': self.context.get('request')}
-        ).data
+    ingredients = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_COOK_INGREDIENTS,
+    )
+    limit = IntegerField(
+        min_value=1, max_value=MAX_COOK_RESULTS, default=MAX_RESULTS
+    )
+    max_missing = IntegerField(min_value=0, required=False)
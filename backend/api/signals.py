@@ -0,0 +1,129 @@
+from functools import partial
+
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.db.transaction import on_commit
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api import cache as recipe_cache
+from recipes.models import (
+    Cart,
+    Favorite,
+    FeedEntry,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    Tag,
+)
+from users.models import Subscription, User
+from utils import recipe_index
+from utils.versions import bump_version
+
+LOGIN_FIELDS = frozenset(('last_login',))
+
+
+def touch_recipes(recipe_ids):
+    """
+    Обновляет updated_at рецептов, чьи теги или ингредиенты изменились
+    в обход сохранения самого рецепта: от него зависят ключи фрагментов
+    в кеше и ETag.
+    """
+    Recipe.objects.filter(pk__in=list(recipe_ids)).update(
+        updated_at=timezone.now()
+    )
+
+
+def reindex_on_commit(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    on_commit(lambda: recipe_index.record_changes(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    reindex_on_commit((instance.pk,))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, raw, **kwargs):
+    """
+    Лента подписчиков заполняется после фиксации транзакции, чтобы
+    запись ленты не удлиняла транзакцию создания рецепта.
+    """
+    if created and not raw:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+        on_commit(partial(FeedEntry.objects.fan_out, instance))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_removed(sender, instance, **kwargs):
+    User.objects.filter(pk=instance.author_id).update(
+        recipes_count=F('recipes_count') - 1
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Cart)
+@receiver(post_save, sender=Subscription)
+def link_created(sender, instance, created, raw, **kwargs):
+    """
+    Связь, созданная сохранением записи (админка, ORM), меняет
+    счётчики так же, как link() в API.
+    """
+    if created and not raw:
+        sender.objects.instance_changed(instance, 1)
+
+
+@receiver(pre_delete, sender=Favorite)
+@receiver(pre_delete, sender=Cart)
+@receiver(pre_delete, sender=Subscription)
+def link_deleted(sender, instance, **kwargs):
+    """
+    Удаление записи, в том числе каскадное вместе с пользователем
+    или рецептом. Данные рецепта ещё не удалены: сигналы pre_delete
+    отправляются до удаления всех собранных объектов.
+    """
+    sender.objects.instance_changed(instance, -1)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    touch_recipes((instance.recipes_id,))
+    reindex_on_commit((instance.recipes_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch_recipes((instance.pk,))
+    elif pk_set:
+        touch_recipes(pk_set)
+    else:
+        on_commit(recipe_cache.bump_generation)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, **kwargs):
+    on_commit(recipe_cache.bump_generation)
+    on_commit(lambda: bump_version(sender))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields and set(update_fields) <= LOGIN_FIELDS):
+        return
+    Recipe.objects.filter(author=instance).update(updated_at=timezone.now())
@@ -0,0 +1,90 @@
+from importlib.util import find_spec, module_from_spec
+from types import ModuleType
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path, resolve
+from rest_framework.authtoken.models import Token
+
+from api.async_views import RecipeListView
+from recipes.models import Favorite
+from recipes.tests.factories import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+def async_urlconf():
+    """api.urls, собранный с ASYNC_READ_VIEWS = True."""
+    spec = find_spec('api.urls')
+    module = module_from_spec(spec)
+    with override_settings(ASYNC_READ_VIEWS=True):
+        spec.loader.exec_module(module)
+    urlconf = ModuleType('async_urls')
+    urlconf.urlpatterns = [path('api/', include(module))]
+    return urlconf
+
+
+ASYNC_URLCONF = async_urlconf()
+
+
+class AsyncReadViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.token = Token.objects.create(user=cls.user)
+        salt, sugar = create_ingredients('соль', 'сахар')
+        author = create_user('author')
+        cls.recipes = [
+            create_recipe(author, 'Солёный', {salt: 5}),
+            create_recipe(author, 'Сладкий', {sugar: 10, salt: 1}),
+        ]
+        Favorite.objects.create(user=cls.user, recipes=cls.recipes[0])
+
+    def get(self, url, **headers):
+        cache.clear()
+        response = api_client().get(url, **headers)
+        return response.status_code, response.json()
+
+    def assert_same_responses(self, url, **headers):
+        sync = self.get(url, **headers)
+        with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+            self.assertEqual(self.get(url, **headers), sync)
+        return sync
+
+    def test_async_views_match_sync(self):
+        self.assertIs(
+            resolve('/api/recipes/', ASYNC_URLCONF).func.view_class,
+            RecipeListView,
+        )
+        recipe = self.recipes[1].pk
+        urls = (
+            '/api/recipes/',
+            '/api/recipes/?is_favorited=1',
+            f'/api/recipes/{recipe}/',
+            '/api/recipes/999/',
+            '/api/ingredients/',
+            '/api/ingredients/?name=со',
+        )
+        users = {
+            'anonymous': {},
+            'token': {'HTTP_AUTHORIZATION': f'Token {self.token.key}'},
+        }
+        for user, headers in users.items():
+            for url in urls:
+                with self.subTest(user=user, url=url):
+                    self.assert_same_responses(url, **headers)
+        status, body = self.assert_same_responses(
+            '/api/recipes/?is_favorited=1', **users['token']
+        )
+        self.assertEqual(
+            [item['id'] for item in body['results']], [self.recipes[0].pk]
+        )
+
+    def test_invalid_token_is_rejected_alike(self):
+        status, _ = self.assert_same_responses(
+            '/api/recipes/', HTTP_AUTHORIZATION='Token missing'
+        )
+        self.assertEqual(status, 401)
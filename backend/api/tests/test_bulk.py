@@ -0,0 +1,60 @@
+from django.test import TestCase
+
+from api.serializers import MAX_BULK_IDS
+from recipes.models import Cart, Favorite
+from recipes.tests.factories import api_client, create_recipes, create_user
+
+
+class BulkLinksTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.recipes = [recipe.pk for recipe in create_recipes(self.user, 3)]
+        self.client = api_client(self.user)
+
+    def statuses(self, method, url, ids):
+        response = getattr(self.client, method)(
+            url, {'ids': ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()['results']
+        return [(item['id'], item['status']) for item in results]
+
+    def test_statuses_per_id(self):
+        first, second, third = self.recipes
+        for model, action in ((Favorite, 'favorite'), (Cart, 'shopping_cart')):
+            url = f'/api/recipes/{action}/'
+            with self.subTest(url=url):
+                self.client.post(f'/api/recipes/{first}/{action}/')
+                self.assertEqual(
+                    self.statuses('post', url, [first, second, 999, second]),
+                    [
+                        (first, 'already_added'),
+                        (second, 'added'),
+                        (999, 'not_found'),
+                    ],
+                )
+                self.assertEqual(
+                    set(
+                        model.objects.filter(user=self.user).values_list(
+                            'recipes', flat=True
+                        )
+                    ),
+                    {first, second},
+                )
+                self.assertEqual(
+                    self.statuses('delete', url, [second, third, 999]),
+                    [
+                        (second, 'removed'),
+                        (third, 'not_added'),
+                        (999, 'not_found'),
+                    ],
+                )
+
+    def test_invalid_payloads(self):
+        url = '/api/recipes/favorite/'
+        for ids in ([], [0], ['x'], list(range(1, MAX_BULK_IDS + 2))):
+            with self.subTest(ids=ids[:3]):
+                response = self.client.post(url, {'ids': ids}, format='json')
+                self.assertEqual(response.status_code, 400)
+        response = api_client().post(url, {'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, 401)
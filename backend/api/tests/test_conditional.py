@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.tests.factories import (
+    api_client,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.recipe = create_recipe(create_user('author'))
+        self.tag, = create_tags('breakfast')
+
+    def assert_revalidates(self, client, url):
+        """Повтор с If-None-Match даёт 304; возвращает ETag."""
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        return etag
+
+    def test_catalog_etag_follows_table_version(self):
+        client = api_client()
+        for url in ('/api/tags/', f'/api/tags/{self.tag.pk}/'):
+            etag = self.assert_revalidates(client, url)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.tag.name = 'Завтрак'
+                self.tag.save()
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+        self.assert_revalidates(client, '/api/ingredients/')
+
+    def test_recipe_etag_follows_recipe_and_viewer(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        client = api_client(self.user)
+        etag = self.assert_revalidates(client, url)
+        client.post(f'{url}favorite/')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_favorited'])
+        etag = self.assert_revalidates(client, url)
+        self.recipe.name = 'Новое название'
+        self.recipe.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Новое название')
+
+    def test_anonymous_last_modified(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        response = api_client().get(url)
+        response = api_client().get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+        response = api_client().get('/api/recipes/999/')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,125 @@
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.models import IngredientInRecipe
+from recipes.tests.factories import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+from utils.recipe_index import RecipeIngredientIndex, cook_index
+
+
+class RecipeIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = create_user('author')
+        self.salt, self.sugar, self.milk, self.egg = create_ingredients(
+            'соль', 'сахар', 'молоко', 'яйцо'
+        )
+        self.omelette = create_recipe(
+            self.author, 'Омлет', {self.egg: 2, self.milk: 1, self.salt: 1}
+        )
+        self.porridge = create_recipe(
+            self.author, 'Каша', {self.milk: 2, self.sugar: 1}
+        )
+        self.salad = create_recipe(self.author, 'Салат', {self.salt: 1})
+
+    def assert_same_index(self, snapshot, expected):
+        for key in ('recipes', 'ingredients', 'recipe_ids', 'sizes'):
+            np.testing.assert_array_equal(snapshot[key], expected[key])
+        self.assertEqual(set(snapshot['postings']), set(expected['postings']))
+        for ingredient, posting in expected['postings'].items():
+            np.testing.assert_array_equal(
+                snapshot['postings'][ingredient], posting
+            )
+
+    def test_apply_matches_build(self):
+        snapshot = RecipeIngredientIndex.build(0)
+        IngredientInRecipe.objects.filter(
+            recipes=self.omelette, ingredient=self.salt
+        ).delete()
+        IngredientInRecipe.objects.create(
+            recipes=self.porridge, ingredient=self.salt, amount=1
+        )
+        soup = create_recipe(self.author, 'Суп', {self.salt: 2, self.egg: 1})
+        changed = {self.omelette.pk, self.porridge.pk, self.salad.pk, soup.pk}
+        self.salad.delete()
+        self.assert_same_index(
+            RecipeIngredientIndex.apply(snapshot, 1, changed | {999}),
+            RecipeIngredientIndex.build(1),
+        )
+
+    def test_sync_applies_recorded_changes(self):
+        index = RecipeIngredientIndex()
+        before = index.get_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientInRecipe.objects.filter(recipes=self.porridge).delete()
+            self.porridge.save()
+        after = index.get_snapshot()
+        self.assertGreater(after['sequence'], before['sequence'])
+        self.assert_same_index(after, RecipeIngredientIndex.build(0))
+        self.assertIs(
+            after['postings'][self.egg.pk], before['postings'][self.egg.pk]
+        )
+
+
+class CookEndpointTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        cook_index.snapshot = None
+        author = create_user('author')
+        self.salt, self.sugar, self.milk, self.egg = create_ingredients(
+            'соль', 'сахар', 'молоко', 'яйцо'
+        )
+        self.omelette = create_recipe(
+            author, 'Омлет', {self.egg: 2, self.milk: 1, self.salt: 1}
+        )
+        self.porridge = create_recipe(
+            author, 'Каша', {self.milk: 2, self.sugar: 1}
+        )
+        self.salad = create_recipe(author, 'Салат', {self.salt: 1})
+        self.pancakes = create_recipe(
+            author, 'Блины', {self.egg: 1, self.milk: 1, self.sugar: 1}
+        )
+
+    def cook(self, *ingredients, **params):
+        response = api_client().get(
+            '/api/recipes/cook/',
+            {'ingredients': [item.pk for item in ingredients], **params},
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return [
+            (item['id'], item['matched_count'], item['missing_count'])
+            for item in response.data['results']
+        ]
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.cook(self.salt, self.milk, self.egg),
+            [
+                (self.omelette.pk, 3, 0),
+                (self.salad.pk, 1, 0),
+                (self.pancakes.pk, 2, 1),
+                (self.porridge.pk, 1, 1),
+            ],
+        )
+
+    def test_limit_and_max_missing(self):
+        self.assertEqual(
+            self.cook(self.milk, self.egg, limit=1), [(self.pancakes.pk, 2, 1)]
+        )
+        self.assertEqual(self.cook(self.milk, self.egg, max_missing=0), [])
+        self.assertEqual(
+            self.cook(self.milk, max_missing=1),
+            [(self.porridge.pk, 1, 1)],
+        )
+        self.assertEqual(self.cook(create_ingredients('мука')[0]), [])
+
+    def test_invalid_parameters(self):
+        for params in ({}, {'ingredients': 'соль'}, {'limit': 0}):
+            with self.subTest(params=params):
+                response = api_client().get('/api/recipes/cook/', params)
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Cart, Favorite, Recipe
+from recipes.tests.factories import (
+    api_client,
+    create_recipe,
+    create_recipes,
+    create_user,
+)
+from users.models import Subscription, User
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.user = create_user()
+        self.recipes = create_recipes(self.author, 3)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.client = api_client(self.user)
+
+    def counters(self):
+        return {
+            'recipes': list(
+                Recipe.objects.order_by('pk').values_list(
+                    'favorites_count', 'carts_count'
+                )
+            ),
+            'users': list(
+                User.objects.order_by('pk').values_list(
+                    'recipes_count', 'followers_count'
+                )
+            ),
+        }
+
+    def assert_counters_match_rows(self):
+        """Счётчики совпадают с пересчётом по самим связям."""
+        maintained = self.counters()
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(maintained, self.counters())
+
+    def test_counters_follow_links(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        post, delete = self.client.post, self.client.delete
+        post(f'/api/recipes/{first}/favorite/')
+        post(f'/api/recipes/{first}/favorite/')
+        post(f'/api/recipes/{second}/shopping_cart/')
+        post(
+            '/api/recipes/favorite/',
+            {'ids': [first, second, third]},
+            format='json',
+        )
+        delete('/api/recipes/favorite/', {'ids': [third, 999]}, format='json')
+        delete(f'/api/recipes/{second}/shopping_cart/')
+        delete(f'/api/recipes/{second}/shopping_cart/')
+        post(f'/api/users/{self.author.pk}/subscribe/')
+        post(f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(
+            self.counters()['recipes'], [(1, 0), (1, 0), (0, 0)]
+        )
+        self.assert_counters_match_rows()
+        delete(f'/api/users/{self.author.pk}/subscribe/')
+        self.assert_counters_match_rows()
+
+    def test_full_save_keeps_counters(self):
+        recipe = self.recipes[0]
+        stale = Recipe.objects.get(pk=recipe.pk)
+        self.client.post(f'/api/recipes/{recipe.pk}/favorite/')
+        stale.name = 'Новое название'
+        stale.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 1)
+        author = User.objects.get(pk=self.author.pk)
+        self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        author.set_password('new-password')
+        author.save()
+        author.refresh_from_db()
+        self.assertEqual(author.followers_count, 1)
+
+    def test_orm_writes_keep_counters(self):
+        """Записи в обход API: ORM и каскадное удаление пользователя."""
+        first, second, _ = self.recipes
+        create_recipe(self.author, 'Ещё рецепт')
+        Favorite.objects.create(user=self.user, recipes=first)
+        Cart.objects.create(user=self.user, recipes=second)
+        Subscription.objects.create(user=self.user, author=self.author)
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (self.author.recipes_count, self.author.followers_count), (4, 1)
+        )
+        self.assert_counters_match_rows()
+        Favorite.objects.filter(user=self.user).delete()
+        self.assert_counters_match_rows()
+        Favorite.objects.create(user=self.user, recipes=second)
+        self.user.delete()
+        self.assert_counters_match_rows()
+        first.delete()
+        self.assert_counters_match_rows()
@@ -0,0 +1,84 @@
+import re
+
+from django.test import TestCase
+
+from recipes.models import Cart
+from recipes.tests.factories import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListDownloadTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        author = create_user('author')
+        salt, sugar = create_ingredients('соль', 'сахар')
+        for amounts in ({salt: 5, sugar: 10}, {salt: 3}):
+            Cart.objects.create(
+                user=self.user, recipes=create_recipe(author, amounts=amounts)
+            )
+        self.client = api_client(self.user)
+
+    def download(self, file_format):
+        response = self.client.get(URL, {'format': file_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn(
+            f'viewer_shopping_list.{file_format}',
+            response['Content-Disposition'],
+        )
+        return response, b''.join(response.streaming_content)
+
+    def test_text(self):
+        response, content = self.download('txt')
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(
+            content.decode(), 'Список покупок:\nсахар: 10 г\nсоль: 8 г\n'
+        )
+
+    def test_csv(self):
+        response, content = self.download('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            content.decode('utf-8-sig').splitlines(),
+            [
+                'Ингредиент,Количество,Единица измерения',
+                'сахар,10,г',
+                'соль,8,г',
+            ],
+        )
+
+    def test_pdf_is_written_page_by_page(self):
+        Cart.objects.create(
+            user=self.user,
+            recipes=create_recipe(
+                create_user('chef'),
+                amounts={
+                    ingredient: 1
+                    for ingredient in create_ingredients(
+                        *(f'специя {number}' for number in range(120))
+                    )
+                },
+            ),
+        )
+        response = self.client.get(URL, {'format': 'pdf'})
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 2)
+        content = b''.join(chunks)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertTrue(content.rstrip().endswith(b'%%EOF'))
+        pages = int(re.search(rb'/Count (\d+)', content).group(1))
+        self.assertGreater(pages, 1)
+
+    def test_errors_use_requested_format(self):
+        response = api_client().get(URL, {'format': 'csv'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        response = self.client.get(URL, {'format': 'doc'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.tests.factories import (
+    api_client,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+
+
+class TagFilterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        breakfast, dinner, _ = create_tags('breakfast', 'dinner', 'party')
+        cls.recipes = {}
+        for name, tags in (
+            ('breakfast', (breakfast,)),
+            ('dinner', (dinner,)),
+            ('both', (breakfast, dinner)),
+            ('untagged', ()),
+        ):
+            cls.recipes[name] = create_recipe(author, name)
+            cls.recipes[name].tags.set(tags)
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client().get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['count'], len(body['results']))
+        self.assertTrue(
+            all('DISTINCT' not in executed['sql'] for executed in queries)
+        )
+        return sorted(recipe['id'] for recipe in body['results'])
+
+    def expected(self, *names):
+        return sorted(self.recipes[name].pk for name in names)
+
+    def test_any_of_the_tags_without_duplicates(self):
+        self.assertEqual(
+            self.ids('tags=breakfast'), self.expected('breakfast', 'both')
+        )
+        self.assertEqual(
+            self.ids('tags=breakfast&tags=dinner'),
+            self.expected('breakfast', 'dinner', 'both'),
+        )
+        self.assertEqual(self.ids('tags=party'), [])
+        self.assertEqual(len(self.ids('')), len(self.recipes))
+
+    def test_unknown_tag_is_rejected(self):
+        response = api_client().get('/api/recipes/?tags=missing')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import cache as recipe_cache
+from api.serializers import RecipeFragmentSerializer
+from recipes.models import IngredientInRecipe, Recipe
+from recipes.tests.factories import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+class RecipeFragmentCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.recipe = create_recipe(create_user('author'), 'Старое название')
+        self.client = api_client()
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def get(self):
+        return self.client.get(self.url).json()
+
+    def test_stale_fragment_written_after_change_is_not_served(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        fragment = dict(RecipeFragmentSerializer(stale).data)
+        self.assertEqual(self.get()['name'], 'Старое название')
+        self.recipe.name = 'Новое название'
+        self.recipe.save()
+        recipe_cache.set_fragments({stale: fragment})
+        self.assertEqual(self.get()['name'], 'Новое название')
+
+    def test_ingredient_change_refreshes_fragment(self):
+        self.assertEqual(self.get()['ingredients'], [])
+        IngredientInRecipe.objects.create(
+            recipes=self.recipe,
+            ingredient=create_ingredients('соль')[0],
+            amount=5,
+        )
+        self.assertEqual(
+            [item['amount'] for item in self.get()['ingredients']], [5]
+        )
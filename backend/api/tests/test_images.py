@@ -0,0 +1,92 @@
+import os
+from base64 import b64encode
+from io import BytesIO
+from tempfile import TemporaryDirectory
+
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.tests.factories import api_client, create_recipe, create_user
+from utils.images import render_derivatives, save_derivatives
+
+
+def encode_image(color):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+class RecipeImageTest(TestCase):
+    def setUp(self):
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        settings = override_settings(
+            MEDIA_ROOT=self.media, IMAGE_PROCESS_WORKERS=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = create_user('author')
+        self.recipe = create_recipe(self.author)
+        self.client = api_client(self.author)
+
+    def change_image(self, color, before_commit=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.pk}/',
+                {'image': encode_image(color)},
+                format='json',
+            )
+            if before_commit:
+                before_commit()
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+
+    def image_path(self):
+        return os.path.join(self.media, self.recipe.image.name)
+
+    def referenced_derivatives(self):
+        self.recipe.refresh_from_db()
+        return {
+            path
+            for variant in self.recipe.image_variants.values()
+            for key, path in variant.items()
+            if key != 'width'
+        }
+
+    def stored_derivatives(self):
+        directory = f'recipes/derivatives/{self.recipe.pk}'
+        return {
+            f'{directory}/{name}'
+            for name in os.listdir(os.path.join(self.media, directory))
+        }
+
+    def test_image_change_replaces_derivatives(self):
+        self.change_image('red')
+        first = self.referenced_derivatives()
+        self.assertTrue(first)
+        self.change_image('blue')
+        second = self.referenced_derivatives()
+        self.assertTrue(second)
+        self.assertFalse(first & second)
+        self.assertEqual(self.stored_derivatives(), second)
+
+    def test_derivatives_of_replaced_image_are_deleted(self):
+        self.change_image('red')
+        current = self.referenced_derivatives()
+        with open(self.image_path(), 'rb') as file:
+            derivatives = render_derivatives(file.read())
+        save_derivatives(
+            self.recipe.pk, 'recipes/images/replaced.png', derivatives
+        )
+        self.assertEqual(self.referenced_derivatives(), current)
+        self.assertEqual(self.stored_derivatives(), current)
+
+    def test_failed_build_does_not_fail_request(self):
+        def remove_image():
+            self.recipe.refresh_from_db()
+            os.remove(self.image_path())
+
+        with self.assertLogs('utils.images', 'ERROR'):
+            self.change_image('green', before_commit=remove_image)
+        self.assertEqual(self.recipe.image_variants, {})
@@ -0,0 +1,31 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.tests.factories import api_client, create_ingredients
+from utils.ingredient_index import MAX_RESULTS, ingredient_index
+
+
+class IngredientSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_ingredients(
+                'Сахар',
+                'Коричневый сахар',
+                *(f'Специя {number}' for number in range(MAX_RESULTS + 5)),
+            )
+
+    def names(self, query):
+        response = api_client().get('/api/ingredients/', {'name': query})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_results_are_capped(self):
+        self.assertEqual(len(self.names('')), MAX_RESULTS)
+        self.assertEqual(len(self.names('специя')), MAX_RESULTS)
+        self.assertEqual(len(ingredient_index.search('', limit=3)), 3)
+        self.assertEqual(len(ingredient_index.search('с', limit=3)), 3)
+
+    def test_prefix_matches_come_first(self):
+        self.assertEqual(self.names('сахар'), ['Сахар', 'Коричневый сахар'])
+        self.assertEqual(self.names('СПЕЦИЯ 3')[:2], ['Специя 3', 'Специя 30'])
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.models import Favorite, Recipe
+from recipes.tests.factories import api_client, create_recipes, create_user
+
+
+class RecipePaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.recipes = create_recipes(self.user, 7)
+        self.client = api_client(self.user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def walk(self, url):
+        """Проходит все страницы по ссылкам next и собирает id."""
+        ids = []
+        while url:
+            body = self.get(url)
+            ids.extend(recipe['id'] for recipe in body['results'])
+            url = body['next']
+        return ids
+
+    def test_cursor_walks_every_recipe_once(self):
+        expected = list(
+            Recipe.objects.order_by('-pub_date', '-id').values_list(
+                'pk', flat=True
+            )
+        )
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=3&count=false'), expected
+        )
+        self.assertEqual(self.walk('/api/recipes/?limit=3'), expected)
+
+    def test_cursor_walks_trending_ordering(self):
+        for number, recipe in enumerate(self.recipes):
+            recipe.trending_score = (number % 3) / 3
+            recipe.save(update_fields=('trending_score',))
+        expected = list(
+            Recipe.objects.order_by('-trending_score', '-id').values_list(
+                'pk', flat=True
+            )
+        )
+        self.assertEqual(
+            self.walk('/api/recipes/?ordering=trending&cursor=&limit=2'),
+            expected,
+        )
+        self.assertEqual(
+            self.walk('/api/recipes/?ordering=trending&limit=2'), expected
+        )
+
+    def test_cursor_uses_id_for_equal_pub_date(self):
+        Recipe.objects.update(pub_date=self.recipes[0].pub_date)
+        ids = self.walk('/api/recipes/?cursor=&limit=2')
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), len(self.recipes))
+
+    def test_stale_cached_count_does_not_hide_rows(self):
+        for recipe in self.recipes[:6]:
+            Favorite.objects.create(user=self.user, recipes=recipe)
+        body = self.get('/api/recipes/?is_favorited=1')
+        self.assertEqual(body['count'], 6)
+        Favorite.objects.create(user=self.user, recipes=self.recipes[6])
+        body = self.get('/api/recipes/?is_favorited=1')
+        self.assertEqual(len(body['results']), 6)
+        self.assertIsNotNone(body['next'])
+        self.assertEqual(body['count'], 7)
+        body = self.get('/api/recipes/?is_favorited=1&page=2')
+        self.assertEqual(
+            [recipe['id'] for recipe in body['results']],
+            [self.recipes[0].pk],
+        )
+        self.assertEqual(body['count'], 7)
+
+    def test_page_after_last_is_not_found(self):
+        response = self.client.get('/api/recipes/?page=3&limit=5')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,13 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class QueryPlansTest(TestCase):
+    def test_hot_queries_use_their_indexes(self):
+        output = StringIO()
+        call_command('check_query_plans', stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines)
+        self.assertFalse([line for line in lines if line.startswith('x ')])
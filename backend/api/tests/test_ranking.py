@@ -0,0 +1,37 @@
+from django.test import TestCase
+
+from recipes.models import Recipe
+from recipes.tests.factories import api_client, create_recipe, create_user
+
+
+class RecipeRankingTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.recipe = create_recipe(self.user)
+        self.client = api_client(self.user)
+
+    def scores(self):
+        self.recipe.refresh_from_db()
+        return self.recipe.trending_score, self.recipe.popular_score
+
+    def test_removal_keeps_scores(self):
+        favorite = f'/api/recipes/{self.recipe.pk}/favorite/'
+        bulk = {'ids': [self.recipe.pk]}
+        self.assertEqual(self.client.post(favorite).status_code, 201)
+        added = self.scores()
+        self.assertTrue(all(score > 0 for score in added))
+        self.client.delete(favorite)
+        self.assertEqual(self.scores(), added)
+        self.client.post('/api/recipes/favorite/', bulk, format='json')
+        added = self.scores()
+        self.client.delete('/api/recipes/favorite/', bulk, format='json')
+        self.assertEqual(self.scores(), added)
+        self.assertEqual(self.recipe.favorites_count, 0)
+
+    def test_full_save_keeps_scores(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        self.client.post(f'/api/recipes/{self.recipe.pk}/shopping_cart/')
+        added = self.scores()
+        stale.name = 'Новое название'
+        stale.save()
+        self.assertEqual(self.scores(), added)
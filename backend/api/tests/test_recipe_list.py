@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Cart, Favorite
+from recipes.tests.factories import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from users.models import Subscription
+
+
+class RecipeListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        authors = [create_user('author'), create_user('other')]
+        tags = create_tags('breakfast', 'dinner')
+        salt, sugar = create_ingredients('соль', 'сахар')
+        cls.recipes = []
+        for number in range(8):
+            recipe = create_recipe(
+                authors[number % 2], f'Рецепт {number}', {salt: 1, sugar: 2}
+            )
+            recipe.tags.set(tags[: number % 2 + 1])
+            cls.recipes.append(recipe)
+        Favorite.objects.create(user=cls.user, recipes=cls.recipes[0])
+        Cart.objects.create(user=cls.user, recipes=cls.recipes[1])
+        Subscription.objects.create(user=cls.user, author=authors[0])
+
+    def get(self, url, client):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()['results']
+
+    def test_query_count_does_not_grow_with_page(self):
+        for client in (api_client(), api_client(self.user)):
+            small, _ = self.get('/api/recipes/?limit=2', client)
+            large, results = self.get('/api/recipes/?limit=8', client)
+            self.assertEqual(len(results), 8)
+            self.assertEqual(small, large)
+
+    def test_viewer_flags(self):
+        _, results = self.get('/api/recipes/?limit=8', api_client(self.user))
+        flags = {
+            item['id']: (
+                item['is_favorited'],
+                item['is_in_shopping_cart'],
+                item['author']['is_subscribed'],
+            )
+            for item in results
+        }
+        first, second, third = (recipe.pk for recipe in self.recipes[:3])
+        self.assertEqual(flags[first], (True, False, True))
+        self.assertEqual(flags[second], (False, True, False))
+        self.assertEqual(flags[third], (False, False, True))
+        _, results = self.get('/api/recipes/?limit=8', api_client())
+        self.assertFalse(
+            any(
+                item['is_favorited']
+                or item['is_in_shopping_cart']
+                or item['author']['is_subscribed']
+                for item in results
+            )
+        )
+        self.assertEqual(
+            [len(item['ingredients']) for item in results], [2] * 8
+        )
@@ -0,0 +1,100 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import IngredientInRecipe, Recipe
+from recipes.tests.factories import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class RecipeUpdateTest(TestCase):
+    def setUp(self):
+        author = create_user('author')
+        self.salt, self.sugar, self.flour = create_ingredients(
+            'соль', 'сахар', 'мука'
+        )
+        self.breakfast, self.dinner = create_tags('breakfast', 'dinner')
+        self.recipe = create_recipe(
+            author, amounts={self.salt: 5, self.sugar: 10}
+        )
+        self.recipe.tags.set((self.breakfast,))
+        self.recipe.refresh_from_db()
+        self.client = api_client(author)
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def payload(self, **changes):
+        return {
+            'name': self.recipe.name,
+            'text': self.recipe.text,
+            'cooking_time': self.recipe.cooking_time,
+            'tags': [self.breakfast.pk],
+            'ingredients': [
+                {'id': self.salt.pk, 'amount': 5},
+                {'id': self.sugar.pk, 'amount': 10},
+            ],
+            **changes,
+        }
+
+    def patch(self, payload):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [
+            query['sql']
+            for query in queries
+            if query['sql'].lstrip().upper().startswith(WRITES)
+        ]
+
+    def rows(self):
+        return dict(
+            IngredientInRecipe.objects.filter(
+                recipes=self.recipe
+            ).values_list('ingredient', 'pk')
+        )
+
+    def test_unchanged_recipe_is_not_written(self):
+        updated_at = self.recipe.updated_at
+        self.assertEqual(self.patch(self.payload()), [])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.updated_at, updated_at)
+
+    def test_name_change_keeps_ingredient_rows(self):
+        rows = self.rows()
+        writes = self.patch(self.payload(name='Новое название'))
+        self.assertEqual(len(writes), 1)
+        self.assertIn(Recipe._meta.db_table, writes[0])
+        self.assertEqual(self.rows(), rows)
+
+    def test_only_changed_ingredients_and_tags_are_written(self):
+        rows = self.rows()
+        self.patch(
+            self.payload(
+                tags=[self.breakfast.pk, self.dinner.pk],
+                ingredients=[
+                    {'id': self.salt.pk, 'amount': 7},
+                    {'id': self.flour.pk, 'amount': 200},
+                ],
+            )
+        )
+        after = self.rows()
+        self.assertEqual(after[self.salt.pk], rows[self.salt.pk])
+        self.assertNotIn(self.sugar.pk, after)
+        self.assertEqual(
+            dict(
+                self.recipe.recipe_ingredients.values_list(
+                    'ingredient', 'amount'
+                )
+            ),
+            {self.salt.pk: 7, self.flour.pk: 200},
+        )
+        self.assertEqual(
+            set(self.recipe.tags.values_list('pk', flat=True)),
+            {self.breakfast.pk, self.dinner.pk},
+        )
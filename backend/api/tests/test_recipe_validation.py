@@ -0,0 +1,109 @@
+import base64
+from io import BytesIO
+from tempfile import TemporaryDirectory
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.tests.factories import (
+    api_client,
+    create_ingredients,
+    create_tags,
+    create_user,
+)
+
+
+def image_base64():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+class RecipeIdsValidationTest(TestCase):
+    def setUp(self):
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=media.name, IMAGE_PROCESS_WORKERS=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = api_client(create_user('author'))
+        self.salt, self.sugar = create_ingredients('соль', 'сахар')
+        self.breakfast, self.dinner = create_tags('breakfast', 'dinner')
+
+    def post(self, ingredients, tags):
+        return self.client.post(
+            '/api/recipes/',
+            {
+                'name': 'Омлет',
+                'text': 'Описание',
+                'cooking_time': 10,
+                'image': image_base64(),
+                'tags': tags,
+                'ingredients': [
+                    {'id': pk, 'amount': amount} for pk, amount in ingredients
+                ],
+            },
+            format='json',
+        )
+
+    def count_queries(self, captured, model):
+        table = connection.ops.quote_name(model._meta.db_table)
+        return sum(
+            f'FROM {table}' in query['sql']
+            for query in captured.captured_queries
+        )
+
+    def test_valid_ids_keep_order(self):
+        response = self.post(
+            [(self.sugar.pk, 3), (self.salt.pk, 1)],
+            [self.dinner.pk, self.breakfast.pk],
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(
+            dict(
+                recipe.recipe_ingredients.values_list(
+                    'ingredient_id', 'amount'
+                )
+            ),
+            {self.sugar.pk: 3, self.salt.pk: 1},
+        )
+        self.assertEqual(
+            set(recipe.tags.values_list('pk', flat=True)),
+            {self.breakfast.pk, self.dinner.pk},
+        )
+
+    def test_duplicate_and_unknown_ids_in_one_error(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.post(
+                [(self.salt.pk, 1), (999, 2), (self.salt.pk, 3), (998, 1)],
+                [self.breakfast.pk, self.breakfast.pk, 997],
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['ingredients'],
+            [f'Повторяются id: {self.salt.pk}.', 'Не найдены id: 998, 999.'],
+        )
+        self.assertEqual(
+            response.data['tags'],
+            [f'Повторяются id: {self.breakfast.pk}.', 'Не найдены id: 997.'],
+        )
+        self.assertEqual(self.count_queries(captured, Ingredient), 1)
+        self.assertEqual(self.count_queries(captured, Tag), 1)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_empty_lists_are_rejected(self):
+        response = self.post([], [])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['ingredients'], ['Нужно выбрать ингердиенты.']
+        )
+        self.assertEqual(
+            response.data['tags'], ['Нужно выбрать хотя бы один тег.']
+        )
@@ -0,0 +1,58 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from recipes.search import FTS_TABLE, restore_sqlite_triggers
+from recipes.tests.factories import api_client, create_recipe, create_user
+
+
+class RecipeSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = create_user('author')
+        self.by_name = create_recipe(
+            author, 'Грибной суп', text='Варить полчаса.'
+        )
+        self.by_text = create_recipe(
+            author, 'Суп', text='Добавить грибной бульон.'
+        )
+        self.other = create_recipe(author, 'Омлет', text='Взбить яйца.')
+
+    def search(self, text):
+        cache.clear()
+        response = api_client().get('/api/recipes/', {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_ranks_above_text(self):
+        self.assertEqual(
+            self.search('грибной'), [self.by_name.pk, self.by_text.pk]
+        )
+        self.assertEqual(
+            self.search('суп грибной'), [self.by_name.pk, self.by_text.pk]
+        )
+        self.assertEqual(self.search('яйца'), [self.other.pk])
+
+    def test_no_match(self):
+        self.assertEqual(self.search('торт'), [])
+        self.assertEqual(self.search('суп торт'), [])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_index_follows_changes(self):
+        self.other.name = 'Торт'
+        self.other.save()
+        self.assertEqual(self.search('торт'), [self.other.pk])
+        self.assertEqual(self.search('омлет'), [])
+        self.by_name.delete()
+        self.assertEqual(self.search('грибной'), [self.by_text.pk])
+
+    @skipUnless(connection.vendor == 'sqlite', 'триггеры FTS5 есть в SQLite')
+    def test_sqlite_triggers_are_restored(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {FTS_TABLE}_au')
+        restore_sqlite_triggers(connection.alias)
+        self.other.name = 'Торт'
+        self.other.save()
+        self.assertEqual(self.search('торт'), [self.other.pk])
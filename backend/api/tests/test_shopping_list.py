@@ -0,0 +1,115 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+
+from recipes.models import Cart, ShoppingListItem
+from recipes.tests.factories import (
+    api_client,
+    create_ingredients,
+    create_recipe,
+    create_user,
+)
+
+
+class ShoppingListTest(TestCase):
+    def setUp(self):
+        self.author = create_user('author')
+        self.user = create_user()
+        self.salt, self.sugar, self.flour = create_ingredients(
+            'соль', 'сахар', 'мука'
+        )
+        self.recipes = [
+            create_recipe(self.author, f'Рецепт {number}', amounts)
+            for number, amounts in enumerate(
+                ({self.salt: 5, self.sugar: 10}, {self.salt: 3})
+            )
+        ]
+        call_command('rebuild_counters', stdout=StringIO())
+        self.client = api_client(self.user)
+
+    def items(self):
+        return dict(
+            ShoppingListItem.objects.filter(user=self.user).values_list(
+                'ingredient__name', 'total_amount'
+            )
+        )
+
+    def assert_list_matches_cart(self):
+        """Список, собранный разностями, совпадает с пересчётом."""
+        maintained = self.items()
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        self.assertEqual(maintained, self.items())
+
+    def test_cart_changes(self):
+        first, second = (recipe.pk for recipe in self.recipes)
+        self.client.post(f'/api/recipes/{first}/shopping_cart/')
+        self.client.post(f'/api/recipes/{first}/shopping_cart/')
+        self.client.post(
+            '/api/recipes/shopping_cart/', {'ids': [second]}, format='json'
+        )
+        self.assertEqual(self.items(), {'соль': 8, 'сахар': 10})
+        self.assert_list_matches_cart()
+        self.client.delete(f'/api/recipes/{first}/shopping_cart/')
+        self.assertEqual(self.items(), {'соль': 3})
+        self.assert_list_matches_cart()
+        self.client.delete(
+            '/api/recipes/shopping_cart/', {'ids': [second]}, format='json'
+        )
+        self.assertEqual(self.items(), {})
+
+    def test_recipe_change_reaches_carts(self):
+        first, second = self.recipes
+        self.client.post(f'/api/recipes/{first.pk}/shopping_cart/')
+        self.client.post(f'/api/recipes/{second.pk}/shopping_cart/')
+        author = api_client(self.author)
+        response = author.patch(
+            f'/api/recipes/{first.pk}/',
+            {
+                'ingredients': [
+                    {'id': self.salt.pk, 'amount': 1},
+                    {'id': self.flour.pk, 'amount': 200},
+                ]
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.items(), {'соль': 4, 'мука': 200})
+        self.assert_list_matches_cart()
+        author.delete(f'/api/recipes/{second.pk}/')
+        self.assertEqual(self.items(), {'соль': 1, 'мука': 200})
+        self.assert_list_matches_cart()
+
+    def test_admin_changes_reach_lists(self):
+        first, second = self.recipes
+        admin = create_user('admin')
+        admin.is_staff = admin.is_superuser = True
+        admin.save()
+        client = Client()
+        client.force_login(admin)
+        for recipe in self.recipes:
+            response = client.post(
+                '/admin/recipes/cart/add/',
+                {'user': self.user.pk, 'recipes': recipe.pk},
+            )
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.items(), {'соль': 8, 'сахар': 10})
+        client.post(
+            '/admin/recipes/cart/',
+            {
+                'action': 'delete_selected',
+                '_selected_action': list(
+                    Cart.objects.filter(recipes=second).values_list(
+                        'pk', flat=True
+                    )
+                ),
+                'post': 'yes',
+            },
+        )
+        self.assertEqual(self.items(), {'соль': 5, 'сахар': 10})
+        self.assert_list_matches_cart()
+        client.post(
+            f'/admin/recipes/recipe/{first.pk}/delete/', {'post': 'yes'}
+        )
+        self.assertEqual(self.items(), {})
+        self.assertFalse(Cart.objects.exists())
@@ -0,0 +1,76 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import FeedEntry
+from recipes.tests.factories import (
+    api_client,
+    create_recipe,
+    create_recipes,
+    create_user,
+)
+from users.models import Subscription
+
+
+class SubscribeTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = api_client(self.user)
+
+    def feed(self):
+        return list(
+            FeedEntry.objects.filter(user=self.user)
+            .order_by('recipe_id')
+            .values_list('recipe', flat=True)
+        )
+
+    def test_cannot_subscribe_to_self(self):
+        for user_id in (self.user.pk, f'0{self.user.pk}'):
+            response = self.client.post(f'/api/users/{user_id}/subscribe/')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscription.objects.exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.followers_count, 0)
+
+    def test_feed_follows_subscriptions_and_new_recipes(self):
+        author = create_user('author')
+        old = create_recipe(author, 'Старый рецепт')
+        self.client.post(f'/api/users/{author.pk}/subscribe/')
+        self.assertEqual(self.feed(), [old.pk])
+        with self.captureOnCommitCallbacks() as callbacks:
+            new = create_recipe(author, 'Новый рецепт')
+        self.assertEqual(self.feed(), [old.pk])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.feed(), [old.pk, new.pk])
+        Subscription.objects.filter(user=self.user).delete()
+        self.assertEqual(self.feed(), [])
+
+    def test_subscriptions_page_with_recipes_limit(self):
+        authors = [create_user(f'author{number}') for number in range(4)]
+        for author in authors:
+            create_recipes(author, 3)
+            self.client.post(f'/api/users/{author.pk}/subscribe/')
+        sizes = []
+        for limit in (1, 4):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    '/api/users/subscriptions/',
+                    {'limit': limit, 'recipes_limit': 2},
+                )
+            sizes.append(len(queries))
+        self.assertEqual(sizes[0], sizes[1])
+        results = response.json()['results']
+        self.assertEqual(
+            [item['username'] for item in results],
+            [author.username for author in reversed(authors)],
+        )
+        for item in results:
+            self.assertEqual(item['recipes_count'], 3)
+            self.assertTrue(item['is_subscribed'])
+            self.assertEqual(
+                [recipe['name'] for recipe in item['recipes']],
+                ['Рецепт 2', 'Рецепт 1'],
+            )
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(len(response.json()['results'][0]['recipes']), 3)
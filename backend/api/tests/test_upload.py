@@ -0,0 +1,101 @@
+import json
+from io import BytesIO
+from tempfile import TemporaryDirectory
+
+from django.core.files.uploadedfile import (
+    SimpleUploadedFile,
+    TemporaryUploadedFile,
+)
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import Recipe
+from recipes.tests.factories import (
+    api_client,
+    create_ingredients,
+    create_tags,
+    create_user,
+)
+from utils.parsers import MultiPartJSONParser
+
+
+def image_file(name='photo.jpg', image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), 'red').save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class MultipartUploadTest(TestCase):
+    def setUp(self):
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=media.name, IMAGE_PROCESS_WORKERS=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = api_client(create_user('author'))
+        self.salt, = create_ingredients('соль')
+        self.tag, = create_tags('breakfast')
+
+    def post(self, data, **files):
+        return self.client.post(
+            '/api/recipes/',
+            {'data': json.dumps(data), **files},
+            format='multipart',
+        )
+
+    def recipe_data(self):
+        return {
+            'name': 'Омлет',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': [self.tag.pk],
+            'ingredients': [{'id': self.salt.pk, 'amount': 2}],
+        }
+
+    def test_create_and_update_with_files(self):
+        response = self.post(self.recipe_data(), image=image_file())
+        self.assertEqual(response.status_code, 201, response.content)
+        recipe = Recipe.objects.get(pk=response.json()['id'])
+        self.assertTrue(recipe.image.name.endswith('.jpg'))
+        self.assertEqual(
+            list(recipe.recipe_ingredients.values_list('amount', flat=True)),
+            [2],
+        )
+        response = self.client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {'image': image_file('photo.png', 'PNG')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        recipe.refresh_from_db()
+        self.assertTrue(recipe.image.name.endswith('.png'))
+        self.assertEqual(recipe.name, 'Омлет')
+
+    def test_invalid_parts_are_rejected(self):
+        response = self.client.post(
+            '/api/recipes/',
+            {'data': '{', 'image': image_file()},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.post(
+            self.recipe_data(),
+            image=SimpleUploadedFile('photo.jpg', b'not an image'),
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_files_are_spooled_to_disk(self):
+        request = APIRequestFactory().post(
+            '/api/recipes/',
+            {'data': json.dumps({'name': 'Омлет'}), 'image': image_file()},
+            format='multipart',
+        )
+        data = Request(request, parsers=[MultiPartJSONParser()]).data
+        self.assertEqual(data['name'], 'Омлет')
+        self.assertIsInstance(data['image'], TemporaryUploadedFile)
@@ -1,6 +1,14 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import (
+    IngredientView,
+    RecipeDetailView,
+    RecipeListView,
+    SubscriptionsView,
+    TagView,
+)
 from api.views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 app_name = "api"
@@ -10,8 +18,25 @@ router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('users', UserViewSet, basename='users')
 
+ASYNC_VIEWS = (
+    ('tags/', TagView, 'tags-list'),
+    ('tags/<int:pk>/', TagView, 'tags-detail'),
+    ('ingredients/', IngredientView, 'ingredients-list'),
+    ('ingredients/<int:pk>/', IngredientView, 'ingredients-detail'),
+    ('recipes/', RecipeListView, 'recipes-list'),
+    ('recipes/<int:pk>/', RecipeDetailView, 'recipes-detail'),
+    ('users/subscriptions/', SubscriptionsView, 'users-subscriptions'),
+)
+
 urlpatterns = [
     path('', include(router.urls)),
     # path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    fallbacks = {url.name: url.callback for url in router.urls}
+    urlpatterns = [
+        path(route, view.as_view(fallback=fallbacks[name]))
+        for route, view, name in ASYNC_VIEWS
+    ] + urlpatterns
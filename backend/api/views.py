@@ -1,41 +1,83 @@
-from django.db.models import Sum
-from django.http.response import HttpResponse
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.transaction import atomic
+from django.http import Http404
+from django.http.response import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.utils.http import content_disposition_header
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ModelViewSet
 
 from api.mixins import CustomMixin
 from api.serializers import (
+    CookSerializer,
     CreatRecipeSerializer,
     IngredientSerializer,
-    ReadCartSerializer,
-    ReadFavoriteSerializer,
     ReadRecipeSerializer,
+    RecipeForListSerializer,
+    RecipeIdsSerializer,
+    ShoppingListItemSerializer,
     SubscribeSerializer,
     TagSerializer,
+    get_recipes_limit,
+    get_similar_limit,
 )
 from recipes.models import (
     Cart,
     Favorite,
+    FeedEntry,
     Ingredient,
-    IngredientInRecipe,
     Recipe,
+    ShoppingListItem,
     Tag,
 )
 from users.models import Subscription, User
+from utils.conditional import (
+    catalog_etag,
+    catalog_last_modified,
+    recipe_etag,
+    recipe_last_modified,
+)
 from utils.filters import IngredientFilter, RecipeFilter
-from utils.paginators import PageLimitPagination
+from utils.ingredient_index import ingredient_index
+from utils.paginators import (
+    FeedPagination,
+    PageLimitPagination,
+    RecipePagination,
+)
+from utils.parsers import MultiPartJSONParser
 from utils.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
+from utils.recipe_index import cook_index
+from utils.renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
+
+FAVORITE_EXISTS = 'Рецепт уже добавлен в избранные.'
+CART_EXISTS = 'Рецепт уже в корзине.'
+
+ADDED = 'added'
+ALREADY_ADDED = 'already_added'
+REMOVED = 'removed'
+NOT_ADDED = 'not_added'
+NOT_FOUND = 'not_found'
 
 
 class UserViewSet(UserViewSet):
     """Вьюсет для работы с пользователями."""
 
+    lookup_value_regex = r'\d+'
+
     def get_permissions(self):
         if self.action == 'me':
             return (permissions.IsAuthenticated(),)
@@ -45,52 +87,73 @@ class UserViewSet(UserViewSet):
     def subscriptions(self, request):
         """Метод для возвращения подпискок пользователя."""
         user = request.user
-        subscriptions = user.follower.all()
+        subscriptions = user.follower.select_related('author').order_by('-id')
         paginator = PageLimitPagination()
         result_page = paginator.paginate_queryset(subscriptions, request)
+        recipes = defaultdict(list)
+        for recipe in Recipe.objects.latest_by_author(
+            [subscription.author_id for subscription in result_page],
+            get_recipes_limit(request),
+        ):
+            recipes[recipe.author_id].append(recipe)
         serializer = SubscribeSerializer(
-            result_page, many=True, context={'request': request}
+            result_page,
+            many=True,
+            context={'request': request, 'recipes': recipes},
         )
         return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post', 'delete'])
+    @atomic
     def subscribe(self, request, id=None):
         """Метод для создания/удаления подписки на автора."""
-        author = get_object_or_404(User, id=id)
+        user = request.user
 
         if request.method == 'POST':
-            if Subscription.objects.filter(
-                user=request.user, author=author
-            ).exists():
+            if user.pk == int(id):
+                return Response(
+                    {'errors': 'Невозможно подписаться на самого себя.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            author = Subscription.objects.link(user, id)
+            if not author:
+                get_object_or_404(User, id=id)
                 return Response(
                     {'errors': 'Вы уже подписаны на этого автора.'},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-
-            subscription = Subscription.objects.create(
-                user=request.user, author=author
-            )
             serializer = SubscribeSerializer(
-                subscription, context={'request': request}
+                Subscription(user=user, author=author),
+                context={'request': request},
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
-            if not Subscription.objects.filter(
-                user=request.user, author=author
-            ).exists():
+            if not Subscription.objects.unlink(user, id):
+                get_object_or_404(User, id=id)
                 return Response(
                     {'errors': 'Подписка не существует.'},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            Subscription.objects.filter(
-                user=request.user, author=author
-            ).delete()
             return Response(
                 status=status.HTTP_204_NO_CONTENT,
             )
 
 
+def catalog_condition(model):
+    return method_decorator(
+        (
+            cache_control(no_cache=True),
+            condition(
+                etag_func=catalog_etag(model),
+                last_modified_func=catalog_last_modified(model),
+            ),
+        ),
+        name='dispatch',
+    )
+
+
+@catalog_condition(Tag)
 class TagViewSet(CustomMixin):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
@@ -98,6 +161,7 @@ class TagViewSet(CustomMixin):
     pagination_class = None
 
 
+@catalog_condition(Ingredient)
 class IngredientViewSet(CustomMixin):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -106,80 +170,270 @@ class IngredientViewSet(CustomMixin):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Отвечает на автодополнение из индекса в памяти, без запроса к БД."""
+        return Response(
+            ingredient_index.search(request.query_params.get('name', ''))
+        )
+
 
 class RecipeViewSet(ModelViewSet):
-    queryset = Recipe.objects.all()
     permission_classes = [
         IsAuthorOrReadOnly,
     ]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = PageLimitPagination
+    pagination_class = RecipePagination
+    parser_classes = (JSONParser, MultiPartJSONParser)
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        return Recipe.objects.for_viewer(self.request.user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'feed', 'cook', 'similar'):
+            context['image_size'] = 'card'
+        return context
 
     def get_serializer_class(self):
         if self.request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
             return CreatRecipeSerializer
         return ReadRecipeSerializer
 
+    @method_decorator(
+        (
+            vary_on_headers('Authorization'),
+            cache_control(private=True, no_cache=True),
+            condition(
+                etag_func=recipe_etag, last_modified_func=recipe_last_modified
+            ),
+        )
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def _common_post(self, request, pk, serializer_class):
-        recipes = get_object_or_404(Recipe, pk=pk)
-        data = {
-            'user': request.user.id,
-            'recipes': recipes.id,
-        }
-        serializer = serializer_class(data=data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+    @atomic
+    def _add_link(self, request, pk, model, message):
+        """
+        Связывает рецепт с пользователем одним INSERT ... ON CONFLICT.
+
+        Причина неудачи (нет рецепта или связь уже есть) выясняется
+        только при неудаче.
+        """
+        recipe = model.objects.link(request.user, pk)
+        if not recipe:
+            get_object_or_404(Recipe.objects.order_by(), pk=pk)
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+            )
+        serializer = RecipeForListSerializer(
+            recipe, context={'request': request}
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @atomic
+    def _remove_link(self, request, pk, model):
+        if not model.objects.unlink(request.user, pk):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _bulk_change(self, request, model, add):
+        """
+        Добавляет (add=True) или удаляет связи пользователя сразу
+        с несколькими рецептами. Отвечает статусом по каждому id.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        found = set(
+            Recipe.objects.filter(pk__in=ids)
+            .order_by()
+            .values_list('pk', flat=True)
+        )
+        if add:
+            changed = model.objects.link_many(request.user, found)
+            statuses = (ADDED, ALREADY_ADDED)
+        else:
+            changed = model.objects.unlink_many(request.user, found)
+            statuses = (REMOVED, NOT_ADDED)
+        status_of = dict.fromkeys(found, statuses[1])
+        status_of.update(dict.fromkeys(changed, statuses[0]))
+        results = [
+            {'id': pk, 'status': status_of.get(pk, NOT_FOUND)} for pk in ids
+        ]
+        return Response({'results': results})
+
+    @action(
+        detail=False,
+        methods=('POST',),
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    @atomic
+    def bulk_favorite(self, request):
+        """Добавляет в избранное несколько рецептов."""
+        return self._bulk_change(request, Favorite, True)
+
+    @bulk_favorite.mapping.delete
+    @atomic
+    def bulk_destroy_favorite(self, request):
+        return self._bulk_change(request, Favorite, False)
+
+    @action(
+        detail=False,
+        methods=('POST',),
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    @atomic
+    def bulk_shopping_cart(self, request):
+        """Добавляет в корзину несколько рецептов."""
+        return self._bulk_change(request, Cart, True)
+
+    @bulk_shopping_cart.mapping.delete
+    @atomic
+    def bulk_destroy_shopping_cart(self, request):
+        return self._bulk_change(request, Cart, False)
+
     @action(detail=True, methods=('POST',))
     def favorite(self, request, pk):
-        return self._common_post(request, pk, ReadFavoriteSerializer)
+        return self._add_link(request, pk, Favorite, FAVORITE_EXISTS)
 
     @favorite.mapping.delete
     def destroy_favorite(self, request, pk):
-        favorite_list = get_object_or_404(
-            Favorite,
-            user=request.user,
-            recipes=get_object_or_404(Recipe, id=pk),
-        )
-        favorite_list.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self._remove_link(request, pk, Favorite)
 
     @action(detail=True, methods=('POST',))
     def shopping_cart(self, request, pk):
-        return self._common_post(request, pk, ReadCartSerializer)
+        return self._add_link(request, pk, Cart, CART_EXISTS)
 
     @shopping_cart.mapping.delete
     def destroy_shopping_cart(self, request, pk):
-        cart_list = get_object_or_404(Cart, user=request.user, recipes__id=pk)
-        cart_list.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self._remove_link(request, pk, Cart)
+
+    @action(
+        detail=False,
+        methods=('GET',),
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        paginator = FeedPagination()
+        entries = paginator.paginate_queryset(
+            FeedEntry.objects.filter(user=request.user).order_by(
+                '-pub_date', '-recipe_id'
+            ),
+            request,
+        )
+        recipes = self.get_queryset().in_bulk(
+            [entry.recipe_id for entry in entries]
+        )
+        serializer = ReadRecipeSerializer(
+            [recipes[entry.recipe_id] for entry in entries],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=('GET',))
+    def similar(self, request, pk):
+        """
+        Рецепты, которые чаще всего добавляют в избранное и корзину
+        вместе с этим. Соседи рассчитываются заранее командой
+        build_similar_recipes, здесь они только читаются по индексу.
+        """
+        recipes = list(
+            self.get_queryset().neighbours_of(pk)[: get_similar_limit(request)]
+        )
+        if not recipes:
+            get_object_or_404(Recipe.objects.order_by(), pk=pk)
+        serializer = ReadRecipeSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        )
+        return Response({'results': serializer.data})
 
     @action(detail=False, methods=('GET',))
+    def cook(self, request):
+        """
+        Подбирает рецепты по имеющимся ингредиентам (?ingredients=id,
+        параметр повторяется). Рецепты ищутся в инвертированном индексе
+        в памяти, из базы читаются только найденные.
+        """
+        serializer = CookSerializer(
+            data={
+                **request.query_params.dict(),
+                'ingredients': request.query_params.getlist('ingredients'),
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        matches = cook_index.cook(**serializer.validated_data)
+        recipes = self.get_queryset().in_bulk([pk for pk, *_ in matches])
+        matches = [match for match in matches if match[0] in recipes]
+        data = ReadRecipeSerializer(
+            [recipes[pk] for pk, *_ in matches],
+            many=True,
+            context=self.get_serializer_context(),
+        ).data
+        return Response(
+            {
+                'results': [
+                    {
+                        **item,
+                        'matched_count': matched,
+                        'missing_count': missing,
+                    }
+                    for item, (_, matched, missing) in zip(data, matches)
+                ]
+            }
+        )
+
+    @action(
+        detail=False,
+        methods=('GET',),
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def shopping_list(self, request):
+        """Возвращает список покупок без скачивания файла."""
+        items = (
+            ShoppingListItem.objects.filter(user=request.user)
+            .select_related('ingredient')
+            .order_by('ingredient__name', 'ingredient__measurement_unit')
+        )
+        return Response(ShoppingListItemSerializer(items, many=True).data)
+
+    @action(
+        detail=False,
+        methods=('GET',),
+        permission_classes=(permissions.IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, PDFRenderer),
+    )
     def download_shopping_cart(self, request):
-        text = 'Список покупок:'
+        """
+        Отдаёт список покупок в формате txt, csv или pdf (?format=).
+
+        Строки читаются курсором на стороне сервера и сразу уходят
+        клиенту, поэтому память не зависит от размера списка.
+        """
         user = request.user
-        filename = f'{user.username}_shopping_list.txt'
-        ingredients = (
-            IngredientInRecipe.objects.filter(recipes__cart_list__user=user)
-            .values(
-                'ingredient__name',
-                'ingredient__measurement_unit',
-            )
-            .annotate(amount=Sum('amount'))
+        renderer = request.accepted_renderer
+        ingredients = ShoppingListItem.objects.for_download(user).iterator(
+            chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE
         )
-        text += '\n'.join(
-            [
-                f'{ingredient.get("ingredient__name")}: '
-                f'{ingredient.get("amount")} '
-                f'{ingredient.get("ingredient__measurement_unit")}'
-                for ingredient in ingredients
-            ]
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        return StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=content_type,
+            headers={
+                'Content-Disposition': content_disposition_header(
+                    True, f'{user.username}_shopping_list.{renderer.format}'
+                )
+            },
         )
-        response = HttpResponse(text, content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename={filename}'
-        return response
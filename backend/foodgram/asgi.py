@@ -1,7 +1,30 @@
 import os
+from asyncio import Semaphore
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', 'true')
 
-application = get_asgi_application()
+
+class ConcurrencyLimit:
+    """
+    Обрабатывает не больше limit HTTP-запросов процесса одновременно:
+    каждый запрос держит своё соединение с базой, остальные ждут.
+    """
+
+    def __init__(self, app, limit):
+        self.app = app
+        self.semaphore = Semaphore(limit)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        async with self.semaphore:
+            return await self.app(scope, receive, send)
+
+
+application = ConcurrencyLimit(
+    get_asgi_application(), settings.ASGI_MAX_CONCURRENCY
+)
@@ -62,6 +62,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'false').lower() in (
+    'true',
+    '1',
+)
+ASGI_MAX_CONCURRENCY = int(os.getenv('ASGI_MAX_CONCURRENCY', 20))
+
 if os.getenv('USE_SQLITE', 'false').lower() in ('true', '1'):
     DATABASES = {
         'default': {
@@ -81,6 +87,19 @@ else:
         }
     }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+RECIPE_FRAGMENT_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+)
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -123,6 +142,25 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 6,
 }
 
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 60)
+)
+
+SHOPPING_LIST_CHUNK_SIZE = int(os.getenv('SHOPPING_LIST_CHUNK_SIZE', 2000))
+
+RECIPE_TRENDING_HALF_LIFE = float(
+    os.getenv('RECIPE_TRENDING_HALF_LIFE', 60 * 60 * 24 * 2)
+)
+RECIPE_POPULAR_HALF_LIFE = float(
+    os.getenv('RECIPE_POPULAR_HALF_LIFE', 60 * 60 * 24 * 30)
+)
+
+IMAGE_PROCESS_WORKERS = int(os.getenv('IMAGE_PROCESS_WORKERS', 2))
+
+PDF_FONT_PATH = os.getenv(
+    'PDF_FONT_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 LANGUAGE_CODE = 'ru'
 
 TIME_ZONE = 'Europe/Moscow'
@@ -6,8 +6,10 @@ from recipes.models import (
     Ingredient,
     IngredientInRecipe,
     Recipe,
+    ShoppingListItem,
     Tag,
 )
+from utils.images import schedule_derivatives
 
 
 @register(Tag)
@@ -35,28 +37,64 @@ class RecipeAdmin(ModelAdmin):
     list_display = (
         'name',
         'author',
-        'is_favorited',
-        'is_in_shopping_cart',
         'image',
         'text',
         'cooking_time',
         'pub_date',
+        'favorites_count',
+        'carts_count',
     )
     list_filter = ('name', 'author__username', 'tags__name')
     search_fields = ('name', 'author__username', 'tags__name')
     inlines = (RecipeInIngredientAdmin,)
     save_on_top = True
 
+    def save_model(self, request, obj, form, change):
+        image_changed = 'image' in form.changed_data
+        stale_variants = obj.image_variants
+        if image_changed:
+            obj.image_variants = {}
+        super().save_model(request, obj, form, change)
+        if image_changed:
+            schedule_derivatives(obj, stale_variants)
+
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        before = ShoppingListItem.objects.amounts_of((recipe.pk,))
+        super().save_related(request, form, formsets, change)
+        ShoppingListItem.objects.change_recipe(
+            recipe, before, ShoppingListItem.objects.amounts_of((recipe.pk,))
+        )
+
+
+class LinkAdmin(ModelAdmin):
+    """
+    Связь пользователя с рецептом можно создать или удалить, но не
+    перенаправить: счётчики и список покупок меняются только при
+    создании и удалении записи.
+    """
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return super().get_readonly_fields(request, obj)
+        return ('user', 'recipes')
+
 
 @register(Favorite)
-class FavoriteAdmin(ModelAdmin):
+class FavoriteAdmin(LinkAdmin):
     list_display = ('user', 'recipes')
     list_filter = ('recipes__tags',)
     search_fields = ('recipes__name', 'user__username')
 
 
 @register(Cart)
-class CartAdmin(ModelAdmin):
+class CartAdmin(LinkAdmin):
     list_display = ('user', 'recipes')
     list_filter = ('recipes__tags',)
     search_fields = ('recipes__name', 'user__username')
+
+
+@register(ShoppingListItem)
+class ShoppingListItemAdmin(ModelAdmin):
+    list_display = ('user', 'ingredient', 'total_amount')
+    search_fields = ('ingredient__name', 'user__username')
@@ -0,0 +1,63 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from utils.images import render_derivatives, save_derivatives
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит уменьшенные копии изображений рецептов в WebP и JPEG '
+        'для рецептов, у которых их ещё нет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перестроить копии для всех рецептов.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.IMAGE_PROCESS_WORKERS or 1,
+            help='Количество процессов для обработки изображений.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').order_by('pk')
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        self.built = 0
+        with ProcessPoolExecutor(
+            max_workers=options['workers'], mp_context=get_context('spawn')
+        ) as executor:
+            pending = {}
+            for pk, image_name in recipes.values_list('pk', 'image'):
+                if len(pending) >= 2 * options['workers']:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    self.save_done(done, pending)
+                try:
+                    with default_storage.open(image_name) as file:
+                        data = file.read()
+                except OSError as error:
+                    self.stderr.write(f'Рецепт {pk}: {error}')
+                    continue
+                future = executor.submit(render_derivatives, data)
+                pending[future] = (pk, image_name)
+            self.save_done(wait(pending).done, pending)
+        self.stdout.write(f'Обработано изображений: {self.built}.')
+
+    def save_done(self, done, pending):
+        for future in done:
+            pk, image_name = pending.pop(future)
+            try:
+                save_derivatives(pk, image_name, future.result())
+            except Exception as error:
+                self.stderr.write(f'Рецепт {pk}: {error}')
+            else:
+                self.built += 1
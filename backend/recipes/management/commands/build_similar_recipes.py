@@ -0,0 +1,264 @@
+from itertools import chain
+from time import perf_counter
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, Min
+from django.db.transaction import atomic
+from scipy import sparse
+
+from recipes.models import (
+    SIMILAR_COUNT,
+    Cart,
+    Favorite,
+    Recipe,
+    SimilaritySignature,
+    SimilarRecipe,
+)
+from utils.bulk import batches
+
+BATCH_SIZE = 500
+CHUNK_SIZE = 10000
+SIGNALS = ((Favorite, 1.0), (Cart, 1.0))
+
+
+def read_links(model):
+    """Пары (рецепт, пользователь) связей модели массивом n×2."""
+    return np.fromiter(
+        chain.from_iterable(
+            model.objects.values_list('recipes', 'user').iterator(
+                chunk_size=CHUNK_SIZE
+            )
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+
+def mix(values):
+    """Перемешивает биты uint64 (финализатор splitmix64)."""
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(
+        0xBF58476D1CE4E5B9
+    )
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(
+        0x94D049BB133111EB
+    )
+    return values ^ (values >> np.uint64(31))
+
+
+def get_signatures(recipes, keys):
+    """
+    Отпечаток набора связей каждого рецепта: сумма хешей ключей
+    по модулю 2**64, не зависящая от порядка строк.
+    """
+    if not len(recipes):
+        return {}
+    order = np.argsort(recipes, kind='stable')
+    recipes, hashes = recipes[order], mix(keys[order].astype(np.uint64))
+    starts = np.flatnonzero(
+        np.concatenate(([True], recipes[1:] != recipes[:-1]))
+    )
+    sums = np.add.reduceat(hashes, starts).view(np.int64)
+    return dict(zip(recipes[starts].tolist(), sums.tolist()))
+
+
+def load_signals():
+    """
+    Строит разреженную матрицу «рецепт × пользователь» по избранному
+    и корзинам (строки и столбцы — id) и отпечатки связей рецептов.
+    """
+    links = [read_links(model) for model, _ in SIGNALS]
+    recipes = np.concatenate([pairs[:, 0] for pairs in links])
+    users = np.concatenate([pairs[:, 1] for pairs in links])
+    weights = np.concatenate(
+        [
+            np.full(len(pairs), weight)
+            for pairs, (_, weight) in zip(links, SIGNALS)
+        ]
+    )
+    kinds = np.concatenate(
+        [np.full(len(pairs), kind) for kind, pairs in enumerate(links)]
+    )
+    shape = (
+        (Recipe.objects.aggregate(last=Max('pk'))['last'] or 0) + 1,
+        int(users.max(initial=0)) + 1,
+    )
+    matrix = sparse.csr_matrix((weights, (recipes, users)), shape=shape)
+    return matrix, get_signatures(recipes, users * len(SIGNALS) + kinds)
+
+
+def similarities(matrix, norms, batch):
+    """
+    Косинусное сходство рецептов batch со всеми остальными одним
+    разреженным умножением. Отдаёт (id, id соседей, сходство)
+    для каждого рецепта, ненулевые значения.
+    """
+    products = (matrix[batch] @ matrix.T).tocsr()
+    for row, pk in enumerate(batch):
+        start, end = products.indptr[row], products.indptr[row + 1]
+        columns = products.indices[start:end]
+        scores = products.data[start:end] / (norms[pk] * norms[columns])
+        others = columns != pk
+        yield pk, columns[others], scores[others]
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассчитывает похожие рецепты по совместному добавлению '
+        'в избранное и корзины. По умолчанию пересчитываются только '
+        'рецепты, у которых изменился набор связей, и их соседи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать соседей всех рецептов.',
+        )
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=SIMILAR_COUNT,
+            help='Сколько соседей хранить для рецепта.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Строк матрицы в одном умножении.',
+        )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        matrix, signatures = load_signals()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+        norms = norms.ravel()
+        stored = dict(
+            SimilaritySignature.objects.values_list('recipe', 'signature')
+        )
+        if options['full']:
+            changed = affected = (
+                signatures.keys()
+                | stored.keys()
+                | set(
+                    SimilarRecipe.objects.values_list('recipe', flat=True)
+                )
+            )
+        else:
+            changed = {
+                pk
+                for pk in signatures.keys() | stored.keys()
+                if signatures.get(pk) != stored.get(pk)
+            }
+            stats = {
+                pk: (count, lowest)
+                for pk, count, lowest in (
+                    SimilarRecipe.objects.order_by()
+                    .values_list('recipe')
+                    .annotate(count=Count('pk'), lowest=Min('score'))
+                )
+            }
+            affected = self.get_affected(
+                matrix, norms, changed, stats, options
+            ) | self.get_incomplete(matrix, stats, options)
+        written = 0
+        for batch in batches(sorted(affected), options['batch_size']):
+            written += self.save_neighbours(
+                similarities(matrix, norms, batch), batch, options['count']
+            )
+        self.save_signatures(changed, signatures)
+        self.stdout.write(
+            f'Пар рецепт-пользователь: {matrix.nnz}, с изменёнными связями: '
+            f'{len(changed)}, пересчитано рецептов: {len(affected)}, '
+            f'записано соседей: {written}.'
+        )
+        self.stdout.write(f'Время: {perf_counter() - started:.2f} с.')
+
+    @staticmethod
+    def get_affected(matrix, norms, changed, stats, options):
+        """
+        Рецепты, соседи которых могли измениться: сами изменённые,
+        рецепты, у которых они уже в соседях, и рецепты, в соседи
+        которых они теперь проходят по сходству. Сходство остальных
+        пар не изменилось, и их соседи остаются верными.
+        stats — {id рецепта: (число соседей, наименьшее сходство)}.
+        """
+        thresholds = np.zeros(matrix.shape[0])
+        for pk, (count, lowest) in stats.items():
+            if count >= options['count']:
+                thresholds[pk] = lowest
+        affected = set(changed)
+        for batch in batches(sorted(changed), options['batch_size']):
+            affected.update(
+                SimilarRecipe.objects.filter(similar__in=batch).values_list(
+                    'recipe', flat=True
+                )
+            )
+            for _, columns, scores in similarities(matrix, norms, batch):
+                affected.update(
+                    columns[scores >= thresholds[columns]].tolist()
+                )
+        return affected
+
+    @staticmethod
+    def get_incomplete(matrix, stats, options):
+        """
+        Рецепты, у которых соседей меньше --count, хотя рецептов
+        с ненулевым сходством больше: сосед удалён вместе с рецептом,
+        а связи самого рецепта не изменились.
+        """
+        counts = {pk: count for pk, (count, _) in stats.items()}
+        linked = np.flatnonzero(np.diff(matrix.indptr)).tolist()
+        candidates = [
+            pk for pk in linked if counts.get(pk, 0) < options['count']
+        ]
+        incomplete = set()
+        for batch in batches(candidates, options['batch_size']):
+            products = (matrix[batch] @ matrix.T).tocsr()
+            for pk, others in zip(batch, np.diff(products.indptr) - 1):
+                if counts.get(pk, 0) < min(others, options['count']):
+                    incomplete.add(pk)
+        return incomplete
+
+    @staticmethod
+    def save_neighbours(rows, batch, count):
+        """Заменяет соседей рецептов batch лучшими count из rows."""
+        neighbours = []
+        for pk, columns, scores in rows:
+            if len(scores) > count:
+                best = np.argpartition(-scores, count - 1)[:count]
+            else:
+                best = np.arange(len(scores))
+            best = best[np.lexsort((-columns[best], -scores[best]))]
+            neighbours.extend(
+                SimilarRecipe(recipe_id=pk, similar_id=similar, score=score)
+                for similar, score in zip(
+                    columns[best].tolist(), scores[best].tolist()
+                )
+            )
+        with atomic():
+            SimilarRecipe.objects.filter(recipe__in=batch).delete()
+            SimilarRecipe.objects.bulk_create(neighbours)
+        return len(neighbours)
+
+    @staticmethod
+    def save_signatures(changed, signatures):
+        """Запоминает отпечатки пересчитанных рецептов."""
+        with atomic():
+            SimilaritySignature.objects.filter(
+                recipe__in=[pk for pk in changed if pk not in signatures]
+            ).delete()
+            for batch in batches(
+                (pk for pk in changed if pk in signatures), CHUNK_SIZE
+            ):
+                SimilaritySignature.objects.bulk_create(
+                    [
+                        SimilaritySignature(
+                            recipe_id=pk, signature=signatures[pk]
+                        )
+                        for pk in batch
+                    ],
+                    update_conflicts=True,
+                    unique_fields=('recipe',),
+                    update_fields=('signature',),
+                )
@@ -0,0 +1,115 @@
+import json
+import sys
+import tarfile
+from tempfile import SpooledTemporaryFile
+from time import perf_counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from utils.transfer import (
+    BATCH_SIZE,
+    MEDIA_PREFIX,
+    RECIPES_MEMBER,
+    export_records,
+)
+
+SPOOL_SIZE = 16 * 1024 * 1024
+PROGRESS_EVERY = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает рецепты в NDJSON: по строке на рецепт с автором, '
+        'тегами, ингредиентами и именем файла изображения. С --media '
+        'пишет tar-архив вместе с файлами изображений.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл для выгрузки, «-» — стандартный вывод.'
+        )
+        parser.add_argument(
+            '--media',
+            action='store_true',
+            help='Упаковать в tar с изображениями (.tar.gz — со сжатием).',
+        )
+        parser.add_argument(
+            '--ids', nargs='+', type=int, help='Только рецепты с этими id.'
+        )
+        parser.add_argument(
+            '--authors',
+            nargs='+',
+            help='Только рецепты авторов с этими username.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Рецептов в одной выборке из базы.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options['ids']:
+            recipes = recipes.filter(pk__in=options['ids'])
+        if options['authors']:
+            recipes = recipes.filter(author__username__in=options['authors'])
+        records = export_records(recipes, options['chunk_size'])
+        path = options['path']
+        output = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        self.started, self.count = perf_counter(), 0
+        try:
+            if options['media']:
+                compressed = path.endswith(('.gz', '.tgz'))
+                self.write_archive(records, output, compressed)
+            else:
+                self.write_lines(records, output)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        self.report()
+
+    def lines(self, records):
+        for record in records:
+            yield record, (
+                json.dumps(record, ensure_ascii=False) + '\n'
+            ).encode()
+            self.count += 1
+            if not self.count % PROGRESS_EVERY:
+                self.report()
+
+    def write_lines(self, records, output):
+        for _, line in self.lines(records):
+            output.write(line)
+
+    def write_archive(self, records, output, compressed):
+        """
+        Файлы изображений пишутся в архив сразу, а NDJSON копится
+        во временном файле и добавляется последним: размер члена
+        tar-архива нужно знать заранее.
+        """
+        mode = 'w|gz' if compressed else 'w|'
+        with tarfile.open(fileobj=output, mode=mode) as archive, (
+            SpooledTemporaryFile(SPOOL_SIZE)
+        ) as spool:
+            for record, line in self.lines(records):
+                spool.write(line)
+                name = record['image']
+                if name and default_storage.exists(name):
+                    info = tarfile.TarInfo(MEDIA_PREFIX + name)
+                    info.size = default_storage.size(name)
+                    with default_storage.open(name) as file:
+                        archive.addfile(info, file)
+            info = tarfile.TarInfo(RECIPES_MEMBER)
+            info.size = spool.tell()
+            spool.seek(0)
+            archive.addfile(info, spool)
+
+    def report(self):
+        elapsed = perf_counter() - self.started
+        self.stderr.write(
+            f'Выгружено рецептов: {self.count}, '
+            f'{self.count / max(elapsed, 1e-9):.0f} в секунду.'
+        )
@@ -0,0 +1,88 @@
+import json
+import sys
+import tarfile
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.transaction import atomic
+
+from utils.transfer import (
+    BATCH_SIZE,
+    MEDIA_PREFIX,
+    RECIPES_MEMBER,
+    RecipeImporter,
+)
+
+PROGRESS_EVERY = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает рецепты из NDJSON или tar-архива export_recipes. '
+        'Авторы, теги и ингредиенты сопоставляются с существующими или '
+        'создаются, рецепты получают новые id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл выгрузки, «-» — стандартный ввод (NDJSON).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Рецептов в одной пачке записи.',
+        )
+
+    @atomic
+    def handle(self, *args, **options):
+        path = options['path']
+        importer = RecipeImporter(options['batch_size'])
+        self.started, self.count, self.reported = perf_counter(), 0, 0
+        if path == '-':
+            self.load(importer, sys.stdin.buffer)
+        elif tarfile.is_tarfile(path):
+            self.load_archive(importer, path)
+        else:
+            with open(path, 'rb') as file:
+                self.load(importer, file)
+        self.report()
+        self.stdout.write(
+            'Создано пользователей: {users}, тегов: {tags}, '
+            'ингредиентов: {ingredients}.'.format(**importer.created)
+        )
+
+    def load_archive(self, importer, path):
+        with tarfile.open(path, 'r|*') as archive:
+            for member in archive:
+                if member.isfile() and member.name.startswith(MEDIA_PREFIX):
+                    importer.save_image(
+                        member.name[len(MEDIA_PREFIX):],
+                        archive.extractfile(member),
+                    )
+                elif member.name == RECIPES_MEMBER:
+                    self.load(importer, archive.extractfile(member))
+
+    def load(self, importer, lines):
+        for size in importer.load(self.records(lines)):
+            self.count += size
+            if self.count - self.reported >= PROGRESS_EVERY:
+                self.reported = self.count
+                self.report()
+
+    @staticmethod
+    def records(lines):
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise CommandError(f'Строка {number}: {error}')
+
+    def report(self):
+        elapsed = perf_counter() - self.started
+        self.stderr.write(
+            f'Загружено рецептов: {self.count}, '
+            f'{self.count / max(elapsed, 1e-9):.0f} в секунду.'
+        )
@@ -0,0 +1,169 @@
+import csv
+import json
+import re
+from io import StringIO
+from pathlib import Path
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.transaction import atomic, on_commit
+
+from api import cache as recipe_cache
+from recipes.models import MAX_LEN_NAME, Ingredient
+from utils.bulk import batches
+from utils.versions import bump_version
+
+BATCH_SIZE = 5000
+READ_SIZE = 64 * 1024
+CSV_HEADER = ('name', 'measurement_unit')
+JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def read_csv(file):
+    """Строки CSV: название, единица измерения; заголовок пропускается."""
+    for row in csv.reader(file):
+        if len(row) >= 2 and tuple(row[:2]) != CSV_HEADER:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """
+    Разбирает JSON-массив объектов по частям, не загружая файл целиком.
+    """
+    decoder = json.JSONDecoder()
+    buffer, eof = file.read(READ_SIZE).lstrip(), False
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив объектов.')
+    position = 1
+    while True:
+        position = JSON_SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                raise CommandError('Некорректный JSON.')
+            chunk = file.read(READ_SIZE)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+        if not isinstance(item, dict):
+            raise CommandError('Ожидается JSON-массив объектов.')
+        yield item.get('name', ''), item.get('measurement_unit', '')
+
+
+def unique_rows(rows, stats):
+    """Очищает строки от пробелов и пропускает повторы и некорректные."""
+    seen = set()
+    for name, unit in rows:
+        stats['read'] += 1
+        row = (str(name).strip(), str(unit).strip())
+        if not all(row) or max(map(len, row)) > MAX_LEN_NAME:
+            stats['skipped'] += 1
+        elif row not in seen:
+            seen.add(row)
+            yield row
+
+
+def copy_rows(rows, batch_size):
+    """
+    PostgreSQL: COPY во временную таблицу и один INSERT ... ON CONFLICT.
+    Таблица удаляется сразу, чтобы загрузку можно было повторить внутри
+    той же транзакции.
+    """
+    table = connection.ops.quote_name(Ingredient._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE ingredient_load '
+            '(name text, measurement_unit text) ON COMMIT DROP'
+        )
+        for batch in batches(rows, batch_size):
+            buffer = StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.cursor.copy_expert(
+                'COPY ingredient_load FROM STDIN WITH (FORMAT csv)', buffer
+            )
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            'SELECT name, measurement_unit FROM ingredient_load '
+            'ON CONFLICT (name, measurement_unit) DO NOTHING'
+        )
+        created = cursor.rowcount
+        cursor.execute('DROP TABLE ingredient_load')
+        return created
+
+
+def create_rows(rows, batch_size):
+    """Остальные базы: пачки bulk_create с пропуском существующих."""
+    before = Ingredient.objects.count()
+    for batch in batches(rows, batch_size):
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in batch
+            ],
+            ignore_conflicts=True,
+        )
+    return Ingredient.objects.count() - before
+
+
+def load_ingredients(rows, batch_size=BATCH_SIZE):
+    """
+    Добавляет в каталог ингредиенты, которых в нём ещё нет.
+    Возвращает количество добавленных.
+    """
+    if connection.vendor == 'postgresql':
+        created = copy_rows(rows, batch_size)
+    else:
+        created = create_rows(rows, batch_size)
+    if created:
+        on_commit(lambda: bump_version(Ingredient))
+        on_commit(recipe_cache.bump_generation)
+    return created
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает каталог ингредиентов из CSV (название, единица '
+        'измерения) или JSON-массива объектов с полями name и '
+        'measurement_unit. Существующие ингредиенты не дублируются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path, help='Файл каталога.')
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'json'),
+            help='Формат файла, по умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Строк в одной пачке записи.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        readers = {'csv': read_csv, 'json': read_json}
+        if file_format not in readers:
+            raise CommandError(f'Неизвестный формат файла: {path.name}.')
+        stats = {'read': 0, 'skipped': 0}
+        started = perf_counter()
+        with open(path, encoding='utf-8', newline='') as file, atomic():
+            created = load_ingredients(
+                unique_rows(readers[file_format](file), stats),
+                options['batch_size'],
+            )
+        elapsed = perf_counter() - started
+        self.stdout.write(
+            f'Прочитано строк: {stats["read"]}, пропущено некорректных: '
+            f'{stats["skipped"]}, добавлено ингредиентов: {created}.'
+        )
+        self.stdout.write(
+            f'Время: {elapsed:.2f} с, '
+            f'{stats["read"] / max(elapsed, 1e-9):.0f} строк/с.'
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.transaction import atomic
+
+from recipes.models import Cart, Favorite, Recipe
+from users.models import Subscription, User
+
+
+def count_of(queryset, field):
+    """Подзапрос количества строк queryset для каждого значения field."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики избранного и корзин у рецептов, '
+        'рецептов и подписчиков у пользователей.'
+    )
+
+    @atomic
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.update(
+            favorites_count=count_of(Favorite.objects.all(), 'recipes'),
+            carts_count=count_of(Cart.objects.all(), 'recipes'),
+        )
+        users = User.objects.update(
+            recipes_count=count_of(Recipe.objects.all(), 'author'),
+            followers_count=count_of(Subscription.objects.all(), 'author'),
+        )
+        self.stdout.write(
+            f'Обновлено рецептов: {recipes}, пользователей: {users}.'
+        )
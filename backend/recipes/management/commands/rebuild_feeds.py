@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic
+
+from recipes.models import FeedEntry
+from users.models import Subscription
+from utils.bulk import insert_from_select
+
+
+def fill_feeds(feed_model, subscription_model, users=None):
+    """
+    Пересобирает ленты подписок одним INSERT ... SELECT
+    по подпискам и рецептам авторов.
+    """
+    entries = feed_model.objects.all()
+    subscriptions = subscription_model.objects.filter(
+        author__recipes__isnull=False
+    )
+    if users is not None:
+        entries = entries.filter(user__in=users)
+        subscriptions = subscriptions.filter(user__in=users)
+    entries.delete()
+    return insert_from_select(
+        feed_model,
+        ('user', 'recipe', 'pub_date'),
+        subscriptions.order_by().values(
+            'user', 'author__recipes', 'author__recipes__pub_date'
+        ),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            nargs='+',
+            type=int,
+            help='id пользователей, по умолчанию — все',
+        )
+
+    @atomic
+    def handle(self, *args, **options):
+        rows = fill_feeds(FeedEntry, Subscription, options['users'])
+        self.stdout.write(f'Записано элементов лент: {rows}.')
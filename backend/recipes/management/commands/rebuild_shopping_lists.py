@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.db.transaction import atomic
+
+from recipes.models import Cart, ShoppingListItem
+from utils.bulk import insert_from_select
+
+
+def fill_shopping_lists(item_model, cart_model, users=None):
+    """
+    Пересчитывает списки покупок по корзинам одним INSERT ... SELECT.
+    """
+    items = item_model.objects.all()
+    carts = cart_model.objects.filter(
+        recipes__recipe_ingredients__isnull=False
+    )
+    if users is not None:
+        items = items.filter(user__in=users)
+        carts = carts.filter(user__in=users)
+    items.delete()
+    return insert_from_select(
+        item_model,
+        ('user', 'ingredient', 'total_amount'),
+        carts.order_by()
+        .values('user', 'recipes__recipe_ingredients__ingredient')
+        .annotate(total=Sum('recipes__recipe_ingredients__amount')),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает списки покупок пользователей по их корзинам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            nargs='+',
+            type=int,
+            help='id пользователей, по умолчанию — все',
+        )
+
+    @atomic
+    def handle(self, *args, **options):
+        rows = fill_shopping_lists(ShoppingListItem, Cart, options['users'])
+        self.stdout.write(f'Записано позиций списков покупок: {rows}.')
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import RankingEpoch, Recipe
+from recipes.ranking import renormalize, reset_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит начало отсчёта оценок тренда и популярности рецептов '
+        'на текущий момент, чтобы оценки не росли неограниченно. '
+        'Запускается периодически, например раз в сутки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help=(
+                'Пересчитать оценки по счётчикам избранного и корзин, '
+                'например после смены периодов полураспада.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            updated = reset_scores(Recipe, RankingEpoch)
+            self.stdout.write(f'Оценки пересчитаны у рецептов: {updated}.')
+            return
+        shift = renormalize(Recipe, RankingEpoch)
+        self.stdout.write(
+            f'Начало отсчёта сдвинуто на {shift / 3600:.1f} ч.'
+        )
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    # Индекс для istartswith, который Django на PostgreSQL превращает
+    # в UPPER(name::text) LIKE UPPER(...); в SQLite такого индекса нет.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX ingredient_name_upper_idx ON recipes_ingredient '
+            '(UPPER(name::text) text_pattern_ops);'
+        )
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_upper_idx;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0009_recipe_ordering_and_pub_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='recipes',
+            field=models.ForeignKey(db_index=False, help_text='Рецепт', on_delete=django.db.models.deletion.CASCADE, related_name='cart_list', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='cart',
+            name='user',
+            field=models.ForeignKey(db_index=False, help_text='Пользователь', on_delete=django.db.models.deletion.CASCADE, related_name='cart_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='recipes',
+            field=models.ForeignKey(db_index=False, help_text='Избранный рецепт', on_delete=django.db.models.deletion.CASCADE, related_name='favorite_list', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='user',
+            field=models.ForeignKey(db_index=False, help_text='Пользователь', on_delete=django.db.models.deletion.CASCADE, related_name='favorite_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(db_index=False, help_text='Автор рецепта', on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['user', 'recipes'], name='cart_user_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', 'recipes'], name='favorite_user_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index, drop_ingredient_name_index
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Дата последнего изменения рецепта', verbose_name='Дата изменения'),
+        ),
+    ]
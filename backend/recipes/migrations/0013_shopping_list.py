@@ -0,0 +1,59 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def fill_items(apps, schema_editor):
+    # Копия fill_shopping_lists на момент миграции: список покупок
+    # заполняется по корзинам одним INSERT ... SELECT.
+    item_model = apps.get_model('recipes', 'ShoppingListItem')
+    cart_model = apps.get_model('recipes', 'Cart')
+    sql, params = (
+        cart_model.objects.using(schema_editor.connection.alias)
+        .filter(recipes__recipe_ingredients__isnull=False)
+        .order_by()
+        .values('user', 'recipes__recipe_ingredients__ingredient')
+        .annotate(total=Sum('recipes__recipe_ingredients__amount'))
+        .query.sql_with_params()
+    )
+    meta = item_model._meta
+    quote = schema_editor.connection.ops.quote_name
+    columns = ', '.join(
+        quote(meta.get_field(name).column)
+        for name in ('user', 'ingredient', 'total_amount')
+    )
+    schema_editor.execute(
+        f'INSERT INTO {quote(meta.db_table)} ({columns}) {sql}', params
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0012_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.PositiveIntegerField(help_text='Суммарное количество ингредиента в корзине', verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(help_text='Ингредиент', on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(db_index=False, help_text='Пользователь', on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Список покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(fill_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_entries(apps, schema_editor):
+    # Копия fill_feeds на момент миграции: ленты заполняются
+    # по подпискам и рецептам авторов одним INSERT ... SELECT.
+    entry_model = apps.get_model('recipes', 'FeedEntry')
+    subscription_model = apps.get_model('users', 'Subscription')
+    sql, params = (
+        subscription_model.objects.using(schema_editor.connection.alias)
+        .filter(author__recipes__isnull=False)
+        .order_by()
+        .values('user', 'author__recipes', 'author__recipes__pub_date')
+        .query.sql_with_params()
+    )
+    meta = entry_model._meta
+    quote = schema_editor.connection.ops.quote_name
+    columns = ', '.join(
+        quote(meta.get_field(name).column)
+        for name in ('user', 'recipe', 'pub_date')
+    )
+    schema_editor.execute(
+        f'INSERT INTO {quote(meta.db_table)} ({columns}) {sql}', params
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0013_shopping_list'),
+        ('users', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(help_text='Дата публиции рецепта', verbose_name='Дата публиции')),
+                ('recipe', models.ForeignKey(help_text='Рецепт в ленте', on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(db_index=False, help_text='Владелец ленты', on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Лента подписок',
+                'indexes': [models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_entries, migrations.RunPython.noop),
+    ]
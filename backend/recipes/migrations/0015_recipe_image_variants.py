@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(default=dict, editable=False, help_text='Уменьшенные копии изображения в WebP и JPEG', verbose_name='Производные изображения'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:20
+
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def fill_shopping_lists(apps, schema_editor, users):
+    # Копия fill_shopping_lists на момент миграции: списки покупок
+    # пользователей пересчитываются по корзинам одним INSERT ... SELECT.
+    item_model = apps.get_model('recipes', 'ShoppingListItem')
+    cart_model = apps.get_model('recipes', 'Cart')
+    alias = schema_editor.connection.alias
+    item_model.objects.using(alias).filter(user__in=users).delete()
+    sql, params = (
+        cart_model.objects.using(alias)
+        .filter(user__in=users, recipes__recipe_ingredients__isnull=False)
+        .order_by()
+        .values('user', 'recipes__recipe_ingredients__ingredient')
+        .annotate(total=Sum('recipes__recipe_ingredients__amount'))
+        .query.sql_with_params()
+    )
+    meta = item_model._meta
+    quote = schema_editor.connection.ops.quote_name
+    columns = ', '.join(
+        quote(meta.get_field(name).column)
+        for name in ('user', 'ingredient', 'total_amount')
+    )
+    schema_editor.execute(
+        f'INSERT INTO {quote(meta.db_table)} ({columns}) {sql}', params
+    )
+
+
+def merge_duplicates(apps, schema_editor):
+    # Повторы (name, measurement_unit) сливаются в ингредиент с меньшим id:
+    # рецепты переводятся на него, списки покупок пересчитываются.
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    groups = (
+        Ingredient.objects.values('name', 'measurement_unit')
+        .annotate(keep=Min('id'), count=Count('id'))
+        .filter(count__gt=1)
+    )
+    users = set()
+    for group in groups:
+        duplicates = Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(pk=group['keep'])
+        IngredientInRecipe.objects.filter(ingredient__in=duplicates).update(
+            ingredient=group['keep']
+        )
+        users.update(
+            ShoppingListItem.objects.filter(
+                ingredient__in=duplicates
+            ).values_list('user', flat=True)
+        )
+        duplicates.delete()
+    if users:
+        fill_shopping_lists(apps, schema_editor, users)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,100 @@
+from django.db import migrations
+
+# Копия SQL из recipes.search на момент миграции: поисковый индекс
+# рецептов в PostgreSQL (tsvector с GIN-индексом и триггером)
+# и в SQLite (FTS5 с триггерами синхронизации).
+POSTGRES_INSTALL = (
+    'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector',
+    (
+        'CREATE FUNCTION recipes_recipe_search_vector() RETURNS trigger AS '
+        "$$ BEGIN NEW.search_vector := setweight(to_tsvector('russian', "
+        "coalesce(NEW.name, '')), 'A') || setweight(to_tsvector('russian', "
+        "coalesce(NEW.text, '')), 'B'); RETURN NEW; END $$ LANGUAGE plpgsql"
+    ),
+    (
+        'CREATE TRIGGER recipes_recipe_search_vector BEFORE INSERT OR '
+        'UPDATE OF name, text ON recipes_recipe FOR EACH ROW EXECUTE '
+        'FUNCTION recipes_recipe_search_vector()'
+    ),
+    (
+        'UPDATE recipes_recipe SET search_vector = '
+        "setweight(to_tsvector('russian', coalesce(recipes_recipe.name, "
+        "'')), 'A') || setweight(to_tsvector('russian', "
+        "coalesce(recipes_recipe.text, '')), 'B')"
+    ),
+    (
+        'CREATE INDEX recipe_search_vector_idx ON recipes_recipe USING GIN '
+        '(search_vector)'
+    ),
+)
+POSTGRES_UNINSTALL = (
+    (
+        'DROP TRIGGER IF EXISTS recipes_recipe_search_vector ON '
+        'recipes_recipe'
+    ),
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_vector()',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+SQLITE_INSTALL = (
+    (
+        'CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts USING '
+        "fts5(name, text, content='recipes_recipe', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_ai AFTER INSERT ON '
+        'recipes_recipe BEGIN INSERT INTO recipes_recipe_fts (rowid, name, '
+        'text) VALUES (new.id, new.name, new.text); END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_ad AFTER DELETE ON '
+        'recipes_recipe BEGIN INSERT INTO recipes_recipe_fts '
+        "(recipes_recipe_fts, rowid, name, text) VALUES ('delete', old.id, "
+        'old.name, old.text); END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_au AFTER UPDATE OF '
+        'name, text ON recipes_recipe BEGIN INSERT INTO recipes_recipe_fts '
+        "(recipes_recipe_fts, rowid, name, text) VALUES ('delete', old.id, "
+        'old.name, old.text); INSERT INTO recipes_recipe_fts (rowid, name, '
+        'text) VALUES (new.id, new.name, new.text); END'
+    ),
+    (
+        'INSERT INTO recipes_recipe_fts (recipes_recipe_fts) VALUES '
+        "('rebuild')"
+    ),
+)
+SQLITE_UNINSTALL = (
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_ai',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_ad',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_au',
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+)
+
+INSTALL = {'postgresql': POSTGRES_INSTALL, 'sqlite': SQLITE_INSTALL}
+UNINSTALL = {'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL}
+
+
+def execute(schema_editor, statements):
+    vendor = schema_editor.connection.vendor
+    for statement in statements.get(vendor, ()):
+        schema_editor.execute(statement, params=None)
+
+
+def install_search(apps, schema_editor):
+    execute(schema_editor, INSTALL)
+
+
+def uninstall_search(apps, schema_editor):
+    execute(schema_editor, UNINSTALL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_ingredient_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
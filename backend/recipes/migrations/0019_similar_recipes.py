@@ -0,0 +1,39 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_recipe_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilaritySignature',
+            fields=[
+                ('recipe', models.OneToOneField(help_text='Рецепт', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity_signature', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('signature', models.BigIntegerField(help_text='Хеш пользователей и типов связей рецепта', verbose_name='Отпечаток')),
+            ],
+            options={
+                'verbose_name': 'Отпечаток сигналов рецепта',
+                'verbose_name_plural': 'Отпечатки сигналов рецептов',
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Косинусное сходство по избранному и корзинам', verbose_name='Сходство')),
+                ('recipe', models.ForeignKey(db_index=False, help_text='Рецепт', on_delete=django.db.models.deletion.CASCADE, related_name='similar_recipes', to='recipes.recipe', verbose_name='Рецепт')),
+                ('similar', models.ForeignKey(help_text='Похожий рецепт', on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='recipes.recipe', verbose_name='Похожий рецепт')),
+            ],
+            options={
+                'verbose_name': 'Похожий рецепт',
+                'verbose_name_plural': 'Похожие рецепты',
+                'indexes': [models.Index(fields=['recipe', '-score'], name='similar_recipe_score_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.4 on 2026-10-17 03:58
+
+from time import time
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def seed_scores(apps, schema_editor):
+    # Копия reset_scores на момент миграции: все накопленные добавления
+    # считаются произошедшими сейчас, начало отсчёта — сейчас.
+    alias = schema_editor.connection.alias
+    apps.get_model('recipes', 'RankingEpoch').objects.using(alias).create(
+        epoch=time()
+    )
+    score = F('favorites_count') + F('carts_count')
+    apps.get_model('recipes', 'Recipe').objects.using(alias).update(
+        trending_score=score, popular_score=score
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0019_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.FloatField(help_text='Unix-время, к которому приведены оценки рецептов', verbose_name='Начало отсчёта')),
+            ],
+            options={
+                'verbose_name': 'Начало отсчёта оценок',
+                'verbose_name_plural': 'Начало отсчёта оценок',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='popular_score',
+            field=models.FloatField(default=0, editable=False, help_text='Медленно затухающая сумма добавлений в избранное и корзину', verbose_name='Оценка популярности'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, help_text='Быстро затухающая сумма добавлений в избранное и корзину', verbose_name='Оценка тренда'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-id'], name='recipe_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-popular_score', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.RunPython(seed_scores, migrations.RunPython.noop),
+    ]
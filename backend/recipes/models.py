@@ -1,32 +1,59 @@
+from collections import defaultdict
+
 from django.core.validators import (
     MaxValueValidator,
     MinValueValidator,
     RegexValidator,
 )
+from django.db import connections
 from django.db.models import (
     CASCADE,
+    BigIntegerField,
     BooleanField,
+    Case,
     CharField,
     DateTimeField,
+    Exists,
+    F,
+    FloatField,
     ForeignKey,
     ImageField,
+    Index,
+    JSONField,
     ManyToManyField,
     Model,
+    OneToOneField,
+    OuterRef,
+    PositiveIntegerField,
     PositiveSmallIntegerField,
+    Prefetch,
+    QuerySet,
+    Sum,
     TextField,
     UniqueConstraint,
+    Value,
+    When,
+    Window,
 )
+from django.db.models.functions import Greatest, RowNumber
 from django.utils.translation import gettext_lazy as _
 
-from users.models import User
+from recipes.ranking import score_updates
+from recipes.search import search_expressions
+from users.models import Subscription, User
+from utils.bulk import insert_from_select
+from utils.links import CounterFieldsMixin, LinkQuerySet
 
 MAX_LEN_NAME = 200
 MAX_LEN_COLOR = 7
 MAX_LEN_SLUG = 200
+SIMILAR_COUNT = 20
 
 USER_RECIPE = 'Пользователь: {}> Рецепт: {}'
+USER_INGREDIENT = 'Пользователь: {}> Ингредиент: {}'
 NAME_AUTHOR_TAG = 'Название: {}> Автор: {}> Тег: {}'
 NAME_MEASUREMENT_UNIT = 'Название: {}> Единица измерения: {}'
+VIEWER_FLAGS = ('is_favorited', 'is_in_shopping_cart', 'author_is_subscribed')
 
 
 class Tag(Model):
@@ -95,12 +122,109 @@ class Ingredient(Model):
     class Meta:
         verbose_name = _('Ингредиент')
         verbose_name_plural = _('Ингредиенты')
+        constraints = [
+            UniqueConstraint(
+                fields=('name', 'measurement_unit'), name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return NAME_MEASUREMENT_UNIT.format(self.name, self.measurement_unit)
 
 
-class Recipe(Model):
+class RecipeQuerySet(QuerySet):
+    """Набор запросов рецептов с данными, зависящими от пользователя."""
+
+    def with_viewer_flags(self, user):
+        """
+        Добавляет флаги избранного, корзины и подписки на автора
+        для пользователя.
+        """
+        if user.is_authenticated:
+            flags = {
+                'is_favorited': Exists(
+                    Favorite.objects.filter(
+                        recipes=OuterRef('pk'), user=user
+                    )
+                ),
+                'is_in_shopping_cart': Exists(
+                    Cart.objects.filter(recipes=OuterRef('pk'), user=user)
+                ),
+                'author_is_subscribed': Exists(
+                    Subscription.objects.filter(
+                        author=OuterRef('author'), user=user
+                    )
+                ),
+            }
+        else:
+            flags = {
+                name: Value(False, output_field=BooleanField())
+                for name in VIEWER_FLAGS
+            }
+        return self.annotate(**flags)
+
+    def latest_by_author(self, author_ids, limit=None):
+        """
+        Последние рецепты каждого из авторов, не более limit на автора,
+        одним запросом с ROW_NUMBER() OVER (PARTITION BY author).
+        """
+        queryset = self.filter(author__in=author_ids).only(
+            'id', 'name', 'image', 'image_variants', 'cooking_time', 'author'
+        )
+        if limit is None:
+            return queryset
+        return queryset.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('pub_date').desc(), F('id').desc()),
+            )
+        ).filter(row_number__lte=limit)
+
+    def search(self, text):
+        """
+        Полнотекстовый поиск по названию и описанию, самые релевантные
+        рецепты первыми.
+        """
+        expressions = search_expressions(connections[self.db].vendor, text)
+        if expressions is None:
+            return self.none()
+        match, rank = expressions
+        return (
+            self.filter(match)
+            .annotate(search_rank=rank)
+            .order_by('-search_rank', '-pub_date', '-id')
+        )
+
+    def neighbours_of(self, recipe_id):
+        """
+        Рецепты, похожие на данный, из заранее рассчитанной таблицы
+        SimilarRecipe, самые похожие первыми.
+        """
+        return self.filter(similar_to__recipe=recipe_id).order_by(
+            '-similar_to__score', '-id'
+        )
+
+    def for_viewer(self, user):
+        """
+        Добавляет флаги пользователя и подгружает связанные объекты.
+        """
+        return (
+            self.with_viewer_flags(user)
+            .select_related('author')
+            .prefetch_related(
+                'tags',
+                Prefetch(
+                    'recipe_ingredients',
+                    queryset=IngredientInRecipe.objects.select_related(
+                        'ingredient'
+                    ),
+                ),
+            )
+        )
+
+
+class Recipe(CounterFieldsMixin, Model):
     """
     Модель для представления рецептов, со связанными полями.
     """
@@ -115,6 +239,7 @@ class Recipe(Model):
         User,
         on_delete=CASCADE,
         related_name='recipes',
+        db_index=False,
         verbose_name='Автор',
         help_text='Автор рецепта',
     )
@@ -124,16 +249,6 @@ class Recipe(Model):
         verbose_name='Ингредиент',
         help_text='Ингредиент рецепта',
     )
-    is_favorited = BooleanField(
-        default=False,
-        verbose_name='В избранном',
-        help_text='Находится ли в избранном',
-    )
-    is_in_shopping_cart = BooleanField(
-        default=False,
-        verbose_name='В корзине',
-        help_text='Находится ли в корзине',
-    )
     name = CharField(
         max_length=MAX_LEN_NAME,
         verbose_name='Название',
@@ -163,10 +278,68 @@ class Recipe(Model):
         verbose_name='Дата публиции',
         help_text='Дата публиции рецепта',
     )
+    image_variants = JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Производные изображения',
+        help_text='Уменьшенные копии изображения в WebP и JPEG',
+    )
+    updated_at = DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        help_text='Дата последнего изменения рецепта',
+    )
+    favorites_count = PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном',
+        help_text='Сколько раз рецепт добавлен в избранное',
+    )
+    carts_count = PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзинах',
+        help_text='Сколько раз рецепт добавлен в корзину',
+    )
+    trending_score = FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Оценка тренда',
+        help_text='Быстро затухающая сумма добавлений в избранное и корзину',
+    )
+    popular_score = FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Оценка популярности',
+        help_text='Медленно затухающая сумма добавлений в избранное и корзину',
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = (
+        'favorites_count',
+        'carts_count',
+        'trending_score',
+        'popular_score',
+    )
 
     class Meta:
         verbose_name = _('Рецепт')
         verbose_name_plural = _('Рецепты')
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            Index(fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'),
+            Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx',
+            ),
+            Index(
+                fields=('-trending_score', '-id'), name='recipe_trending_idx'
+            ),
+            Index(
+                fields=('-popular_score', '-id'), name='recipe_popular_idx'
+            ),
+        ]
 
     def __str__(self):
         return NAME_AUTHOR_TAG.format(self.name, self.author, self.tags)
@@ -191,6 +364,34 @@ class IngredientInRecipe(Model):
     )
 
 
+class RecipeLinkQuerySet(LinkQuerySet):
+    """Набор запросов связей пользователя с рецептом."""
+
+    def counter_updates(self, delta):
+        """
+        Добавления учитываются и в оценках тренда и популярности.
+        """
+        return score_updates(self.counter, delta) if delta > 0 else {}
+
+
+class FavoriteQuerySet(RecipeLinkQuerySet):
+    counter = 'favorites_count'
+
+
+class CartQuerySet(RecipeLinkQuerySet):
+    counter = 'carts_count'
+
+    def update_related(self, pairs, sign):
+        """Переносит рецепты в списки покупок пользователей."""
+        recipes = defaultdict(list)
+        for user_id, recipe_id in pairs:
+            recipes[user_id].append(recipe_id)
+        for user_id, recipe_ids in recipes.items():
+            ShoppingListItem.objects.add_recipes(
+                (user_id,), recipe_ids, sign
+            )
+
+
 class Favorite(Model):
     """
     Модель для представления избранных рецептов.
@@ -200,6 +401,7 @@ class Favorite(Model):
         User,
         on_delete=CASCADE,
         related_name='favorite_list',
+        db_index=False,
         verbose_name='Пользователь',
         help_text='Пользователь',
     )
@@ -207,10 +409,13 @@ class Favorite(Model):
         Recipe,
         on_delete=CASCADE,
         related_name='favorite_list',
+        db_index=False,
         verbose_name='Рецепт',
         help_text='Избранный рецепт',
     )
 
+    objects = FavoriteQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Избранное')
         verbose_name_plural = _('Избранные')
@@ -223,6 +428,9 @@ class Favorite(Model):
                 name='unique_favorites_for_recipes',
             ),
         ]
+        indexes = [
+            Index(fields=('user', 'recipes'), name='favorite_user_recipe_idx'),
+        ]
 
     def __str__(self):
         return USER_RECIPE.format(self.user, self.recipes)
@@ -237,6 +445,7 @@ class Cart(Model):
         Recipe,
         on_delete=CASCADE,
         related_name='cart_list',
+        db_index=False,
         verbose_name='Рецепт',
         help_text='Рецепт',
     )
@@ -244,10 +453,13 @@ class Cart(Model):
         User,
         on_delete=CASCADE,
         related_name='cart_list',
+        db_index=False,
         verbose_name='Пользователь',
         help_text='Пользователь',
     )
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         constraints = [
             UniqueConstraint(
@@ -258,8 +470,337 @@ class Cart(Model):
                 name='unique_carts_for_recipes',
             ),
         ]
+        indexes = [
+            Index(fields=('user', 'recipes'), name='cart_user_recipe_idx'),
+        ]
         verbose_name = _('Рецепт в корзине')
         verbose_name_plural = _('Рецепты в корзине')
 
     def __str__(self):
         return USER_RECIPE.format(self.user, self.recipes)
+
+
+class ShoppingListQuerySet(QuerySet):
+    """
+    Набор запросов списка покупок.
+
+    Список поддерживается инкрементально: при изменении корзины или
+    состава рецепта к количествам прибавляются разности, а команда
+    rebuild_shopping_lists пересчитывает список целиком по корзине.
+    """
+
+    batch_size = 300
+
+    @staticmethod
+    def amounts_of(recipe_ids):
+        """Возвращает {id ингредиента: количество} для рецептов."""
+        return dict(
+            IngredientInRecipe.objects.filter(recipes__in=recipe_ids)
+            .order_by()
+            .values('ingredient')
+            .annotate(total=Sum('amount'))
+            .values_list('ingredient', 'total')
+        )
+
+    def apply(self, user_ids, deltas):
+        """Прибавляет разности {id ингредиента: delta} к спискам."""
+        user_ids = list(user_ids)
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not user_ids or not deltas:
+            return
+        increments = {pk: delta for pk, delta in deltas.items() if delta > 0}
+        decrements = {pk: -delta for pk, delta in deltas.items() if delta < 0}
+        if increments:
+            self._increment(user_ids, increments)
+        if decrements:
+            items = self.filter(
+                user__in=user_ids, ingredient__in=decrements
+            )
+            items.update(
+                total_amount=Greatest(
+                    F('total_amount')
+                    - Case(
+                        *(
+                            When(ingredient=pk, then=Value(amount))
+                            for pk, amount in decrements.items()
+                        )
+                    ),
+                    0,
+                )
+            )
+            items.filter(total_amount=0).delete()
+
+    def _increment(self, user_ids, increments):
+        meta = self.model._meta
+        quote = connections[self.db].ops.quote_name
+        table = quote(meta.db_table)
+        total = quote(meta.get_field('total_amount').column)
+        user = quote(meta.get_field('user').column)
+        ingredient = quote(meta.get_field('ingredient').column)
+        rows = [
+            (user_id, pk, amount)
+            for user_id in user_ids
+            for pk, amount in increments.items()
+        ]
+        with connections[self.db].cursor() as cursor:
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                cursor.execute(
+                    f'INSERT INTO {table} ({user}, {ingredient}, {total}) '
+                    f'VALUES {", ".join(["(%s, %s, %s)"] * len(batch))} '
+                    f'ON CONFLICT ({user}, {ingredient}) DO UPDATE '
+                    f'SET {total} = {table}.{total} + EXCLUDED.{total}',
+                    [value for row in batch for value in row],
+                )
+
+    def add_recipes(self, user_ids, recipe_ids, sign=1):
+        """Добавляет ингредиенты рецептов в списки (sign=-1 — убирает)."""
+        self.apply(
+            user_ids,
+            {
+                pk: sign * amount
+                for pk, amount in self.amounts_of(recipe_ids).items()
+            },
+        )
+
+    def change_recipe(self, recipe, before, after):
+        """
+        Переносит изменение состава рецепта в списки всех пользователей,
+        у которых он в корзине.
+        """
+        self.apply(
+            Cart.objects.filter(recipes=recipe).values_list('user', flat=True),
+            {
+                pk: after.get(pk, 0) - before.get(pk, 0)
+                for pk in before.keys() | after.keys()
+            },
+        )
+
+    def for_download(self, user):
+        return (
+            self.filter(user=user)
+            .order_by('ingredient__name', 'ingredient__measurement_unit')
+            .values(
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                amount=F('total_amount'),
+            )
+        )
+
+
+class ShoppingListItem(Model):
+    """
+    Модель суммарного количества ингредиента в корзине пользователя.
+    """
+
+    user = ForeignKey(
+        User,
+        on_delete=CASCADE,
+        related_name='shopping_list',
+        db_index=False,
+        verbose_name='Пользователь',
+        help_text='Пользователь',
+    )
+    ingredient = ForeignKey(
+        Ingredient,
+        on_delete=CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+        help_text='Ингредиент',
+    )
+    total_amount = PositiveIntegerField(
+        verbose_name='Количество',
+        help_text='Суммарное количество ингредиента в корзине',
+    )
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item',
+            ),
+        ]
+        verbose_name = _('Ингредиент в списке покупок')
+        verbose_name_plural = _('Список покупок')
+
+    def __str__(self):
+        return USER_INGREDIENT.format(self.user, self.ingredient)
+
+
+class FeedQuerySet(QuerySet):
+    """
+    Набор запросов ленты подписок.
+
+    Лента заполняется при записи: новый рецепт раскладывается по лентам
+    подписчиков автора после фиксации транзакции (api.signals),
+    подписка добавляет в ленту рецепты автора, отписка — удаляет их
+    (SubscriptionQuerySet).
+    """
+
+    batch_size = 1000
+
+    def fan_out(self, recipe):
+        """
+        Добавляет рецепт в ленты подписчиков автора одним
+        INSERT ... SELECT, не читая подписчиков в приложение.
+        """
+        insert_from_select(
+            self.model,
+            ('user', 'recipe', 'pub_date'),
+            Subscription.objects.filter(author__recipes=recipe.pk).values(
+                'user', 'author__recipes', 'author__recipes__pub_date'
+            ),
+        )
+
+    def backfill(self, user_id, author_id):
+        """Добавляет в ленту пользователя рецепты автора."""
+        self.bulk_create(
+            (
+                self.model(user_id=user_id, recipe_id=pk, pub_date=pub_date)
+                for pk, pub_date in Recipe.objects.filter(
+                    author=author_id
+                ).values_list('pk', 'pub_date')
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+
+    def prune(self, user_id, author_id):
+        """Убирает из ленты пользователя рецепты автора."""
+        self.filter(user=user_id, recipe__author=author_id).delete()
+
+
+class FeedEntry(Model):
+    """
+    Модель записи ленты: рецепт автора, на которого подписан пользователь.
+    """
+
+    user = ForeignKey(
+        User,
+        on_delete=CASCADE,
+        related_name='feed',
+        db_index=False,
+        verbose_name='Пользователь',
+        help_text='Владелец ленты',
+    )
+    recipe = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+        help_text='Рецепт в ленте',
+    )
+    pub_date = DateTimeField(
+        verbose_name='Дата публиции',
+        help_text='Дата публиции рецепта',
+    )
+
+    objects = FeedQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Запись ленты')
+        verbose_name_plural = _('Лента подписок')
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_user_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return USER_RECIPE.format(self.user, self.recipe)
+
+
+class SimilarRecipe(Model):
+    """
+    Модель соседа рецепта: рецепт, который часто добавляют в избранное
+    или корзину вместе с ним. Заполняется командой build_similar_recipes.
+    """
+
+    recipe = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name='similar_recipes',
+        db_index=False,
+        verbose_name='Рецепт',
+        help_text='Рецепт',
+    )
+    similar = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт',
+        help_text='Похожий рецепт',
+    )
+    score = FloatField(
+        verbose_name='Сходство',
+        help_text='Косинусное сходство по избранному и корзинам',
+    )
+
+    class Meta:
+        verbose_name = _('Похожий рецепт')
+        verbose_name_plural = _('Похожие рецепты')
+        indexes = [
+            Index(
+                fields=('recipe', '-score'), name='similar_recipe_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar}'
+
+
+class SimilaritySignature(Model):
+    """
+    Модель отпечатка набора пользователей, добавивших рецепт
+    в избранное или корзину, на момент последнего расчёта соседей.
+    По изменившимся отпечаткам находятся рецепты для пересчёта.
+    """
+
+    recipe = OneToOneField(
+        Recipe,
+        on_delete=CASCADE,
+        primary_key=True,
+        related_name='similarity_signature',
+        verbose_name='Рецепт',
+        help_text='Рецепт',
+    )
+    signature = BigIntegerField(
+        verbose_name='Отпечаток',
+        help_text='Хеш пользователей и типов связей рецепта',
+    )
+
+    class Meta:
+        verbose_name = _('Отпечаток сигналов рецепта')
+        verbose_name_plural = _('Отпечатки сигналов рецептов')
+
+
+class RankingEpoch(Model):
+    """
+    Модель начала отсчёта оценок популярности рецептов (одна запись).
+
+    Событие в момент t прибавляет к оценке вес, умноженный
+    на 2 ** ((t - epoch) / период полураспада), поэтому старые события
+    относительно затухают без обновления всех рецептов. Команда
+    renormalize_recipe_scores переносит начало отсчёта вперёд,
+    чтобы оценки не росли неограниченно.
+    """
+
+    epoch = FloatField(
+        verbose_name='Начало отсчёта',
+        help_text='Unix-время, к которому приведены оценки рецептов',
+    )
+
+    class Meta:
+        verbose_name = _('Начало отсчёта оценок')
+        verbose_name_plural = _('Начало отсчёта оценок')
+
+    def __str__(self):
+        return str(self.epoch)
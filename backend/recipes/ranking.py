@@ -0,0 +1,98 @@
+from time import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Subquery, Value
+from django.db.models.functions import Coalesce, Power
+from django.db.transaction import atomic
+
+ORDERINGS = {'trending': 'trending_score', 'popular': 'popular_score'}
+WEIGHTS = {'favorites_count': 1.0, 'carts_count': 1.0}
+
+
+def get_half_lives():
+    """Периоды полураспада оценок в секундах."""
+    return {
+        'trending_score': settings.RECIPE_TRENDING_HALF_LIFE,
+        'popular_score': settings.RECIPE_POPULAR_HALF_LIFE,
+    }
+
+
+def score_updates(counter, count):
+    """
+    Выражения для UPDATE рецептов, прибавляющие к оценкам count
+    событий счётчика counter. Начало отсчёта читается тем же
+    запросом, поэтому не расходится с оценками во время
+    перенормировки.
+
+    Отмена события оценки не уменьшает: вклад события уже затухает
+    сам, а вычитание его веса на момент отмены сняло бы больше,
+    чем от события осталось.
+    """
+    from recipes.models import RankingEpoch
+
+    now = Value(time())
+    epoch = Coalesce(
+        Subquery(RankingEpoch.objects.values('epoch')[:1]),
+        now,
+        output_field=FloatField(),
+    )
+    weight = Value(WEIGHTS[counter] * count)
+    return {
+        field: F(field) + weight * Power(2.0, (now - epoch) / half_life)
+        for field, half_life in get_half_lives().items()
+    }
+
+
+def lock_recipes(recipe_model):
+    """
+    PostgreSQL: блокирует запись в таблицу рецептов до конца
+    транзакции, чтобы события не прибавились в старом масштабе.
+    """
+    if connection.vendor == 'postgresql':
+        table = connection.ops.quote_name(recipe_model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+
+
+def renormalize(recipe_model, epoch_model, now=None):
+    """
+    Переносит начало отсчёта на текущий момент, умножая оценки
+    на 2 ** (-сдвиг / период полураспада). Порядок рецептов
+    не меняется. Возвращает сдвиг в секундах.
+    """
+    now = time() if now is None else now
+    with atomic():
+        lock_recipes(recipe_model)
+        epoch = epoch_model.objects.select_for_update().first()
+        if epoch is None:
+            epoch_model.objects.create(epoch=now)
+            return 0.0
+        shift = now - epoch.epoch
+        recipe_model.objects.update(
+            **{
+                field: F(field) * 2 ** (-shift / half_life)
+                for field, half_life in get_half_lives().items()
+            }
+        )
+        epoch.epoch = now
+        epoch.save(update_fields=('epoch',))
+    return shift
+
+
+def reset_scores(recipe_model, epoch_model, now=None):
+    """
+    Пересчитывает оценки по счётчикам, считая все накопленные
+    события произошедшими сейчас, и ставит начало отсчёта на сейчас.
+    """
+    now = time() if now is None else now
+    with atomic():
+        lock_recipes(recipe_model)
+        epoch_model.objects.all().delete()
+        epoch_model.objects.create(epoch=now)
+        score = sum(
+            F(counter) * weight for counter, weight in WEIGHTS.items()
+        )
+        return recipe_model.objects.update(
+            **{field: score for field in get_half_lives()}
+        )
@@ -0,0 +1,94 @@
+import re
+
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_TRIGGERS = ('ai', 'ad', 'au')
+WORD = re.compile(r'\w+')
+
+POSTGRES_QUERY = "websearch_to_tsquery('russian', %s)"
+# Таблица FTS5 и её триггеры, как их создаёт миграция 0018.
+SQLITE_INSTALL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    "name, text, content='recipes_recipe', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai '
+    'AFTER INSERT ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad '
+    'AFTER DELETE ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) '
+    "VALUES ('delete', old.id, old.name, old.text); END",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au '
+    'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) '
+    "VALUES ('delete', old.id, old.name, old.text); "
+    f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+
+def restore_sqlite_triggers(using, **kwargs):
+    """
+    SQLite пересоздаёт таблицу рецептов при многих изменениях схемы
+    и теряет её триггеры; после миграций они создаются заново,
+    а индекс FTS5 перестраивается.
+    """
+    from django.db import connections
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE %s",
+            (f'{FTS_TABLE}%',),
+        )
+        names = {row[0] for row in cursor.fetchall()}
+        if FTS_TABLE not in names or all(
+            f'{FTS_TABLE}_{name}' in names for name in FTS_TRIGGERS
+        ):
+            return
+        for statement in SQLITE_INSTALL:
+            cursor.execute(statement)
+
+
+def fts5_query(text):
+    """
+    Запрос FTS5 из слов текста: все слова обязательны, каждое
+    ищется как начало слова, что отчасти заменяет стемминг.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(text))
+
+
+def search_expressions(vendor, text):
+    """
+    Возвращает условие совпадения и оценку релевантности (чем больше,
+    тем релевантнее) для поиска text или None, если искать нечего.
+    """
+    if vendor == 'postgresql':
+        match = f'"recipes_recipe"."search_vector" @@ {POSTGRES_QUERY}'
+        rank = f'ts_rank("recipes_recipe"."search_vector", {POSTGRES_QUERY})'
+        params = (text,)
+    else:
+        query = fts5_query(text)
+        if not query:
+            return None
+        match = (
+            f'"recipes_recipe"."id" IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        )
+        rank = (
+            f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = "recipes_recipe"."id")'
+        )
+        params = (query,)
+    return (
+        RawSQL(match, params, output_field=BooleanField()),
+        RawSQL(rank, params, output_field=FloatField()),
+    )
@@ -0,0 +1,58 @@
+"""Общие данные для тестов: пользователи, теги, ингредиенты и рецепты."""
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import User
+
+IMAGE = 'recipes/images/test.png'
+
+
+def create_user(username='viewer'):
+    return User.objects.create(
+        username=username, email=f'{username}@example.com'
+    )
+
+
+def create_ingredients(*names, measurement_unit='г'):
+    return [
+        Ingredient.objects.create(name=name, measurement_unit=measurement_unit)
+        for name in names
+    ]
+
+
+def create_tags(*slugs):
+    first = Tag.objects.count()
+    return [
+        Tag.objects.create(name=slug, color=f'#{number:06x}', slug=slug)
+        for number, slug in enumerate(slugs, first)
+    ]
+
+
+def create_recipe(author, name='Рецепт', amounts=None, **fields):
+    """Рецепт с картинкой-заглушкой и составом {ингредиент: количество}."""
+    fields.setdefault('text', 'Описание')
+    fields.setdefault('cooking_time', 5)
+    recipe = Recipe.objects.create(
+        author=author, name=name, image=IMAGE, **fields
+    )
+    if amounts:
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipes=recipe, ingredient=ingredient, amount=amount
+            )
+            for ingredient, amount in amounts.items()
+        )
+    return recipe
+
+
+def create_recipes(author, count):
+    return [
+        create_recipe(author, f'Рецепт {number}') for number in range(count)
+    ]
+
+
+def api_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
@@ -0,0 +1,89 @@
+import json
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.management.commands import load_ingredients
+from recipes.models import Ingredient
+from recipes.tests.factories import create_ingredients
+
+
+class LoadIngredientsTest(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        create_ingredients('соль')
+
+    def write(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        return path
+
+    def load(self, path, *args):
+        output = StringIO()
+        with CaptureQueriesContext(connection) as captured:
+            call_command('load_ingredients', path, *args, stdout=output)
+        self.queries = [query['sql'] for query in captured.captured_queries]
+        return output.getvalue()
+
+    def catalog(self):
+        return set(Ingredient.objects.values_list('name', 'measurement_unit'))
+
+    def test_csv_skips_header_duplicates_and_existing(self):
+        path = self.write(
+            'ingredients.csv',
+            'name,measurement_unit\n'
+            'соль,г\n'
+            ' сахар , г\n'
+            'сахар,г\n'
+            'сахар,кг\n'
+            ',шт\n'
+            'молоко,мл\n',
+        )
+        output = self.load(path, '--batch-size', '2')
+        self.assertIn(
+            'Прочитано строк: 6, пропущено некорректных: 1, '
+            'добавлено ингредиентов: 3.',
+            output,
+        )
+        self.assertEqual(
+            self.catalog(),
+            {('соль', 'г'), ('сахар', 'г'), ('сахар', 'кг'), ('молоко', 'мл')},
+        )
+        temporary_table = any('ingredient_load' in sql for sql in self.queries)
+        self.assertEqual(temporary_table, connection.vendor == 'postgresql')
+        self.load(path)
+        self.assertEqual(Ingredient.objects.count(), 4)
+
+    def test_json_is_read_in_chunks(self):
+        items = [
+            {'name': f'ингредиент {number}', 'measurement_unit': 'г'}
+            for number in range(50)
+        ]
+        path = self.write(
+            'ingredients.data', json.dumps(items + items[:5], indent=2)
+        )
+        with mock.patch.object(load_ingredients, 'READ_SIZE', 64):
+            output = self.load(path, '--format', 'json')
+        self.assertIn('добавлено ингредиентов: 50.', output)
+        self.assertEqual(Ingredient.objects.count(), 51)
+
+    def test_invalid_files_are_rejected(self):
+        cases = {
+            'ingredients.txt': 'соль,г\n',
+            'object.json': '{"name": "соль"}',
+            'broken.json': '[{"name": "соль", ',
+            'numbers.json': '[1, 2]',
+        }
+        for name, content in cases.items():
+            with self.subTest(name=name):
+                with self.assertRaises(CommandError):
+                    self.load(self.write(name, content))
+        self.assertEqual(Ingredient.objects.count(), 1)
@@ -0,0 +1,54 @@
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Cart, Favorite, SimilarRecipe
+from recipes.tests.factories import create_recipes, create_user
+
+RECIPES = 15
+USERS = 10
+COUNT = 3
+
+
+class SimilarRecipesTest(TestCase):
+    def setUp(self):
+        self.random = random.Random(2023)
+        self.users = [
+            create_user(f'user{number}') for number in range(USERS)
+        ]
+        self.recipes = create_recipes(create_user('author'), RECIPES)
+        for _ in range(40):
+            self.toggle_link()
+
+    def toggle_link(self):
+        model = self.random.choice((Favorite, Cart))
+        link = {
+            'user': self.random.choice(self.users),
+            'recipes': self.random.choice(self.recipes),
+        }
+        if not model.objects.filter(**link).delete()[0]:
+            model.objects.create(**link)
+
+    def build(self, *args):
+        call_command(
+            'build_similar_recipes', *args, count=COUNT, stdout=StringIO()
+        )
+        return set(
+            SimilarRecipe.objects.values_list('recipe', 'similar', 'score')
+        )
+
+    def test_incremental_build_matches_full_build(self):
+        self.build()
+        for changes in (1, 3, 10):
+            for _ in range(changes):
+                self.toggle_link()
+            incremental = self.build()
+            self.assertEqual(incremental, self.build('--full'))
+
+    def test_deleted_neighbour_is_replaced(self):
+        self.build()
+        neighbour = SimilarRecipe.objects.order_by('pk').first().similar
+        neighbour.delete()
+        self.assertEqual(self.build(), self.build('--full'))
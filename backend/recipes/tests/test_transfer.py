@@ -0,0 +1,117 @@
+import json
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from recipes.models import FeedEntry, Ingredient, Recipe, Tag
+from recipes.tests.factories import (
+    IMAGE,
+    create_ingredients,
+    create_recipe,
+    create_tags,
+    create_user,
+)
+from users.models import Subscription, User
+
+
+class RecipeTransferTest(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(MEDIA_ROOT=self.directory / 'media')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        Subscription.objects.create(user=self.reader, author=self.author)
+        salt, sugar = create_ingredients('соль', 'сахар')
+        breakfast, dinner = create_tags('breakfast', 'dinner')
+        first = create_recipe(self.author, 'Омлет', {salt: 2, sugar: 1})
+        first.tags.set([breakfast, dinner])
+        create_recipe(create_user('guest'), 'Каша', {sugar: 5})
+
+    def export(self, name, *args):
+        path = str(self.directory / name)
+        call_command('export_recipes', path, *args, stderr=StringIO())
+        return path
+
+    def import_(self, path):
+        output = StringIO()
+        call_command(
+            'import_recipes',
+            path,
+            '--batch-size',
+            '1',
+            stdout=output,
+            stderr=StringIO(),
+        )
+        return output.getvalue()
+
+    def records(self, path):
+        with open(path, encoding='utf-8') as file:
+            return [
+                {
+                    key: value
+                    for key, value in json.loads(line).items()
+                    if key != 'id'
+                }
+                for line in file
+            ]
+
+    def clear_catalog(self):
+        Recipe.objects.all().delete()
+        Tag.objects.all().delete()
+        Ingredient.objects.all().delete()
+        User.objects.filter(username='guest').delete()
+
+    def test_ndjson_round_trip(self):
+        exported = self.export('recipes.ndjson', '--chunk-size', '1')
+        records = self.records(exported)
+        self.assertEqual(
+            [record['name'] for record in records], ['Омлет', 'Каша']
+        )
+        self.clear_catalog()
+        output = self.import_(exported)
+        self.assertIn(
+            'Создано пользователей: 1, тегов: 2, ингредиентов: 2.', output
+        )
+        self.assertEqual(self.records(self.export('again.ndjson')), records)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 1)
+        self.assertEqual(User.objects.get(username='guest').recipes_count, 1)
+        self.assertQuerysetEqual(
+            FeedEntry.objects.filter(user=self.reader),
+            Recipe.objects.filter(author=self.author),
+            transform=lambda entry: entry.recipe,
+        )
+
+    def test_filters(self):
+        exported = self.export('recipes.ndjson', '--authors', 'guest')
+        self.assertEqual(
+            [record['name'] for record in self.records(exported)], ['Каша']
+        )
+
+    def test_archive_restores_images(self):
+        default_storage.save(IMAGE, ContentFile(b'image'))
+        exported = self.export('recipes.tar.gz', '--media')
+        self.clear_catalog()
+        default_storage.delete(IMAGE)
+        self.import_(exported)
+        self.assertEqual(Recipe.objects.count(), 2)
+        with default_storage.open(IMAGE) as file:
+            self.assertEqual(file.read(), b'image')
+        self.assertEqual(
+            set(Recipe.objects.values_list('image', flat=True)), {IMAGE}
+        )
+
+    def test_broken_line_is_reported(self):
+        path = self.directory / 'broken.ndjson'
+        path.write_text('{"name": \n', encoding='utf-8')
+        with self.assertRaisesMessage(CommandError, 'Строка 1'):
+            self.import_(str(path))
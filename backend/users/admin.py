@@ -11,6 +11,8 @@ class UserAdmin(UserAdmin):
         'first_name',
         'last_name',
         'email',
+        'recipes_count',
+        'followers_count',
     )
     search_fields = (
         'username',
@@ -29,3 +31,8 @@ class SubscriptionAdmin(ModelAdmin):
     search_fields = ('user', 'author')
     list_filter = ('user', 'author')
     ordering = ('user',)
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return super().get_readonly_fields(request, obj)
+        return ('user', 'author')
@@ -6,12 +6,16 @@ from django.db.models import (
     EmailField,
     F,
     ForeignKey,
+    Index,
     Model,
+    PositiveIntegerField,
     Q,
     UniqueConstraint,
 )
 from django.utils.translation import gettext_lazy as _
 
+from utils.links import CounterFieldsMixin, LinkQuerySet
+
 from .validators import validate_username
 
 MAX_LEN_EMAIL = 254
@@ -21,7 +25,7 @@ MAX_LEN_PASSWORD = 128
 FOLLOW = '{} подписан(а) на {}'
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
     email = EmailField(
         max_length=MAX_LEN_EMAIL,
         unique=True,
@@ -50,6 +54,20 @@ class User(AbstractUser):
         verbose_name='Пароль',
         help_text='Пароль',
     )
+    recipes_count = PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов',
+        help_text='Количество рецептов пользователя',
+    )
+    followers_count = PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков',
+        help_text='Количество подписчиков пользователя',
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     class Meta:
         verbose_name = _('Пользователя')
@@ -60,20 +78,38 @@ class User(AbstractUser):
         return f'{self.username}: {self.email}'
 
 
+class SubscriptionQuerySet(LinkQuerySet):
+    counter = 'followers_count'
+
+    def update_related(self, pairs, sign):
+        """Добавляет рецепты автора в ленту подписчика или убирает их."""
+        from recipes.models import FeedEntry
+
+        for user_id, author_id in pairs:
+            if sign > 0:
+                FeedEntry.objects.backfill(user_id, author_id)
+            else:
+                FeedEntry.objects.prune(user_id, author_id)
+
+
 class Subscription(Model):
     user = ForeignKey(
         User,
         on_delete=CASCADE,
         related_name='follower',
+        db_index=False,
         verbose_name='Подписчик',
     )
     author = ForeignKey(
         User,
         on_delete=CASCADE,
         related_name='author',
+        db_index=False,
         verbose_name='Автор',
     )
 
+    objects = SubscriptionQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Подписка')
         verbose_name_plural = _('Подписки')
@@ -81,6 +117,11 @@ class Subscription(Model):
             UniqueConstraint(name='unique_follow', fields=['author', 'user']),
             CheckConstraint(name='not_follow', check=~Q(user=F('author'))),
         ]
+        indexes = [
+            Index(
+                fields=('user', 'author'), name='subscription_user_author_idx'
+            ),
+        ]
 
     def __str__(self):
         return FOLLOW.format(self.user.username, self.author.username)
@@ -0,0 +1,28 @@
+from itertools import islice
+
+from django.db import connections
+
+
+def insert_from_select(model, fields, queryset):
+    """
+    Выполняет INSERT INTO model (fields) SELECT ... по запросу queryset,
+    колонки которого идут в том же порядке, что и fields.
+    Возвращает количество вставленных строк.
+    """
+    sql, params = queryset.query.sql_with_params()
+    meta = model._meta
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(meta.get_field(name).column) for name in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(meta.db_table)} ({columns}) {sql}', params
+        )
+        return cursor.rowcount
+
+
+def batches(rows, size):
+    """Разбивает итерируемый объект на списки не длиннее size."""
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
@@ -0,0 +1,87 @@
+from hashlib import md5
+
+from recipes.models import VIEWER_FLAGS, Ingredient, Recipe, Tag
+from utils.versions import get_version
+
+
+def make_etag(*parts):
+    return md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def catalog_etag(model):
+    """ETag списка или объекта справочника по версии его таблицы."""
+
+    def etag(request, *args, **kwargs):
+        token, _ = get_version(model)
+        return make_etag(
+            token, request.get_full_path(), request.META.get('HTTP_ACCEPT')
+        )
+
+    return etag
+
+
+def catalog_last_modified(model):
+    def last_modified(request, *args, **kwargs):
+        return get_version(model)[1]
+
+    return last_modified
+
+
+def recipe_state(user, pk):
+    return (
+        Recipe.objects.with_viewer_flags(user)
+        .filter(pk=pk)
+        .values('updated_at', *VIEWER_FLAGS)
+    )
+
+
+def get_recipe_state(request, pk):
+    """
+    Возвращает дату изменения рецепта и флаги пользователя одним
+    запросом, запоминая результат на время обработки запроса.
+    """
+    if not hasattr(request, 'recipe_state'):
+        try:
+            request.recipe_state = recipe_state(request.user, int(pk)).first()
+        except (TypeError, ValueError):
+            request.recipe_state = None
+    return request.recipe_state
+
+
+async def aget_recipe_state(request, pk):
+    """Асинхронный вариант get_recipe_state для целого pk."""
+    if not hasattr(request, 'recipe_state'):
+        request.recipe_state = await recipe_state(request.user, pk).afirst()
+    return request.recipe_state
+
+
+def recipe_etag(request, pk, *args, **kwargs):
+    """
+    ETag рецепта: меняется при изменении рецепта, его автора,
+    справочников тегов и ингредиентов и флагов пользователя.
+    """
+    state = get_recipe_state(request, pk)
+    if state is None:
+        return None
+    return make_etag(
+        *state.values(),
+        get_version(Tag)[0],
+        get_version(Ingredient)[0],
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT'),
+    )
+
+
+def recipe_last_modified(request, pk, *args, **kwargs):
+    """
+    Дата изменения рецепта. Для авторизованных пользователей не
+    отдаётся: их флаги меняются без изменения самого рецепта.
+    """
+    if request.user.is_authenticated:
+        return None
+    state = get_recipe_state(request, pk)
+    if state is None:
+        return None
+    return max(
+        state['updated_at'], get_version(Tag)[1], get_version(Ingredient)[1]
+    )
@@ -0,0 +1,82 @@
+from base64 import b64decode
+from binascii import Error as Base64Error
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from utils.images import FORMATS
+
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+BASE64_SEPARATOR = ';base64,'
+
+
+class RecipeImageField(Base64ImageField):
+    """
+    Изображение рецепта: файл из multipart/form-data или, для
+    совместимости, строка base64.
+
+    Загруженный файл проверяется только по заголовку, без декодирования
+    пикселей, и дальше передаётся в хранилище как есть. Если при
+    изменении рецепта прислано текущее изображение (его URL или те же
+    байты в base64), возвращается сохранённый файл без повторной
+    обработки.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return self.validate_upload(data)
+        current = self.get_current()
+        if current and isinstance(data, str):
+            if self.is_current_url(data, current):
+                return current
+            if self.is_current_content(data, current):
+                return current
+        return super().to_internal_value(data)
+
+    def get_current(self):
+        instance = getattr(self.parent, 'instance', None)
+        return getattr(instance, self.source, None) or None
+
+    @staticmethod
+    def is_current_url(data, current):
+        path = urlsplit(data).path
+        if path == current.name:
+            return True
+        names = [current.name]
+        for variant in current.instance.image_variants.values():
+            names += [variant[extension] for extension in FORMATS]
+        return any(
+            path == urlsplit(default_storage.url(name)).path
+            for name in names
+        )
+
+    @staticmethod
+    def is_current_content(data, current):
+        _, _, encoded = data.rpartition(BASE64_SEPARATOR)
+        encoded = encoded.strip()
+        try:
+            if len(encoded) * 3 // 4 - encoded[-2:].count('=') != (
+                current.size
+            ):
+                return False
+            with current.open('rb') as file:
+                return file.read() == b64decode(encoded)
+        except (Base64Error, ValueError, OSError):
+            return False
+
+    def validate_upload(self, file):
+        try:
+            with Image.open(file) as image:
+                extension = IMAGE_FORMATS.get(image.format)
+        except (OSError, Image.DecompressionBombError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        if extension is None:
+            raise ValidationError(self.INVALID_TYPE_MESSAGE)
+        file.seek(0)
+        file.name = f'{uuid4()}.{extension}'
+        return file
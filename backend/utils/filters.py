@@ -1,6 +1,8 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.ranking import ORDERINGS
 
 
 class IngredientFilter(FilterSet):
@@ -16,22 +18,61 @@ class RecipeFilter(FilterSet):
         field_name='tags__slug',
         queryset=Tag.objects.all(),
         to_field_name='slug',
+        method='filter_tags',
     )
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(method='get_is_in_basket')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in ORDERINGS],
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author',
+            'tags',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'search',
+            'ordering',
+        )
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Отбирает рецепты с любым из тегов через EXISTS по индексу
+        (recipe_id, tag_id) вместо JOIN, которому нужен DISTINCT.
+        """
+        if not value:
+            return queryset
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef('pk'), tag__in=value
+                )
+            )
+        )
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск, результаты упорядочены по релевантности."""
+        return queryset.search(value)
+
+    def filter_ordering(self, queryset, name, value):
+        """
+        Сортирует по оценке тренда или популярности; для каждой
+        оценки есть индекс (оценка, id).
+        """
+        return queryset.order_by(f'-{ORDERINGS[value]}', '-id')
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(favorite_list__user=user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def get_is_in_basket(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(cart_list__user=user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
@@ -0,0 +1,198 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+from multiprocessing import get_context
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.transaction import atomic, on_commit
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+SIZES = {'card': 480, 'detail': 960, 'full': 1920}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DEFAULT_SIZE = 'detail'
+DERIVATIVES_PATH = 'recipes/derivatives/{}/{}-{}.{}'
+
+_executor = None
+_executor_lock = Lock()
+
+
+def render_derivatives(data):
+    """
+    Уменьшает изображение до размеров SIZES и кодирует в WebP и JPEG.
+
+    Выполняется в отдельном процессе, поэтому работает только с байтами
+    и не обращается к Django. Возвращает {размер: (ширина, {формат:
+    байты})}.
+    """
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', image.size, 'white')
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        derivatives = {}
+        for size, width in SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((width, width), Image.LANCZOS)
+            encoded = {}
+            for extension, (image_format, options) in FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, image_format, **options)
+                encoded[extension] = buffer.getvalue()
+            derivatives[size] = (resized.width, encoded)
+        return derivatives
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESS_WORKERS,
+                mp_context=get_context('spawn'),
+            )
+        return _executor
+
+
+def delete_derivatives(variants):
+    """Удаляет из хранилища файлы производных {размер: вариант}."""
+    for variant in variants.values():
+        for extension in FORMATS:
+            if variant.get(extension):
+                default_storage.delete(variant[extension])
+
+
+def save_derivatives(recipe_id, image_name, derivatives):
+    """
+    Сохраняет производные изображения в хранилище и записывает
+    их в рецепт, если за это время изображение не поменялось.
+    Файлы, оставшиеся без ссылки из рецепта, удаляются: прежние
+    производные или, если изображение уже заменено, только что
+    сохранённые.
+    """
+    from recipes.models import Recipe
+
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    variants = {}
+    for size, (width, encoded) in derivatives.items():
+        variant = {'width': width}
+        for extension, data in encoded.items():
+            variant[extension] = default_storage.save(
+                DERIVATIVES_PATH.format(recipe_id, stem, size, extension),
+                ContentFile(data),
+            )
+        variants[size] = variant
+    with atomic():
+        stale = (
+            Recipe.objects.select_for_update()
+            .filter(pk=recipe_id, image=image_name)
+            .values_list('image_variants', flat=True)
+            .first()
+        )
+        if stale is None:
+            stale = variants
+        else:
+            Recipe.objects.filter(pk=recipe_id).update(
+                image_variants=variants, updated_at=timezone.now()
+            )
+    delete_derivatives(stale)
+
+
+def derivatives_done(recipe_id, image_name, future):
+    close_old_connections()
+    try:
+        save_derivatives(recipe_id, image_name, future.result())
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение рецепта %s', recipe_id
+        )
+    finally:
+        close_old_connections()
+
+
+def build_derivatives(recipe_id, image_name):
+    """
+    Запускает построение производных изображения рецепта.
+
+    Изображение обрабатывается в пуле процессов, а результат
+    сохраняется по готовности. IMAGE_PROCESS_WORKERS = 0 — только для
+    тестов и разработки: изображение обрабатывается сразу, в запросе.
+    """
+    with default_storage.open(image_name) as file:
+        data = file.read()
+    if not settings.IMAGE_PROCESS_WORKERS:
+        save_derivatives(recipe_id, image_name, render_derivatives(data))
+        return
+    get_executor().submit(render_derivatives, data).add_done_callback(
+        partial(derivatives_done, recipe_id, image_name)
+    )
+
+
+def refresh_derivatives(recipe_id, image_name, stale_variants):
+    """
+    Удаляет производные прежнего изображения и строит новые.
+    Ошибки только записываются в журнал: рецепт к этому моменту
+    уже сохранён.
+    """
+    try:
+        delete_derivatives(stale_variants)
+        build_derivatives(recipe_id, image_name)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение рецепта %s', recipe_id
+        )
+
+
+def schedule_derivatives(recipe, stale_variants=None):
+    """Обновляет производные изображения рецепта после коммита."""
+    on_commit(
+        partial(
+            refresh_derivatives,
+            recipe.pk,
+            recipe.image.name,
+            stale_variants or {},
+        )
+    )
+
+
+def get_image_url(recipe, size=DEFAULT_SIZE, extension='jpeg'):
+    """URL производной нужного размера или оригинала, пока её нет."""
+    variant = recipe.image_variants.get(size)
+    if variant:
+        return default_storage.url(variant[extension])
+    if recipe.image:
+        return recipe.image.url
+    return None
+
+
+def get_srcset(recipe):
+    """Возвращает srcset для каждого формата производных."""
+    variants = sorted(
+        {
+            variant['width']: variant
+            for variant in recipe.image_variants.values()
+        }.values(),
+        key=lambda variant: variant['width'],
+    )
+    if not variants:
+        return None
+    return {
+        extension: ', '.join(
+            f'{default_storage.url(variant[extension])} {variant["width"]}w'
+            for variant in variants
+        )
+        for extension in FORMATS
+    }
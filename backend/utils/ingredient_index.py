@@ -0,0 +1,101 @@
+from bisect import bisect_left, bisect_right
+from threading import Lock
+
+from recipes.models import Ingredient
+from utils.versions import get_version
+
+MAX_RESULTS = 30
+SEPARATOR = '\n'
+LAST_CHAR = chr(0x10FFFF)
+
+
+def normalize(text):
+    return text.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Хранит отсортированные нормализованные названия: совпадения
+    по началу названия ищутся бинарным поиском, совпадения внутри
+    названия - поиском подстроки в склеенной строке всех названий.
+    Индекс перестраивается, когда меняется версия таблицы ингредиентов.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.snapshot = None
+
+    def get_snapshot(self):
+        version = get_version(Ingredient)
+        snapshot = self.snapshot
+        if snapshot is None or snapshot['version'] != version:
+            with self.lock:
+                snapshot = self.snapshot
+                if snapshot is None or snapshot['version'] != version:
+                    snapshot = self.snapshot = self.build(version)
+        return snapshot
+
+    @staticmethod
+    def build(version):
+        entries = sorted(
+            (normalize(name), pk, name, unit)
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        keys = [entry[0] for entry in entries]
+        starts, offset = [], 0
+        for key in keys:
+            starts.append(offset)
+            offset += len(key) + len(SEPARATOR)
+        return {
+            'version': version,
+            'keys': keys,
+            'rows': [
+                {'id': pk, 'name': name, 'measurement_unit': unit}
+                for _, pk, name, unit in entries
+            ],
+            'haystack': SEPARATOR.join(keys),
+            'starts': starts,
+        }
+
+    def search(self, query, limit=MAX_RESULTS):
+        """
+        Возвращает не больше limit ингредиентов: сначала те, название
+        которых начинается с query, затем содержащие query внутри
+        названия. Пустой запрос возвращает начало каталога.
+        """
+        snapshot = self.get_snapshot()
+        query = normalize(query.strip()).replace(SEPARATOR, ' ')
+        rows = snapshot['rows']
+        if not query:
+            return rows[:limit]
+        keys = snapshot['keys']
+        first = bisect_left(keys, query)
+        last = bisect_left(keys, query + LAST_CHAR, first)
+        found = rows[first:min(last, first + limit)]
+        if len(found) < limit:
+            found += self.find_substrings(snapshot, query, first, last)[
+                :limit - len(found)
+            ]
+        return found
+
+    @staticmethod
+    def find_substrings(snapshot, query, first, last):
+        haystack, starts = snapshot['haystack'], snapshot['starts']
+        matches = {}
+        position = haystack.find(query)
+        while position != -1:
+            row = bisect_right(starts, position) - 1
+            if not first <= row < last and row not in matches:
+                matches[row] = position - starts[row]
+            position = haystack.find(query, position + 1)
+        return [
+            snapshot['rows'][row]
+            for row in sorted(matches, key=lambda row: (matches[row], row))
+        ]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,189 @@
+from collections import Counter, defaultdict
+
+from django.db import connections
+from django.db.models import F, QuerySet
+from django.db.models.sql import UpdateQuery
+
+
+class LinkQuerySet(QuerySet):
+    """
+    Набор запросов для связей пользователя с объектом
+    (избранное, корзина, подписки).
+
+    Связь создаётся и удаляется одним запросом без предварительной
+    проверки: повтор и гонка двойного запроса разрешаются уникальным
+    ограничением в базе.
+
+    Счётчик counter объекта и производные данные (update_related)
+    меняются в links_changed. Её вызывают методы ниже, а сохранение
+    и удаление отдельных записей (админка, каскадное удаление) —
+    через сигналы в api.signals.
+    """
+
+    counter = None
+
+    def get_target_field(self):
+        return next(
+            field
+            for field in self.model._meta.concrete_fields
+            if field.many_to_one and field.name != 'user'
+        )
+
+    def counter_updates(self, delta):
+        """Поля, которые меняются вместе со счётчиком, как в update()."""
+        return {}
+
+    def update_counters(self, target_ids, sign):
+        """Меняет счётчики объектов на число их связей со знаком sign."""
+        if self.counter is None:
+            return
+        model = self.get_target_field().related_model
+        by_count = defaultdict(list)
+        for pk, count in Counter(target_ids).items():
+            by_count[count].append(pk)
+        for count, pks in by_count.items():
+            delta = sign * count
+            model.objects.filter(pk__in=pks).update(
+                **{self.counter: F(self.counter) + delta},
+                **self.counter_updates(delta),
+            )
+
+    def update_related(self, pairs, sign):
+        """
+        Обновляет данные, производные от связей (id пользователя,
+        id объекта), после добавления (sign=1) или удаления (sign=-1).
+        """
+
+    def links_changed(self, pairs, sign):
+        pairs = list(pairs)
+        if pairs:
+            self.update_counters([target for _, target in pairs], sign)
+            self.update_related(pairs, sign)
+
+    def instance_changed(self, instance, sign):
+        """links_changed для одной сохранённой или удаляемой записи."""
+        self.links_changed(
+            (
+                (
+                    instance.user_id,
+                    getattr(instance, self.get_target_field().attname),
+                ),
+            ),
+            sign,
+        )
+
+    def _execute(self, sql, params):
+        meta = self.model._meta
+        target = self.get_target_field()
+        quote = connections[self.db].ops.quote_name
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                sql.format(
+                    table=quote(meta.db_table),
+                    user=quote(meta.get_field('user').column),
+                    target=quote(target.column),
+                    target_table=quote(target.related_model._meta.db_table),
+                    target_pk=quote(target.related_model._meta.pk.column),
+                    placeholders=', '.join(['%s'] * (len(params) - 1)),
+                ),
+                params,
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _insert(self, user, target_ids):
+        return self._execute(
+            'INSERT INTO {table} ({user}, {target}) '
+            'SELECT %s, {target_pk} FROM {target_table} '
+            'WHERE {target_pk} IN ({placeholders}) '
+            'ON CONFLICT DO NOTHING '
+            'RETURNING {target}',
+            (user.pk, *target_ids),
+        )
+
+    def link_many(self, user, target_ids):
+        """
+        Создаёт связи с существующими объектами, которых ещё нет.
+        Возвращает id объектов, связи с которыми созданы.
+        """
+        target_ids = list(target_ids)
+        if not target_ids:
+            return []
+        linked = self._insert(user, target_ids)
+        self.links_changed(((user.pk, pk) for pk in linked), 1)
+        return linked
+
+    def unlink_many(self, user, target_ids):
+        """
+        Удаляет связи с объектами. Возвращает id объектов, связи
+        с которыми существовали.
+        """
+        target_ids = list(target_ids)
+        if not target_ids:
+            return []
+        unlinked = self._execute(
+            'DELETE FROM {table} '
+            'WHERE {user} = %s AND {target} IN ({placeholders}) '
+            'RETURNING {target}',
+            (user.pk, *target_ids),
+        )
+        self.links_changed(((user.pk, pk) for pk in unlinked), -1)
+        return unlinked
+
+    def link(self, user, target_id):
+        """
+        Создаёт связь, если объект существует и связи ещё нет.
+        Возвращает объект с новыми значениями полей или None.
+        Счётчик меняется тем же запросом, которым читается объект.
+        """
+        if not self._insert(user, (target_id,)):
+            return None
+        self.update_related(((user.pk, target_id),), 1)
+        model = self.get_target_field().related_model
+        if self.counter is None:
+            return model.objects.get(pk=target_id)
+        return change_counter(
+            model, target_id, self.counter, 1, **self.counter_updates(1)
+        )
+
+    def unlink(self, user, target_id):
+        """Удаляет связь; возвращает True, если она существовала."""
+        return bool(self.unlink_many(user, (target_id,)))
+
+
+class CounterFieldsMixin:
+    """
+    Модель со счётчиками, которые меняются запросами UPDATE с F().
+
+    Полное save() загруженного объекта записывает все поля и вернуло
+    бы в базу устаревшие значения счётчиков, поэтому они исключаются
+    из записи, если update_fields не указаны.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not (
+            args
+            or self._state.adding
+            or kwargs.get('force_insert')
+            or kwargs.get('update_fields') is not None
+        ):
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+def change_counter(model, pk, counter, delta, **updates):
+    """
+    Изменяет счётчик объекта и поля updates (значения или выражения,
+    как в update()) и тем же запросом возвращает объект с новыми
+    значениями полей или None, если объекта нет.
+    """
+    query = model.objects.filter(pk=pk).query.chain(UpdateQuery)
+    query.add_update_values({counter: F(counter) + delta, **updates})
+    sql, params = query.get_compiler(model.objects.db).as_sql()
+    return next(iter(model.objects.raw(f'{sql} RETURNING *', params)), None)
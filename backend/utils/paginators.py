@@ -1,6 +1,291 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_CACHE_KEY = 'paginator:count:{}'
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def get_count_key(queryset):
+    """Ключ кеша количества по тексту запроса; EmptyResultSet, если пусто."""
+    sql, params = queryset.query.sql_with_params()
+    return COUNT_CACHE_KEY.format(
+        md5(repr((sql, params)).encode()).hexdigest()
+    )
+
+
+def get_cached_count(queryset):
+    """Возвращает количество объектов, кешируя его по тексту запроса."""
+    timeout = settings.PAGINATION_COUNT_CACHE_TIMEOUT
+    if not timeout:
+        return queryset.count()
+    try:
+        key = get_count_key(queryset)
+    except EmptyResultSet:
+        return 0
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+async def aget_cached_count(queryset):
+    """Асинхронный вариант get_cached_count."""
+    timeout = settings.PAGINATION_COUNT_CACHE_TIMEOUT
+    if not timeout:
+        return await queryset.acount()
+    try:
+        key = get_count_key(queryset)
+    except EmptyResultSet:
+        return 0
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, timeout)
+    return count
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size_query_param = "limit"
     page_size = 6
+
+    async def acount(self, queryset):
+        return await queryset.acount()
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        Асинхронный вариант paginate_queryset: количество и страница
+        читаются асинхронным ORM, номер проверяется как у Paginator.
+        """
+        self.request = request
+        paginator = self.django_paginator_class(
+            queryset, self.get_page_size(request)
+        )
+        paginator.count = await self.acount(queryset)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        bottom = (number - 1) * paginator.per_page
+        rows = [
+            obj async for obj in queryset[bottom:bottom + paginator.per_page]
+        ]
+        self.page = paginator._get_page(rows, number, paginator)
+        return rows
+
+
+class RecipePagination(PageLimitPagination):
+    """
+    Пагинация ленты рецептов.
+
+    Помимо номера страницы поддерживает курсорный режим: при наличии
+    параметра cursor страница выбирается по ключу сортировки без
+    OFFSET, поэтому любая страница стоит столько же, сколько первая.
+    Курсор работает при сортировке по убыванию одного из ключей
+    cursor_orderings (по умолчанию — первого), при другой (например,
+    по релевантности поиска) страницы выбираются по номеру.
+    Параметр count=false отключает подсчёт общего количества,
+    в остальных случаях оно кешируется. Кешированное количество
+    может устареть, поэтому страница выбирается срезом на один объект
+    больше и количеством не ограничивается.
+    """
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    cursor_orderings = (
+        ('pub_date', 'id'),
+        ('trending_score', 'id'),
+        ('popular_score', 'id'),
+    )
+
+    def use_cursor(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def get_cursor_fields(self, queryset):
+        """Ключ курсора для сортировки queryset или None."""
+        ordering = tuple(queryset.query.order_by)
+        if not ordering:
+            return self.cursor_orderings[0]
+        for fields in self.cursor_orderings:
+            if ordering == tuple(f'-{field}' for field in fields):
+                return fields
+        return None
+
+    def use_count(self, request):
+        return (
+            request.query_params.get(self.count_query_param, '').lower()
+            not in FALSE_VALUES
+        )
+
+    def set_mode(self, queryset, request):
+        self.request = request
+        self.cursor_fields = self.get_cursor_fields(queryset)
+        self.cursor_mode = (
+            self.use_cursor(request) and self.cursor_fields is not None
+        )
+        self.with_count = self.use_count(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.set_mode(queryset, request)
+        count = get_cached_count(queryset) if self.with_count else None
+        return self.set_rows(list(self.get_window(queryset, request)), count)
+
+    async def apaginate_queryset(self, queryset, request):
+        self.set_mode(queryset, request)
+        count = await aget_cached_count(queryset) if self.with_count else None
+        window = self.get_window(queryset, request)
+        return self.set_rows([obj async for obj in window], count)
+
+    def get_window(self, queryset, request):
+        """
+        Срез страницы: объекты страницы и ещё один, по которому
+        видно, есть ли следующая.
+        """
+        self.window_size = self.get_page_size(request)
+        self.offset = 0
+        if self.cursor_mode:
+            queryset = self.seek(
+                queryset, request.query_params.get(self.cursor_query_param)
+            )
+        else:
+            self.page_number = self.get_page_number(request)
+            self.offset = (self.page_number - 1) * self.window_size
+        return queryset[self.offset:self.offset + self.window_size + 1]
+
+    def set_rows(self, rows, count):
+        """
+        Оставляет объекты страницы. Количество из кеша поправляется
+        по прочитанным строкам: на последней странице оно известно
+        точно, на остальных — не меньше уже увиденного.
+        """
+        self.has_next = len(rows) > self.window_size
+        self.rows = rows[:self.window_size]
+        if not self.cursor_mode:
+            if not self.rows and self.page_number > 1:
+                raise NotFound(self.invalid_page_message)
+            if count is not None:
+                seen = self.offset + len(self.rows)
+                count = max(count, seen + 1) if self.has_next else seen
+        self.count = count
+        return self.rows
+
+    def get_page_number(self, request, paginator=None):
+        try:
+            page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            raise NotFound(self.invalid_page_message)
+        return page_number
+
+    def encode_cursor(self, obj):
+        """
+        Значения ключа сортировки последнего объекта страницы. Даты
+        записываются с микросекундами: DjangoJSONEncoder округляет
+        их до миллисекунд, и курсор пропускал бы объекты.
+        """
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (getattr(obj, field) for field in self.cursor_fields)
+        ]
+        return urlsafe_b64encode(
+            json.dumps(values, cls=DjangoJSONEncoder).encode()
+        ).decode()
+
+    def decode_cursor(self, queryset, cursor):
+        meta = queryset.model._meta
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.cursor_fields):
+                raise ValueError
+            return [
+                meta.get_field(field).to_python(value)
+                for field, value in zip(self.cursor_fields, values)
+            ]
+        except (BinasciiError, TypeError, ValueError, ValidationError):
+            raise NotFound('Неверный курсор.')
+
+    def seek(self, queryset, cursor):
+        """
+        Отбирает объекты, следующие за курсором при сортировке
+        по убыванию полей cursor_fields.
+        """
+        if not cursor:
+            return queryset
+        values = self.decode_cursor(queryset, cursor)
+        after = Q()
+        for position, field in enumerate(self.cursor_fields):
+            step = Q(**dict(zip(self.cursor_fields[:position], values)))
+            after |= step & Q(**{f'{field}__lt': values[position]})
+        first_field = self.cursor_fields[0]
+        return queryset.filter(
+            after, **{f'{first_field}__lte': values[0]}
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.cursor_mode:
+            return replace_query_param(
+                url, self.cursor_query_param, self.encode_cursor(self.rows[-1])
+            )
+        return replace_query_param(
+            url, self.page_query_param, self.page_number + 1
+        )
+
+    def get_previous_link(self):
+        if self.cursor_mode or self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.with_count:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+
+class FeedPagination(RecipePagination):
+    """
+    Пагинация ленты подписок: всегда по курсору (pub_date, recipe_id)
+    и без подсчёта общего количества.
+    """
+
+    cursor_orderings = (('pub_date', 'recipe_id'),)
+
+    def use_cursor(self, request):
+        return True
+
+    def use_count(self, request):
+        return False
@@ -0,0 +1,50 @@
+import json
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.datastructures import MultiValueDict
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+DATA_FIELD = 'data'
+
+
+class MultiPartData(dict):
+    """
+    Данные запроса, к которым DRF добавляет файлы по одному значению
+    на поле, как у QueryDict, а не списками.
+    """
+
+    def copy(self):
+        return MultiPartData(self)
+
+    def update(self, other):
+        if isinstance(other, MultiValueDict):
+            other = other.dict()
+        super().update(other)
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """
+    multipart/form-data с полями объекта в JSON.
+
+    Вложенные поля (ингредиенты, теги) передаются JSON-объектом в части
+    data, файлы — отдельными частями. Файлы всегда пишутся во временные
+    файлы на диске, а не в память.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        parsed = super().parse(stream, media_type, parser_context)
+        data = {}
+        if DATA_FIELD in parsed.data:
+            try:
+                data = json.loads(parsed.data[DATA_FIELD])
+            except ValueError as error:
+                raise ParseError(f'Неверный JSON в поле data: {error}')
+            if not isinstance(data, dict):
+                raise ParseError('Поле data должно быть JSON-объектом.')
+        for key, values in parsed.data.lists():
+            if key != DATA_FIELD:
+                data[key] = values if len(values) > 1 else values[0]
+        return DataAndFiles(MultiPartData(data), parsed.files)
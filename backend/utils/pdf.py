@@ -0,0 +1,265 @@
+import zlib
+from functools import lru_cache
+
+from django.conf import settings
+from reportlab.pdfbase.ttfonts import TTFontFile
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 56
+FONT_SIZE = 12
+LINE_HEIGHT = 18
+TITLE_SIZE = 16
+
+CATALOG, PAGES, FONT, CID_FONT, DESCRIPTOR, FONT_FILE, TO_UNICODE = range(
+    1, 8
+)
+FIRST_PAGE_OBJECT = 8
+
+
+@lru_cache
+def load_font(path):
+    """Читает метрики TrueType-шрифта и сжимает его для встраивания."""
+    font = TTFontFile(path)
+    with open(path, 'rb') as file:
+        data = file.read()
+    return font, len(data), zlib.compress(data)
+
+
+def pdf_string(text):
+    return '({})'.format(
+        text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    )
+
+
+class StreamingPDF:
+    """
+    Построчно пишет PDF-документ и отдаёт его по страницам.
+
+    Каждая страница сбрасывается в поток сразу после заполнения,
+    в памяти остаются только смещения объектов и набор использованных
+    символов. Шрифт (с кириллицей) встраивается один раз в конце файла.
+    """
+
+    def __init__(self, title, font_path=None):
+        self.title = title
+        self.font, self.font_length, self.font_data = load_font(
+            font_path or settings.PDF_FONT_PATH
+        )
+        self.offsets = {}
+        self.position = 0
+        self.next_object = FIRST_PAGE_OBJECT
+        self.page_objects = []
+        self.used = {}
+        self.lines = []
+
+    def write(self, data):
+        self.position += len(data)
+        return data
+
+    def write_object(self, number, body, stream=None):
+        self.offsets[number] = self.position
+        chunks = [f'{number} 0 obj\n'.encode(), body.encode()]
+        if stream is not None:
+            chunks += [b'\nstream\n', stream, b'\nendstream']
+        chunks.append(b'\nendobj\n')
+        return self.write(b''.join(chunks))
+
+    def allocate(self):
+        number = self.next_object
+        self.next_object += 1
+        return number
+
+    def encode(self, text):
+        """Кодирует строку номерами глифов шрифта (Identity-H)."""
+        glyphs = []
+        for char in text:
+            glyph = self.font.charToGlyph.get(ord(char), 0)
+            self.used[glyph] = char
+            glyphs.append(f'{glyph:04X}')
+        return '<{}>'.format(''.join(glyphs))
+
+    def text_width(self, text, size):
+        widths = self.font.charWidths
+        default = self.font.defaultWidth
+        units = sum(widths.get(ord(char), default) for char in text)
+        return units * size / 1000
+
+    def wrap(self, text, size):
+        width = PAGE_WIDTH - 2 * MARGIN
+        line = ''
+        for word in text.split(' '):
+            candidate = f'{line} {word}' if line else word
+            if line and self.text_width(candidate, size) > width:
+                yield line
+                line = word
+            else:
+                line = candidate
+        yield line
+
+    def start(self):
+        return self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def add_line(self, text, size=FONT_SIZE):
+        """Добавляет строку; возвращает байты страницы, если она заполнена."""
+        chunks = []
+        for line in self.wrap(text, size):
+            if len(self.lines) * LINE_HEIGHT >= PAGE_HEIGHT - 2 * MARGIN:
+                chunks.append(self.flush_page())
+            self.lines.append((line, size))
+        return b''.join(chunks)
+
+    def flush_page(self):
+        commands = ['BT']
+        top = PAGE_HEIGHT - MARGIN
+        for index, (line, size) in enumerate(self.lines):
+            commands.append(
+                f'/F1 {size} Tf 1 0 0 1 {MARGIN} {top - index * LINE_HEIGHT}'
+                f' Tm {self.encode(line)} Tj'
+            )
+        commands.append('ET')
+        self.lines = []
+        content = zlib.compress('\n'.join(commands).encode())
+        content_object, page_object = self.allocate(), self.allocate()
+        self.page_objects.append(page_object)
+        return self.write_object(
+            content_object,
+            f'<< /Length {len(content)} /Filter /FlateDecode >>',
+            content,
+        ) + self.write_object(
+            page_object,
+            f'<< /Type /Page /Parent {PAGES} 0 R'
+            f' /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}]'
+            f' /Resources << /Font << /F1 {FONT} 0 R >> >>'
+            f' /Contents {content_object} 0 R >>',
+        )
+
+    def finish(self):
+        chunks = []
+        if self.lines or not self.page_objects:
+            chunks.append(self.flush_page())
+        chunks.append(self.write_fonts())
+        kids = ' '.join(f'{number} 0 R' for number in self.page_objects)
+        chunks.append(
+            self.write_object(
+                PAGES,
+                f'<< /Type /Pages /Kids [{kids}]'
+                f' /Count {len(self.page_objects)} >>',
+            )
+        )
+        chunks.append(
+            self.write_object(
+                CATALOG, f'<< /Type /Catalog /Pages {PAGES} 0 R >>'
+            )
+        )
+        chunks.append(self.write_xref())
+        return b''.join(chunks)
+
+    def write_fonts(self):
+        font = self.font
+        name = font.name.decode()
+        widths = ' '.join(
+            f'{glyph} [{font.charWidths.get(ord(char), 0):.0f}]'
+            for glyph, char in sorted(self.used.items())
+        )
+        bbox = ' '.join(f'{value:.0f}' for value in font.bbox)
+        cmap = self.to_unicode().encode()
+        return b''.join(
+            (
+                self.write_object(
+                    FONT,
+                    f'<< /Type /Font /Subtype /Type0 /BaseFont /{name}'
+                    f' /Encoding /Identity-H'
+                    f' /DescendantFonts [{CID_FONT} 0 R]'
+                    f' /ToUnicode {TO_UNICODE} 0 R >>',
+                ),
+                self.write_object(
+                    CID_FONT,
+                    f'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{name}'
+                    ' /CIDSystemInfo << /Registry (Adobe)'
+                    ' /Ordering (Identity) /Supplement 0 >>'
+                    f' /FontDescriptor {DESCRIPTOR} 0 R'
+                    f' /DW {font.defaultWidth:.0f} /W [{widths}]'
+                    ' /CIDToGIDMap /Identity >>',
+                ),
+                self.write_object(
+                    DESCRIPTOR,
+                    f'<< /Type /FontDescriptor /FontName /{name}'
+                    f' /Flags {font.flags} /FontBBox [{bbox}]'
+                    f' /ItalicAngle {font.italicAngle:.0f}'
+                    f' /Ascent {font.ascent:.0f} /Descent {font.descent:.0f}'
+                    f' /CapHeight {font.capHeight:.0f} /StemV {font.stemV}'
+                    f' /FontFile2 {FONT_FILE} 0 R >>',
+                ),
+                self.write_object(
+                    FONT_FILE,
+                    f'<< /Length {len(self.font_data)}'
+                    f' /Length1 {self.font_length} /Filter /FlateDecode >>',
+                    self.font_data,
+                ),
+                self.write_object(
+                    TO_UNICODE, f'<< /Length {len(cmap)} >>', cmap
+                ),
+            )
+        )
+
+    def to_unicode(self):
+        mappings = [
+            f'<{glyph:04X}> <{ord(char):04X}>'
+            for glyph, char in sorted(self.used.items())
+            if ord(char) <= 0xFFFF
+        ]
+        blocks = []
+        for start in range(0, len(mappings), 100):
+            block = mappings[start:start + 100]
+            blocks.append(
+                f'{len(block)} beginbfchar\n' + '\n'.join(block)
+                + '\nendbfchar'
+            )
+        return '\n'.join(
+            (
+                '/CIDInit /ProcSet findresource begin',
+                '12 dict begin',
+                'begincmap',
+                '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS)'
+                ' /Supplement 0 >> def',
+                '/CMapName /Adobe-Identity-UCS def',
+                '/CMapType 2 def',
+                '1 begincodespacerange',
+                '<0000> <FFFF>',
+                'endcodespacerange',
+                *blocks,
+                'endcmap',
+                'CMapName currentdict /CMap defineresource pop',
+                'end',
+                'end',
+            )
+        )
+
+    def write_xref(self):
+        count = self.next_object
+        rows = ['xref', f'0 {count}', '0000000000 65535 f ']
+        rows += [
+            f'{self.offsets[number]:010d} 00000 n '
+            for number in range(1, count)
+        ]
+        start = self.position
+        rows += [
+            'trailer',
+            f'<< /Size {count} /Root {CATALOG} 0 R'
+            f' /Info << /Title {pdf_string(self.title)} >> >>',
+            'startxref',
+            str(start),
+            '%%EOF',
+        ]
+        return self.write(('\n'.join(rows) + '\n').encode())
+
+    def stream(self, lines):
+        """Генерирует документ из заголовка и строк по страницам."""
+        yield self.start()
+        self.add_line(self.title, TITLE_SIZE)
+        for line in lines:
+            page = self.add_line(line)
+            if page:
+                yield page
+        yield self.finish()
@@ -0,0 +1,209 @@
+from itertools import chain
+from threading import Lock
+
+import numpy as np
+from django.core.cache import cache
+
+from recipes.models import IngredientInRecipe
+
+MAX_RESULTS = 20
+MAX_PENDING_CHANGES = 1000
+CHUNK_SIZE = 10000
+CHANGES_TIMEOUT = 60 * 60 * 24
+SEQUENCE_KEY = 'recipe:index:sequence'
+CHANGES_KEY = 'recipe:index:changes:{}'
+EMPTY = np.empty(0, dtype=np.int32)
+
+
+def get_sequence():
+    return cache.get(SEQUENCE_KEY, 0)
+
+
+def record_changes(recipe_ids):
+    """
+    Записывает в журнал изменений id рецептов, чей состав изменился
+    или которые удалены. Процессы применяют журнал к своим индексам.
+    """
+    try:
+        sequence = cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        cache.add(SEQUENCE_KEY, 0, None)
+        sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(CHANGES_KEY.format(sequence), list(recipe_ids), CHANGES_TIMEOUT)
+
+
+def read_pairs(queryset):
+    """Пары (рецепт, ингредиент) двумя массивами, без списка кортежей."""
+    flat = np.fromiter(
+        chain.from_iterable(
+            queryset.values_list('recipes', 'ingredient').iterator(
+                chunk_size=CHUNK_SIZE
+            )
+        ),
+        dtype=np.int32,
+    ).reshape(-1, 2)
+    return sort_pairs(flat[:, 0], flat[:, 1])
+
+
+def sort_pairs(recipes, ingredients):
+    """Сортирует пары по рецепту и ингредиенту и убирает повторы."""
+    order = np.lexsort((ingredients, recipes))
+    recipes, ingredients = recipes[order], ingredients[order]
+    unique = np.ones(len(recipes), dtype=bool)
+    unique[1:] = (recipes[1:] != recipes[:-1]) | (
+        ingredients[1:] != ingredients[:-1]
+    )
+    return recipes[unique], ingredients[unique]
+
+
+class RecipeIngredientIndex:
+    """
+    Инвертированный индекс «ингредиент → рецепты» в памяти процесса
+    для подбора рецептов по имеющимся ингредиентам.
+
+    Для каждого ингредиента хранится отсортированный массив id
+    рецептов, для каждого рецепта — число ингредиентов в нём. Пары
+    (рецепт, ингредиент) хранятся отсортированными по рецепту, чтобы
+    изменения применялись без перестройки всего индекса: процесс
+    читает журнал изменённых рецептов и перечитывает из базы только их.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.snapshot = None
+
+    def get_snapshot(self):
+        sequence = get_sequence()
+        snapshot = self.snapshot
+        if snapshot is None or snapshot['sequence'] != sequence:
+            with self.lock:
+                snapshot = self.snapshot
+                if snapshot is None or snapshot['sequence'] != sequence:
+                    snapshot = self.snapshot = self.sync(snapshot, sequence)
+        return snapshot
+
+    def sync(self, snapshot, sequence):
+        """
+        Применяет журнал изменений. Если журнал прерывается (записи
+        вытеснены из кеша или счётчик сброшен), индекс строится заново.
+        """
+        if (
+            snapshot is None
+            or not 0 < sequence - snapshot['sequence'] <= MAX_PENDING_CHANGES
+        ):
+            return self.build(sequence)
+        keys = [
+            CHANGES_KEY.format(number)
+            for number in range(snapshot['sequence'] + 1, sequence + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return self.build(sequence)
+        return self.apply(
+            snapshot, sequence, set(chain.from_iterable(changes.values()))
+        )
+
+    @classmethod
+    def build(cls, sequence):
+        recipes, ingredients = read_pairs(IngredientInRecipe.objects.all())
+        postings = cls.make_postings(recipes, ingredients)
+        return cls.make_snapshot(sequence, recipes, ingredients, postings)
+
+    @classmethod
+    def apply(cls, snapshot, sequence, changed):
+        """Заменяет в индексе пары изменённых рецептов на текущие."""
+        changed = np.unique(np.fromiter(changed, dtype=np.int32))
+        stale = np.isin(snapshot['recipes'], changed)
+        old_ingredients = snapshot['ingredients'][stale]
+        recipes = snapshot['recipes'][~stale]
+        ingredients = snapshot['ingredients'][~stale]
+        new_recipes, new_ingredients = read_pairs(
+            IngredientInRecipe.objects.filter(recipes__in=changed.tolist())
+        )
+        positions = np.searchsorted(recipes, new_recipes)
+        recipes = np.insert(recipes, positions, new_recipes)
+        ingredients = np.insert(ingredients, positions, new_ingredients)
+        postings = dict(snapshot['postings'])
+        affected = np.union1d(old_ingredients, new_ingredients)
+        for ingredient in affected.tolist():
+            kept = postings.pop(ingredient, EMPTY)
+            posting = np.union1d(
+                kept[~np.isin(kept, changed)],
+                new_recipes[new_ingredients == ingredient],
+            )
+            if len(posting):
+                postings[ingredient] = posting
+        return cls.make_snapshot(sequence, recipes, ingredients, postings)
+
+    @staticmethod
+    def make_postings(recipes, ingredients):
+        """
+        Массивы рецептов по ингредиентам. Это срезы одного массива,
+        поэтому индекс занимает по четыре байта на пару.
+        """
+        order = np.argsort(ingredients, kind='stable')
+        keys, starts = np.unique(ingredients[order], return_index=True)
+        return dict(zip(keys.tolist(), np.split(recipes[order], starts[1:])))
+
+    @staticmethod
+    def make_snapshot(sequence, recipes, ingredients, postings):
+        starts = np.flatnonzero(
+            np.concatenate(([True], recipes[1:] != recipes[:-1]))
+        )
+        return {
+            'sequence': sequence,
+            'recipes': recipes,
+            'ingredients': ingredients,
+            'postings': postings,
+            'recipe_ids': recipes[starts],
+            'sizes': np.diff(np.append(starts, len(recipes))),
+        }
+
+    def cook(self, ingredients, limit=MAX_RESULTS, max_missing=None):
+        """
+        Возвращает до limit троек (id рецепта, найдено, не хватает)
+        для рецептов, в которых есть хотя бы один из ингредиентов.
+
+        Рецепты упорядочены по доле имеющихся ингредиентов, затем
+        по числу недостающих, по числу найденных и от новых к старым.
+        """
+        snapshot = self.get_snapshot()
+        postings = [
+            snapshot['postings'][pk]
+            for pk in set(ingredients)
+            if pk in snapshot['postings']
+        ]
+        if not postings:
+            return []
+        recipe_ids, matched = np.unique(
+            np.concatenate(postings), return_counts=True
+        )
+        sizes = snapshot['sizes'][
+            np.searchsorted(snapshot['recipe_ids'], recipe_ids)
+        ]
+        missing = sizes - matched
+        if max_missing is not None:
+            fits = missing <= max_missing
+            recipe_ids, matched = recipe_ids[fits], matched[fits]
+            sizes, missing = sizes[fits], missing[fits]
+        coverage = matched / sizes
+        if len(recipe_ids) > limit:
+            best = np.argpartition(-coverage, limit - 1)[:limit]
+            threshold = coverage[best].min()
+            top = np.flatnonzero(coverage >= threshold)
+        else:
+            top = np.arange(len(recipe_ids))
+        order = np.lexsort(
+            (-recipe_ids[top], -matched[top], missing[top], -coverage[top])
+        )
+        top = top[order[:limit]]
+        return list(
+            zip(
+                recipe_ids[top].tolist(),
+                matched[top].tolist(),
+                missing[top].tolist(),
+            )
+        )
+
+
+cook_index = RecipeIngredientIndex()
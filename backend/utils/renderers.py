@@ -0,0 +1,119 @@
+import csv
+from abc import ABC, abstractmethod
+
+from rest_framework.renderers import BaseRenderer
+
+from utils.pdf import StreamingPDF
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+CSV_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+CHUNK_SIZE = 8192
+
+
+class Echo:
+    """Буфер для csv.writer, который просто возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def chunked(parts, size=CHUNK_SIZE):
+    """Склеивает мелкие куски в блоки примерно по size байт."""
+    buffer, length = [], 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def format_ingredient(ingredient):
+    return (
+        f'{ingredient["ingredient__name"]}: {ingredient["amount"]} '
+        f'{ingredient["ingredient__measurement_unit"]}'
+    )
+
+
+class ShoppingListRenderer(ABC, BaseRenderer):
+    """
+    Базовый рендерер списка покупок.
+
+    stream() отдаёт файл по частям для StreamingHttpResponse,
+    render() используется DRF для сообщений об ошибках.
+    """
+
+    charset = 'utf-8'
+
+    @abstractmethod
+    def stream(self, ingredients):
+        """Части файла для списка ингредиентов."""
+
+    @abstractmethod
+    def write_messages(self, messages):
+        """Части файла с сообщениями, например об ошибке."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        messages = data.values() if isinstance(data, dict) else (data,)
+        return b''.join(self.write_messages([str(m) for m in messages]))
+
+
+class PlainTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        lines = (
+            f'{format_ingredient(ingredient)}\n' for ingredient in ingredients
+        )
+        return self.write_messages(lines, title=SHOPPING_LIST_TITLE)
+
+    def write_messages(self, messages, title=None):
+        if title:
+            yield f'{title}\n'.encode()
+        yield from chunked(message.encode() for message in messages)
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        rows = (
+            (
+                ingredient['ingredient__name'],
+                ingredient['amount'],
+                ingredient['ingredient__measurement_unit'],
+            )
+            for ingredient in ingredients
+        )
+        return self.write_rows(rows, header=CSV_HEADER)
+
+    def write_rows(self, rows, header=None):
+        writer = csv.writer(Echo())
+        yield '\ufeff'.encode()
+        if header:
+            yield writer.writerow(header).encode()
+        yield from chunked(writer.writerow(row).encode() for row in rows)
+
+    def write_messages(self, messages):
+        return self.write_rows((message,) for message in messages)
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+
+    def stream(self, ingredients):
+        return StreamingPDF(SHOPPING_LIST_TITLE).stream(
+            format_ingredient(ingredient) for ingredient in ingredients
+        )
+
+    def write_messages(self, messages):
+        return StreamingPDF('Ошибка').stream(messages)
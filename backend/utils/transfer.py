@@ -0,0 +1,301 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.db.transaction import on_commit
+from django.utils.dateparse import parse_datetime
+
+from recipes.models import (
+    FeedEntry,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    Tag,
+)
+from users.models import Subscription, User
+from utils import recipe_index
+from utils.bulk import batches, insert_from_select
+from utils.versions import bump_version
+
+BATCH_SIZE = 1000
+MEDIA_PREFIX = 'media/'
+RECIPES_MEMBER = 'recipes.ndjson'
+AUTHOR_FIELDS = ('username', 'email', 'first_name', 'last_name')
+TAG_FIELDS = ('name', 'color', 'slug')
+
+
+def export_records(recipes, chunk_size=BATCH_SIZE):
+    """
+    Генерирует записи рецептов для NDJSON. Связанные объекты описаны
+    естественными ключами, а не id, чтобы их можно было найти в другой
+    базе. Рецепты читаются итератором, теги и ингредиенты — одним
+    запросом на пачку.
+    """
+    tags = {
+        tag['id']: {field: tag[field] for field in TAG_FIELDS}
+        for tag in Tag.objects.values('id', *TAG_FIELDS)
+    }
+    rows = recipes.order_by('pk').values(
+        'pk',
+        'name',
+        'text',
+        'cooking_time',
+        'pub_date',
+        'image',
+        *(f'author__{field}' for field in AUTHOR_FIELDS),
+    )
+    for batch in batches(rows.iterator(chunk_size=chunk_size), chunk_size):
+        ids = [row['pk'] for row in batch]
+        recipe_tags = defaultdict(list)
+        for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+            recipe_id__in=ids
+        ).values_list('recipe_id', 'tag_id'):
+            recipe_tags[recipe_id].append(tags[tag_id])
+        ingredients = defaultdict(list)
+        for recipe_id, name, unit, amount in (
+            IngredientInRecipe.objects.filter(recipes__in=ids)
+            .order_by('pk')
+            .values_list(
+                'recipes',
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                'amount',
+            )
+        ):
+            ingredients[recipe_id].append(
+                {'name': name, 'measurement_unit': unit, 'amount': amount}
+            )
+        for row in batch:
+            yield {
+                'id': row['pk'],
+                'name': row['name'],
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+                'pub_date': row['pub_date'].isoformat(),
+                'image': row['image'],
+                'author': {
+                    field: row[f'author__{field}'] for field in AUTHOR_FIELDS
+                },
+                'tags': recipe_tags[row['pk']],
+                'ingredients': ingredients[row['pk']],
+            }
+
+
+@contextmanager
+def keep_pub_date():
+    """
+    Отключает auto_now_add у даты публикации, чтобы bulk_create
+    сохранил дату из выгрузки.
+    """
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class RecipeImporter:
+    """
+    Загружает рецепты из записей export_records пачками.
+
+    Авторы ищутся по username (затем по email), теги — по slug (затем
+    по названию), ингредиенты — по названию и единице измерения;
+    недостающие создаются. Рецепты получают новые id, дата публикации
+    сохраняется.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.images = {}
+        self.created = {'users': 0, 'tags': 0, 'ingredients': 0}
+
+    def save_image(self, name, file):
+        """Сохраняет изображение из архива, если его ещё нет в хранилище."""
+        if default_storage.exists(name):
+            return
+        saved = default_storage.save(name, File(file, name=name))
+        if saved != name:
+            self.images[name] = saved
+
+    def load(self, records):
+        """Загружает записи; после каждой пачки отдаёт её размер."""
+        for batch in batches(records, self.batch_size):
+            self.load_batch(batch)
+            yield len(batch)
+        if self.created['tags']:
+            on_commit(lambda: bump_version(Tag))
+        if self.created['ingredients']:
+            on_commit(lambda: bump_version(Ingredient))
+
+    def load_batch(self, batch):
+        authors = self.resolve_authors(
+            [record['author'] for record in batch]
+        )
+        tags = self.resolve_tags(
+            [tag for record in batch for tag in record['tags']]
+        )
+        ingredients = self.resolve_ingredients(
+            [
+                (ingredient['name'], ingredient['measurement_unit'])
+                for record in batch
+                for ingredient in record['ingredients']
+            ]
+        )
+        with keep_pub_date():
+            recipes = Recipe.objects.bulk_create(
+                [
+                    Recipe(
+                        author_id=authors[record['author']['username']],
+                        name=record['name'],
+                        text=record['text'],
+                        cooking_time=record['cooking_time'],
+                        image=self.images.get(
+                            record['image'], record['image']
+                        ),
+                        pub_date=parse_datetime(record['pub_date']),
+                    )
+                    for record in batch
+                ]
+            )
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe, record in zip(recipes, batch)
+                for tag_id in {
+                    tags[tag['slug']]
+                    for tag in record['tags']
+                    if tag['slug'] in tags
+                }
+            ]
+        )
+        IngredientInRecipe.objects.bulk_create(
+            [
+                IngredientInRecipe(
+                    recipes_id=recipe.pk,
+                    ingredient_id=ingredients[
+                        ingredient['name'], ingredient['measurement_unit']
+                    ],
+                    amount=ingredient['amount'],
+                )
+                for recipe, record in zip(recipes, batch)
+                for ingredient in record['ingredients']
+            ]
+        )
+        added = defaultdict(list)
+        for author_id, count in Counter(
+            recipe.author_id for recipe in recipes
+        ).items():
+            added[count].append(author_id)
+        for count, author_ids in added.items():
+            User.objects.filter(pk__in=author_ids).update(
+                recipes_count=F('recipes_count') + count
+            )
+        recipe_ids = [recipe.pk for recipe in recipes]
+        on_commit(lambda: recipe_index.record_changes(recipe_ids))
+        insert_from_select(
+            FeedEntry,
+            ('user', 'recipe', 'pub_date'),
+            Subscription.objects.filter(
+                author__recipes__in=recipe_ids
+            ).values('user', 'author__recipes', 'author__recipes__pub_date'),
+        )
+
+    def create_missing(self, model, key, rows, counter, defaults=None):
+        """
+        Возвращает {ключ: id} для rows, создавая недостающие объекты.
+        Объекты, которые не удалось создать из-за других уникальных
+        полей, в результат не попадают.
+        """
+        found = dict(
+            model.objects.filter(**{f'{key}__in': rows}).values_list(
+                key, 'pk'
+            )
+        )
+        missing = [
+            fields for value, fields in rows.items() if value not in found
+        ]
+        if missing:
+            model.objects.bulk_create(
+                [
+                    model(**fields, **(defaults() if defaults else {}))
+                    for fields in missing
+                ],
+                ignore_conflicts=True,
+            )
+            created = dict(
+                model.objects.filter(
+                    **{f'{key}__in': [fields[key] for fields in missing]}
+                ).values_list(key, 'pk')
+            )
+            self.created[counter] += len(created)
+            found.update(created)
+        return found
+
+    def resolve_authors(self, authors):
+        rows = {
+            author['username']: {
+                field: author[field] for field in AUTHOR_FIELDS
+            }
+            for author in authors
+        }
+        found = self.create_missing(
+            User,
+            'username',
+            rows,
+            'users',
+            defaults=lambda: {'password': make_password(None)},
+        )
+        return self.fall_back(User, 'email', rows, found)
+
+    def resolve_tags(self, tags):
+        rows = {
+            tag['slug']: {field: tag[field] for field in TAG_FIELDS}
+            for tag in tags
+        }
+        found = self.create_missing(Tag, 'slug', rows, 'tags')
+        return self.fall_back(Tag, 'name', rows, found)
+
+    @staticmethod
+    def fall_back(model, field, rows, found):
+        """Находит по другому уникальному полю то, что не нашлось по ключу."""
+        missing = {
+            fields[field]: key
+            for key, fields in rows.items()
+            if key not in found
+        }
+        if missing:
+            for value, pk in model.objects.filter(
+                **{f'{field}__in': missing}
+            ).values_list(field, 'pk'):
+                found[missing[value]] = pk
+        return found
+
+    def resolve_ingredients(self, pairs):
+        pairs = set(pairs)
+        names = {name for name, _ in pairs}
+
+        def find():
+            return {
+                (name, unit): pk
+                for pk, name, unit in Ingredient.objects.filter(
+                    name__in=names
+                ).values_list('pk', 'name', 'measurement_unit')
+                if (name, unit) in pairs
+            }
+
+        found = find()
+        if len(found) < len(pairs):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in pairs - found.keys()
+                ],
+                ignore_conflicts=True,
+            )
+            before, found = len(found), find()
+            self.created['ingredients'] += len(found) - before
+        return found
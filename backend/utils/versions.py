@@ -0,0 +1,26 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils import timezone
+
+VERSION_KEY = 'table:version:{}'
+
+
+def _key(model):
+    return VERSION_KEY.format(model._meta.label_lower)
+
+
+def get_version(model):
+    """
+    Возвращает версию таблицы модели: пару (токен, время изменения).
+    Версия хранится в общем кеше и меняется при каждом изменении таблицы.
+    """
+    version = cache.get(_key(model))
+    if version is None:
+        cache.add(_key(model), (uuid4().hex, timezone.now()), None)
+        version = cache.get(_key(model))
+    return version
+
+
+def bump_version(model):
+    cache.set(_key(model), (uuid4().hex, timezone.now()), None)